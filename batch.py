@@ -0,0 +1,175 @@
+import os, sys, glob, copy, argparse, traceback, multiprocessing
+from telegraph import AnalysisOptions, addOptionArguments, run
+from reader import compressedExtensions
+
+def findDumps(locations):
+    """
+    Return a sorted list of every .jsonl file found, without repeats, directories are also searched for compressed
+    .jsonl files such as .jsonl.gz
+    locations - list of directories, files or glob patterns such as "archive/*.jsonl"
+    """
+    dumps = set()
+    for location in locations:
+        if os.path.isdir(location):
+            for extension in ("",) + compressedExtensions:
+                dumps.update(glob.glob(os.path.join(location, "*.jsonl" + extension)))
+        else:
+            dumps.update(path for path in glob.glob(location) if os.path.isfile(path))
+    return sorted(os.path.abspath(dump) for dump in dumps)
+
+def assignOutputDirectories(dumps, outputDirectory):
+    """
+    Give every dump its own directory inside outputDirectory named after the file, dumps with the same name from
+    different folders are numbered so no two chats ever write to the same place
+    Returns a dictionary {dump path : output directory}
+    """
+    outputDirectories = dict()
+    usedNames = set()
+    for dump in dumps:
+        baseName = os.path.basename(dump)
+        if baseName.endswith(compressedExtensions): #Both extensions of chat.jsonl.gz are dropped
+            baseName = os.path.splitext(baseName)[0]
+        baseName = os.path.splitext(baseName)[0]
+        chatName = baseName
+        copyNumber = 2
+        while chatName in usedNames:
+            chatName = baseName + "-" + str(copyNumber)
+            copyNumber += 1
+        usedNames.add(chatName)
+        outputDirectories[dump] = os.path.join(outputDirectory, chatName)
+    return outputDirectories
+
+def summarizeUsers(userDict):
+    """
+    Boil every user down to the totals that can be added up across chats
+    Returns a dictionary {ID : {"name", "messages", "words", "characters", "pics", "docs", "links", "responseTime", "responses",
+            "responseHistogram"}}, responseHistogram is a ResponseHistogram which adds up with += like the other totals
+    """
+    summary = dict()
+    for peerID in userDict:
+        currentUser = userDict[peerID]
+        summary[peerID] = {"name": currentUser.getFullName(), "messages": currentUser.numMessages,
+                            "words": currentUser.totalLength, "characters": currentUser.totalCharacters,
+                            "pics": currentUser.mediaSent["pics"], "docs": currentUser.mediaSent["docs"],
+                            "links": currentUser.mediaSent["links"], "responseTime": currentUser.totalResponseTime,
+                            "responses": currentUser.numResponses, "responseHistogram": currentUser.getResponseHistogram()}
+    return summary
+
+def analyzeChat(task):
+    """
+    Run TeleGraph on a single dump, used as the worker function for batch processing
+    task - tuple of (dump path, output directory, AnalysisOptions)
+    Returns a tuple of (dump path, summarizeUsers() of the chat or None, error message or None)
+    """
+    dump, outputDirectory, options = task
+    os.environ.setdefault("MPLBACKEND", "Agg") #Workers never show windows, only save files
+    try:
+        os.makedirs(outputDirectory, exist_ok = True)
+        chatOptions = copy.copy(options)
+        chatOptions.numProcesses = 1 #Each worker already has its own chat, pool workers can't start pools of their own
+        chatOptions.statsPath = os.path.join(outputDirectory, "fullStats.txt")
+        chatOptions.graphPath = os.path.join(outputDirectory, "output.pdf")
+        if options.dashboardPath is not None: #Every chat gets a dashboard of its own under the same file name
+            chatOptions.dashboardPath = os.path.join(outputDirectory, os.path.basename(options.dashboardPath))
+        chatData = run(dump, chatOptions)
+        return dump, summarizeUsers(chatData.getUserDict()), None
+    except Exception:
+        return dump, None, traceback.format_exc()
+
+def combineSummaries(summaries):
+    """
+    Add up the summarizeUsers() results of several chats for each peer_id
+    Returns a dictionary {ID : totals} where each totals also holds "chats", the number of chats the user showed up in
+    """
+    combined = dict()
+    for summary in summaries:
+        for peerID in summary:
+            if peerID not in combined:
+                combined[peerID] = dict(summary[peerID])
+                combined[peerID]["chats"] = 1
+            else:
+                for total in summary[peerID]:
+                    if total != "name":
+                        combined[peerID][total] += summary[peerID][total]
+                combined[peerID]["chats"] += 1
+    return combined
+
+def writeCombinedStats(combined, outputFile):
+    """
+    Print the combined totals of every user across all chats, most active users first
+    """
+    for peerID in sorted(combined, key = lambda peerID: combined[peerID]["messages"], reverse = True):
+        totals = combined[peerID]
+        print("-------------------" + totals["name"] + "-------------------", file = outputFile)
+        print("    Peer ID: " + str(peerID), file = outputFile)
+        print("    Chats: " + str(totals["chats"]), file = outputFile)
+        print("    Messages Sent: " + str(totals["messages"]), file = outputFile)
+        print("    Pictures Sent: " + str(totals["pics"]), file = outputFile)
+        print("    Files Sent: " + str(totals["docs"]), file = outputFile)
+        print("    Links Sent: " + str(totals["links"]), file = outputFile)
+        if totals["messages"] != 0:
+            print("    Average Message Length (Words): " + str(round(totals["words"] / totals["messages"])), file = outputFile)
+            print("    Average Characters Per Message: " + str(round(totals["characters"] / totals["messages"])), file = outputFile)
+        if totals["responses"] != 0:
+            print("    Average Response Time(Minutes): " + str(totals["responseTime"] / totals["responses"] / 60), file = outputFile)
+            medianResponse, response90, response99 = totals["responseHistogram"].getQuantiles()
+            print("    Median Response Time(Minutes): " + str(medianResponse), file = outputFile)
+            print("    90th Percentile Response Time(Minutes): " + str(response90), file = outputFile)
+            print("    99th Percentile Response Time(Minutes): " + str(response99), file = outputFile)
+
+def runBatch(dumps, outputDirectory, options = None, numWorkers = None, combinedPath = None):
+    """
+    Run TeleGraph on many dumps at once across a pool of processes, each chat gets its own fullStats.txt and output.pdf
+    inside its own directory in outputDirectory
+    dumps - list of paths to .jsonl files
+    options - AnalysisOptions shared by every chat
+    numWorkers - number of processes, defaults to one per core
+    combinedPath - optional path to write every user's totals added up across all chats to
+    Returns a dictionary of the chats that failed {dump path : error message}
+    """
+    if options is None:
+        options = AnalysisOptions()
+    outputDirectories = assignOutputDirectories(dumps, outputDirectory)
+    tasks = [(dump, outputDirectories[dump], options) for dump in dumps]
+
+    summaries = dict()
+    failures = dict()
+    with multiprocessing.Pool(numWorkers or os.cpu_count()) as pool:
+        for dump, summary, error in pool.imap_unordered(analyzeChat, tasks):
+            if error is None:
+                summaries[dump] = summary
+            else:
+                failures[dump] = error
+
+    if combinedPath is not None:
+        with open(combinedPath, "w", encoding = "utf8") as combinedFile:
+            #Add the chats up in the same order every time regardless of which worker finished first
+            writeCombinedStats(combineSummaries(summaries[dump] for dump in dumps if dump in summaries), combinedFile)
+    return failures
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Run TeleGraph on many telegram-history-dump .jsonl files at once")
+    parser.add_argument("locations", nargs = "+", help = "directories, .jsonl files or glob patterns such as \"archive/*.jsonl\"")
+    addOptionArguments(parser)
+    parser.add_argument("-o", "--output", default = "reports", dest = "outputDirectory", help = "directory to write every chat's reports to")
+    parser.add_argument("-w", "--workers", type = int, default = None, dest = "numWorkers", help = "number of chats processed at once, defaults to one per core")
+    parser.add_argument("--dashboard", default = None, dest = "dashboardPath", metavar = "NAME", help = "also write an interactive HTML dashboard of each chat, such as dashboard.html")
+    parser.add_argument("--combined", action = "store_true", help = "also write combinedStats.txt with every user's totals across all chats")
+    arguments = parser.parse_args(arguments)
+
+    dumps = findDumps(arguments.locations)
+    if len(dumps) == 0:
+        parser.error("no .jsonl files found")
+
+    combinedPath = os.path.join(arguments.outputDirectory, "combinedStats.txt") if arguments.combined else None
+    os.makedirs(arguments.outputDirectory, exist_ok = True)
+    failures = runBatch(dumps, arguments.outputDirectory, AnalysisOptions.fromConfig(arguments), arguments.numWorkers, combinedPath)
+
+    print("Processed " + str(len(dumps) - len(failures)) + " of " + str(len(dumps)) + " chat(s) into " + arguments.outputDirectory)
+    for dump in failures:
+        print("\n" + dump + " failed:\n" + failures[dump], file = sys.stderr)
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os, sys, json, time, platform, argparse, tempfile, multiprocessing
+from instrument import getPeakMemory
+from synthetic import writeDump, addDumpArguments, settingsFromArguments
+
+#Bump whenever the layout of the results file changes
+resultsVersion = 1
+
+defaultSizes = [10000, 100000, 1000000]
+defaultTrackedWords = ["hey", "good morning", "lol", "\U0001F914", "see you tomorrow"]
+
+def measureRun(task):
+    """
+    Ingest a dump and optionally draw its graphs, timing each step. Run in a fresh process so the peak memory
+    measured belongs to this run alone
+    task - tuple of (fileName, tracked words, numProcesses, draw graphs or not)
+    Returns a dictionary of measurements
+    """
+    fileName, trackedWords, numProcesses, render = task
+    from ingest import ingestFile
+
+    startTime = time.perf_counter()
+    chatData = ingestFile(fileName, trackedWords, (1,0), [], numProcesses, useEventStore = True)
+    measurements = {"ingestSeconds": time.perf_counter() - startTime, "peakMemoryMB": getPeakMemory(),
+                    "messages": chatData.getTotalMessageCount(), "users": len(chatData.getUserDict())}
+
+    if render:
+        os.environ.setdefault("MPLBACKEND", "Agg")
+        import graph
+        with tempfile.TemporaryDirectory() as graphDirectory:
+            startTime = time.perf_counter()
+            graph.graphData(chatData.getUserDict(), trackedWords, os.path.join(graphDirectory, "output.pdf"), numProcesses)
+            measurements["renderSeconds"] = time.perf_counter() - startTime
+    return measurements
+
+def measureInNewProcess(task):
+    """
+    Run measureRun() in a freshly started process and return its measurements
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(measureRun, (task,))
+
+def getDump(dataDirectory, settings):
+    """
+    Return the path of a synthetic dump with the given settings, writing it only if it isn't already in dataDirectory
+    """
+    mediaMix = "-".join(kind + str(settings.mediaMix[kind]) for kind in sorted(settings.mediaMix))
+    dumpName = "synthetic-" + "-".join(str(setting) for setting in (settings.numMessages, settings.numUsers, settings.meanWords,
+                                        settings.timeSpan, settings.userSkew, settings.seed, mediaMix)) + ".jsonl"
+    dumpPath = os.path.join(dataDirectory, dumpName)
+    if not os.path.exists(dumpPath):
+        writeDump(dumpPath + ".tmp", settings)
+        os.replace(dumpPath + ".tmp", dumpPath)
+    return dumpPath
+
+def benchmarkSize(dumpPath, trackedWords, numProcesses, render):
+    """
+    Benchmark a single dump: plain ingestion first, then ingestion with tracked words and drawing the graphs
+    Returns a dictionary of results
+    """
+    fileSize = os.path.getsize(dumpPath)
+    plain = measureInNewProcess((dumpPath, [], numProcesses, False))
+    tracked = measureInNewProcess((dumpPath, trackedWords, numProcesses, render)) if trackedWords or render else None
+
+    results = {"messages": plain["messages"], "users": plain["users"], "fileBytes": fileSize,
+                "ingestSeconds": plain["ingestSeconds"], "messagesPerSecond": plain["messages"] / plain["ingestSeconds"],
+                "bytesPerSecond": fileSize / plain["ingestSeconds"], "peakMemoryMB": plain["peakMemoryMB"]}
+    if tracked is not None:
+        results["trackedWords"] = len(trackedWords)
+        results["trackingIngestSeconds"] = tracked["ingestSeconds"]
+        results["trackingSeconds"] = tracked["ingestSeconds"] - plain["ingestSeconds"] #Cost of tracking words on top of a plain run
+        results["trackingPeakMemoryMB"] = tracked["peakMemoryMB"]
+        results["renderSeconds"] = tracked.get("renderSeconds")
+    return results
+
+def printResults(results):
+    """
+    Print a table of the results of every size, one line each
+    """
+    print("Messages".rjust(10) + "Msgs/sec".rjust(12) + "MB/sec".rjust(9) + "Peak MB".rjust(9) + "Track s".rjust(9) + "Render s".rjust(10))
+    for result in results:
+        columns = [result["messages"], round(result["messagesPerSecond"]), round(result["bytesPerSecond"] / 1e6, 1),
+                    formatOptional(result["peakMemoryMB"], 0), formatOptional(result.get("trackingSeconds"), 2),
+                    formatOptional(result.get("renderSeconds"), 2)]
+        print("".join(str(column).rjust(width) for column, width in zip(columns, (10, 12, 9, 9, 9, 10))))
+
+def formatOptional(value, digits):
+    """
+    Helper for printResults(), round a value that may be missing
+    """
+    return "-" if value is None else round(value, digits)
+
+def compareResults(results, previousPath):
+    """
+    Print how each size changed against a results file saved by an earlier run, sizes missing from either are skipped
+    """
+    with open(previousPath, encoding = "utf8") as previousFile:
+        previous = {result["messages"]: result for result in json.load(previousFile)["results"]}
+
+    print("\nCompared to " + previousPath + " (above 1 is faster/smaller now):")
+    for result in results:
+        if result["messages"] not in previous:
+            continue
+        before = previous[result["messages"]]
+        changes = ["throughput " + str(round(result["messagesPerSecond"] / before["messagesPerSecond"], 2)) + "x"]
+        for key, label in (("peakMemoryMB", "memory"), ("trackingIngestSeconds", "tracking"), ("renderSeconds", "render")):
+            if result.get(key) and before.get(key):
+                changes.append(label + " " + str(round(before[key] / result[key], 2)) + "x")
+        print("    " + str(result["messages"]) + ": " + ", ".join(changes))
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Benchmark TeleGraph on synthetic dumps of different sizes")
+    parser.add_argument("-s", "--sizes", type = int, nargs = "+", default = defaultSizes, help = "number of messages in each dump, add 10000000 for the 10 million message run which takes a while and needs a few GB of disk")
+    addDumpArguments(parser)
+    parser.add_argument("-t", "--track", action = "append", dest = "trackedWords", default = None, help = "word to track, can be repeated, defaults to a handful of common words")
+    parser.add_argument("--no-track", action = "store_true", dest = "noTrack", help = "skip measuring word tracking")
+    parser.add_argument("--no-render", action = "store_false", dest = "render", help = "skip measuring the graphs")
+    parser.add_argument("-p", "--processes", type = int, default = 1, dest = "numProcesses", help = "number of processes TeleGraph uses")
+    parser.add_argument("--data-dir", default = tempfile.gettempdir(), dest = "dataDirectory", help = "where synthetic dumps are kept between runs")
+    parser.add_argument("-o", "--output", default = None, dest = "outputPath", help = "write the results to this JSON file")
+    parser.add_argument("--compare", default = None, dest = "previousPath", help = "JSON results of an earlier run to compare against")
+    arguments = parser.parse_args(arguments)
+
+    trackedWords = [] if arguments.noTrack else (arguments.trackedWords or defaultTrackedWords)
+    results = []
+    for numMessages in arguments.sizes:
+        dumpPath = getDump(arguments.dataDirectory, settingsFromArguments(numMessages, arguments))
+        results.append(benchmarkSize(dumpPath, trackedWords, arguments.numProcesses, arguments.render))
+        print("Finished " + str(numMessages) + " messages", file = sys.stderr)
+
+    printResults(results)
+    if arguments.previousPath:
+        compareResults(results, arguments.previousPath)
+
+    if arguments.outputPath:
+        machine = {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor(),
+                    "cpuCount": os.cpu_count()}
+        settings = {"users": arguments.numUsers, "meanWords": arguments.meanWords, "days": arguments.days,
+                    "skew": arguments.userSkew, "media": arguments.media, "seed": arguments.seed,
+                    "trackedWords": trackedWords, "numProcesses": arguments.numProcesses}
+        with open(arguments.outputPath, "w", encoding = "utf8") as outputFile:
+            json.dump({"version": resultsVersion, "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "machine": machine,
+                        "settings": settings, "results": results}, outputFile, indent = 4, ensure_ascii = False)
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding = "utf8")
+    main()
@@ -0,0 +1,219 @@
+import heapq, datetime
+from array import array
+import numpy as np
+
+class SessionTracker(object):
+    """
+    Class used to split a chat into sessions, runs of messages with no silence longer than sessionGap between them, and
+    to find who replies to whom, all in a single pass. Inside a session, every time the sender changes the new sender
+    counts as replying to the one before. Replies are kept in a sparse matrix holding only the pairs of people that
+    actually replied to each other, so memory follows how many people talk to each other rather than the number of
+    members squared, which keeps it small for groups with thousands of members.
+
+    The first and last session seen stay open along with who sent messages in them, since when the dump is processed in
+    chunks either one can turn out to carry on a session of the neighbouring chunk, see merge(). Every session in between
+    is closed and stored as a row of a few flat arrays
+    """
+
+    def __init__(self, sessionGap):
+        """
+        sessionGap - minutes of silence that end a session
+        replies - sparse reply matrix {(sender, responder) : [replies, total seconds taken to reply]}
+        starts, ends - unix time stamp of the first and last message of every closed session, oldest first
+        initiators - peer_id of whoever sent the first message of every closed session
+        messages - number of messages in every closed session
+        participants - number of different people that sent a message in every closed session
+        userSessions - number of closed sessions each user took part in and started {ID : [joined, started]}
+        firstSession, lastSession - open sessions as [start, end, initiator, messages, {ID : messages sent}], the same list
+                    while only one session has been seen, None before the first message
+        lastSender - peer_id of whoever sent the last message seen
+        """
+        self.sessionGap = sessionGap
+        self.replies = dict()
+        self.starts = array('q')
+        self.ends = array('q')
+        self.initiators = array('q')
+        self.messages = array('q')
+        self.participants = array('q')
+        self.userSessions = dict()
+        self.firstSession = None
+        self.lastSession = None
+        self.lastSender = None
+
+    def addMessage(self, timeStamp, peerID):
+        """
+        Add a single message, messages have to be added in the order they were sent
+        """
+        session = self.lastSession
+        if session is None or timeStamp - session[1] > self.sessionGap * 60:
+            if session is not None and session is not self.firstSession:
+                self.closeSession(session)
+            self.lastSession = [timeStamp, timeStamp, peerID, 1, {peerID: 1}]
+            if self.firstSession is None:
+                self.firstSession = self.lastSession
+        else:
+            if peerID != self.lastSender:
+                self.addReply(self.lastSender, peerID, timeStamp - session[1])
+            session[1] = timeStamp
+            session[3] += 1
+            session[4][peerID] = session[4].get(peerID, 0) + 1
+        self.lastSender = peerID
+
+    def addReply(self, sender, responder, seconds, numReplies = 1):
+        """
+        Count replies from responder to sender in the reply matrix
+        seconds - total time taken by those replies
+        """
+        entry = self.replies.get((sender, responder))
+        if entry is None:
+            self.replies[(sender, responder)] = [numReplies, seconds]
+        else:
+            entry[0] += numReplies
+            entry[1] += seconds
+
+    def closeSession(self, session):
+        """
+        Store an open session as a row of the closed session arrays, sessions have to be closed in the order they were sent
+        """
+        start, end, initiator, numMessages, senders = session
+        self.starts.append(start)
+        self.ends.append(end)
+        self.initiators.append(initiator)
+        self.messages.append(numMessages)
+        self.participants.append(len(senders))
+        self.countUserSessions(self.userSessions, senders, initiator)
+
+    @staticmethod
+    def countUserSessions(userSessions, senders, initiator):
+        """
+        Add a single session to the number of sessions each of its senders joined and its initiator started
+        """
+        for peerID in senders:
+            if peerID not in userSessions:
+                userSessions[peerID] = [0, 0]
+            userSessions[peerID][0] += 1
+        userSessions[initiator][1] += 1
+
+    def merge(self, other):
+        """
+        Add the sessions of the chunk processed right after this one, giving the same result as processing both chunks
+        in one go. other can't be used afterwards
+        """
+        if other.firstSession is None:
+            return
+        if self.firstSession is None:
+            self.__dict__.update(other.__dict__)
+            return
+
+        for pair, (numReplies, seconds) in other.replies.items():
+            self.addReply(pair[0], pair[1], seconds, numReplies)
+
+        session = self.lastSession
+        otherFirst = other.firstSession
+        if otherFirst[0] - session[1] <= self.sessionGap * 60:
+            #The first session of other carries on the last session here, join them along with the reply between them
+            if otherFirst[2] != self.lastSender:
+                self.addReply(self.lastSender, otherFirst[2], otherFirst[0] - session[1])
+            session[1] = otherFirst[1]
+            session[3] += otherFirst[3]
+            for peerID, numMessages in otherFirst[4].items():
+                session[4][peerID] = session[4].get(peerID, 0) + numMessages
+            if other.lastSession is otherFirst:
+                other.lastSession = session
+            elif session is not self.firstSession:
+                self.closeSession(session)
+        else:
+            if session is not self.firstSession:
+                self.closeSession(session)
+            if other.lastSession is not otherFirst:
+                self.closeSession(otherFirst)
+
+        #Every session other closed comes after the ones closed here
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+        self.initiators.extend(other.initiators)
+        self.messages.extend(other.messages)
+        self.participants.extend(other.participants)
+        for peerID, (joined, started) in other.userSessions.items():
+            if peerID not in self.userSessions:
+                self.userSessions[peerID] = [0, 0]
+            self.userSessions[peerID][0] += joined
+            self.userSessions[peerID][1] += started
+        self.lastSession = other.lastSession
+        self.lastSender = other.lastSender
+
+    def getOpenSessions(self):
+        """
+        Return the sessions still open, first session first
+        """
+        if self.firstSession is None:
+            return []
+        return [self.firstSession] if self.lastSession is self.firstSession else [self.firstSession, self.lastSession]
+
+    def getSessionColumns(self):
+        """
+        Return every session as numpy arrays, in the order (starts, ends, initiators, messages, participants), oldest first
+        """
+        openRows = [(start, end, initiator, numMessages, len(senders)) for start, end, initiator, numMessages, senders in self.getOpenSessions()]
+        columns = []
+        for column, closed in enumerate((self.starts, self.ends, self.initiators, self.messages, self.participants)):
+            columns.append(np.concatenate(([row[column] for row in openRows[:1]], np.frombuffer(closed, dtype = np.int64),
+                                            [row[column] for row in openRows[1:]])).astype(np.int64))
+        return tuple(columns)
+
+    def getUserSessions(self):
+        """
+        Return the number of sessions each user took part in and started {ID : (joined, started)}
+        """
+        userSessions = {peerID: list(counts) for peerID, counts in self.userSessions.items()}
+        for start, end, initiator, numMessages, senders in self.getOpenSessions():
+            self.countUserSessions(userSessions, senders, initiator)
+        return {peerID: tuple(counts) for peerID, counts in userSessions.items()}
+
+    def getReplyMatrix(self):
+        """
+        Return the reply matrix in coordinate form as numpy arrays (senders, responders, replies, total seconds), one
+        entry per pair of people that replied to each other, ordered by sender then responder
+        """
+        pairs = sorted(self.replies)
+        senders = np.array([pair[0] for pair in pairs], dtype = np.int64)
+        responders = np.array([pair[1] for pair in pairs], dtype = np.int64)
+        replies = np.array([self.replies[pair][0] for pair in pairs], dtype = np.int64)
+        seconds = np.array([self.replies[pair][1] for pair in pairs], dtype = np.int64)
+        return senders, responders, replies, seconds
+
+    def getReport(self, peerNames, maxListed = None):
+        """
+        Return the session stats of the whole chat as plain data for report.py
+        peerNames - name of each sender {ID : name}
+        maxListed - most sessions, users and pairs of people listed, the longest sessions and most active ones come first.
+                    None to list every one of them
+        """
+        starts, ends, initiators, messages, participants = self.getSessionColumns()
+        numSessions = len(starts)
+        minutes = (ends - starts) / 60
+
+        listedSessions = heapq.nsmallest(maxListed or numSessions, range(numSessions), key = lambda row: (-messages[row], row))
+        sessions = [{"start": datetime.datetime.fromtimestamp(int(starts[row])).isoformat(),
+                        "end": datetime.datetime.fromtimestamp(int(ends[row])).isoformat(),
+                        "minutes": round(float(minutes[row]), 1), "initiator": int(initiators[row]),
+                        "initiatorName": peerNames.get(int(initiators[row]), str(initiators[row])), "messages": int(messages[row]),
+                        "participants": int(participants[row])} for row in listedSessions]
+
+        userSessions = self.getUserSessions()
+        sessionsByUser = [{"peerID": peerID, "name": peerNames.get(peerID, str(peerID)), "joined": joined, "started": started}
+                            for peerID, (joined, started) in sorted(userSessions.items(), key = lambda entry: (-entry[1][0], entry[0]))]
+
+        topPairs = heapq.nsmallest(maxListed or len(self.replies), self.replies.items(), key = lambda entry: (-entry[1][0], entry[0]))
+        replies = [{"sender": sender, "senderName": peerNames.get(sender, str(sender)), "responder": responder,
+                    "responderName": peerNames.get(responder, str(responder)), "replies": numReplies,
+                    "averageMinutes": round(seconds / numReplies / 60, 2)} for (sender, responder), (numReplies, seconds) in topPairs]
+
+        return {"sessionGap": self.sessionGap, "sessions": numSessions,
+                "averageMessages": round(float(messages.mean()), 1) if numSessions else None,
+                "medianMessages": float(np.median(messages)) if numSessions else None,
+                "averageParticipants": round(float(participants.mean()), 2) if numSessions else None,
+                "averageMinutes": round(float(minutes.mean()), 1) if numSessions else None,
+                "medianMinutes": round(float(np.median(minutes)), 1) if numSessions else None,
+                "replyPairs": len(self.replies), "longestSessions": sessions,
+                "sessionsByUser": sessionsByUser[:maxListed], "topReplies": replies}
@@ -0,0 +1,402 @@
+import os, json, math, datetime
+import numpy as np
+from rollup import messagesTotal, epochOrdinal
+
+#Most points drawn in a time series, longer series are added up into buckets of several days so the page stays light
+maxSeriesPoints = 400
+
+#Users given their own line on the overview charts when maxUsers isn't given, the rest are added up into "Others"
+defaultMaxUsers = 10
+
+#Most people listed under each user's response times once they're opened, see UserData.getReport()
+maxDetailResponses = 10
+
+def downsampleSeries(values, maxPoints = maxSeriesPoints):
+    """
+    Add up runs of neighbouring values so a series has at most maxPoints points
+    Returns (number of values added up into each point, list of points)
+    """
+    values = np.asarray(values)
+    step = max(1, math.ceil(len(values) / maxPoints))
+    padded = np.zeros(math.ceil(len(values) / step) * step, dtype = values.dtype)
+    padded[:len(values)] = values
+    return step, padded.reshape(-1, step).sum(axis = 1).tolist()
+
+def roundSeries(values, digits = 2):
+    return [round(float(value), digits) if value is not None else None for value in values]
+
+def getDailyTimeline(chatData):
+    """
+    Return the messages sent by the users left in chatData on every day from the first message to the last, added up
+    into at most maxSeriesPoints points, as {"start": ISO date, "step": days per point, "values": [...]}. Built from the
+    daily rollup, None without one
+    """
+    rollup = chatData.rollup
+    if rollup is None or rollup.getNumRows() == 0:
+        return None
+    keep = np.isin(rollup.peerIDs, np.array(list(chatData.getUserDict()), dtype = np.int64))
+    if not keep.any():
+        return None
+    days = rollup.days[keep].astype(np.int64)
+    firstDay = int(days.min())
+    dailyMessages = np.bincount(days - firstDay, weights = rollup.totals[keep, messagesTotal]).astype(np.int64)
+    step, values = downsampleSeries(dailyMessages)
+    return {"start": datetime.date.fromordinal(firstDay + epochOrdinal).isoformat(), "step": step, "values": values}
+
+def getMonthSpan(timelines):
+    """
+    Return (first year, number of months) covering every getMonthTimeline() result given, (None, 0) if none of them have any months
+    """
+    spans = [(firstYear, len(months)) for firstYear, months in timelines if firstYear is not None]
+    if not spans:
+        return None, 0
+    firstYear = min(start for start, numMonths in spans)
+    return firstYear, max((start - firstYear) * 12 + numMonths for start, numMonths in spans)
+
+def addMonthTimelines(timelines, firstYear, numMonths):
+    """
+    Add up several getMonthTimeline() results into one list of messages per month starting from January of firstYear
+    """
+    total = np.zeros(numMonths, dtype = np.int64)
+    for start, months in timelines:
+        if start is not None:
+            offset = (start - firstYear) * 12
+            total[offset:offset + len(months)] += months
+    return total.tolist()
+
+def addSeries(seriesList):
+    """
+    Add up equally long series into one
+    """
+    return np.sum(seriesList, axis = 0).tolist() if seriesList else []
+
+def buildDashboard(chatData, trackWordUsage, maxUsers = None, title = ""):
+    """
+    Pull everything the dashboard shows out of chatData
+    Returns (overview, details), overview is a dictionary drawn as soon as the page opens, details is a list of
+    (element id, dictionary) that are only read once someone opens that user or word
+    trackWordUsage - list of tracked words, each gets its own detail
+    maxUsers - number of the most active users drawn on their own on the overview charts, defaults to defaultMaxUsers
+    """
+    userDict = chatData.getUserDict()
+    ranked = sorted(userDict, key = lambda user: (-userDict[user].getNumMessages(), user))
+    topUsers = ranked[:maxUsers or defaultMaxUsers]
+    otherUsers = ranked[maxUsers or defaultMaxUsers:]
+    entryNames = [userDict[user].getFullName() for user in topUsers]
+    entryGroups = [[user] for user in topUsers]
+    if otherUsers:
+        entryNames.append("Others (" + str(len(otherUsers)) + ")")
+        entryGroups.append(otherUsers)
+
+    monthTimelines = {user: userDict[user].getMonthTimeline() for user in ranked}
+    firstYear, numMonths = getMonthSpan(monthTimelines.values())
+    quantiles = []
+    for group in entryGroups:
+        histogram = userDict[group[0]].getResponseHistogram()
+        for user in group[1:]:
+            histogram.merge(userDict[user].getResponseHistogram())
+        quantiles.append(roundSeries([quantile or 0 for quantile in histogram.getQuantiles()]))
+
+    overview = {"title": title, "generated": datetime.datetime.now().isoformat(timespec = "seconds"),
+                "totalMessages": chatData.getTotalMessageCount(), "numUsers": len(userDict),
+                "timeline": getDailyTimeline(chatData), "entries": entryNames,
+                "messages": [sum(userDict[user].getNumMessages() for user in group) for group in entryGroups],
+                "firstYear": firstYear,
+                "months": [addMonthTimelines([monthTimelines[user] for user in group], firstYear, numMonths) for group in entryGroups],
+                "monthOfYear": [addSeries([userDict[user].getAveragedMonthActivity() for user in group]) for group in entryGroups],
+                "hours": [roundSeries(addSeries([userDict[user].getAveragedHourActivity() for user in group])) for group in entryGroups],
+                "responseQuantiles": quantiles,
+                "users": {"ids": ranked, "names": [userDict[user].getFullName() for user in ranked],
+                            "messages": [userDict[user].getNumMessages() for user in ranked],
+                            "words": [userDict[user].totalLength for user in ranked],
+                            "averageResponse": roundSeries([userDict[user].getAverageResponseTime() if userDict[user].numResponses else None
+                                                            for user in ranked])},
+                "words": [], "sessions": None}
+    if chatData.sessionTracker is not None:
+        overview["sessions"] = chatData.sessionTracker.getReport(chatData.peerNames, 10)
+
+    details = []
+    for user in ranked:
+        userReport = userDict[user].getReport(chatData.peerNames, maxDetailResponses)
+        userReport["firstYear"], userReport["monthTimeline"] = monthTimelines[user]
+        details.append(("user-" + str(user), userReport))
+
+    trackedWordsPerUser = {user: userDict[user].getTrackedWords() for user in ranked}
+    for index, word in enumerate(trackWordUsage):
+        usedBy = sorted((user for user in ranked if trackedWordsPerUser[user][word][0]),
+                        key = lambda user: -trackedWordsPerUser[user][word][0])
+        overview["words"].append({"word": word, "id": "word-" + str(index),
+                                    "count": sum(trackedWordsPerUser[user][word][0] for user in usedBy)})
+        wordTimelines = {user: trackedWordsPerUser[user][word][1].getMonthTimeline() for user in ranked}
+        wordFirstYear, wordMonths = getMonthSpan(wordTimelines.values())
+        details.append(("word-" + str(index), {"word": word, "firstYear": wordFirstYear, "entries": entryNames,
+                        "months": [addMonthTimelines([wordTimelines[user] for user in group], wordFirstYear, wordMonths)
+                                    for group in entryGroups],
+                        "monthOfYear": [addSeries([trackedWordsPerUser[user][word][1].getAveragedMonthActivity() for user in group])
+                                        for group in entryGroups],
+                        "users": [[userDict[user].getFullName(), trackedWordsPerUser[user][word][0]] for user in usedBy]}))
+    return overview, details
+
+def encodeScript(data):
+    """
+    Turn data into JSON that can sit inside of a script tag without ending it early
+    """
+    return json.dumps(data, ensure_ascii = False, separators = (",", ":")).replace("</", "<\\/")
+
+def writeDashboard(chatData, outputFile, trackWordUsage, maxUsers = None, title = ""):
+    """
+    Write a single self contained HTML page with interactive charts of chatData, see buildDashboard()
+    outputFile - text file to write to
+    """
+    overview, details = buildDashboard(chatData, trackWordUsage, maxUsers, title)
+    outputFile.write(pageStart.replace("TITLE", title.replace("&", "&amp;").replace("<", "&lt;")))
+    outputFile.write('<script type="application/json" id="overview">' + encodeScript(overview) + "</script>\n")
+    #Details stay as unparsed text until they're opened, so even chats with thousands of users open right away
+    for elementID, detail in details:
+        outputFile.write('<script type="application/json" id="' + elementID + '">' + encodeScript(detail) + "</script>\n")
+    outputFile.write(pageEnd)
+
+def saveDashboard(chatData, path, trackWordUsage, maxUsers = None):
+    """
+    Write the dashboard of chatData to path, titled after the file name
+    """
+    with open(path, "w", encoding = "utf8", buffering = 1 << 20) as outputFile:
+        writeDashboard(chatData, outputFile, trackWordUsage, maxUsers, os.path.splitext(os.path.basename(path))[0])
+
+pageStart = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>TITLE</title>
+<style>
+body { font-family: sans-serif; margin: 0 auto; max-width: 1200px; padding: 1em; color: #222; }
+h1 { margin-bottom: 0; }
+.note { color: #777; font-size: 0.9em; }
+.grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(540px, 1fr)); gap: 1em; }
+.chart { border: 1px solid #ddd; border-radius: 4px; padding: 0.5em; }
+.chart h3 { margin: 0 0 0.3em 0; font-size: 1em; }
+.legend span { display: inline-block; margin-right: 1em; font-size: 0.8em; }
+.legend i { display: inline-block; width: 0.8em; height: 0.8em; margin-right: 0.3em; }
+table { border-collapse: collapse; width: 100%; font-size: 0.9em; }
+th, td { text-align: left; padding: 0.2em 0.5em; border-bottom: 1px solid #eee; }
+tr.pick { cursor: pointer; }
+tr.pick:hover { background: #f3f6fb; }
+#detail { margin-top: 1em; }
+svg text { font-size: 10px; fill: #555; }
+</style>
+</head>
+<body>
+"""
+
+pageEnd = """<div id="page"></div>
+<script>
+"use strict";
+var colors = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf", "#aaaaaa"];
+var monthNames = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
+var loaded = {};
+
+//Details are kept as JSON text in the page and only parsed the first time they're opened
+function load(id) {
+    if (!(id in loaded)) {
+        var element = document.getElementById(id);
+        loaded[id] = element ? JSON.parse(element.textContent) : null;
+    }
+    return loaded[id];
+}
+
+function make(tag, attributes, parent) {
+    var isSvg = ["svg", "path", "rect", "text", "line", "title"].indexOf(tag) != -1;
+    var element = isSvg ? document.createElementNS("http://www.w3.org/2000/svg", tag) : document.createElement(tag);
+    for (var key in attributes || {}) {
+        if (key == "text") element.textContent = attributes[key];
+        else element.setAttribute(key, attributes[key]);
+    }
+    if (parent) parent.appendChild(element);
+    return element;
+}
+
+function chartBox(parent, title) {
+    var box = make("div", {"class": "chart"}, parent);
+    make("h3", {text: title}, box);
+    return box;
+}
+
+function legend(box, names) {
+    var row = make("div", {"class": "legend"}, box);
+    names.forEach(function (name, index) {
+        var item = make("span", {}, row);
+        make("i", {style: "background:" + colors[index % colors.length]}, item);
+        item.appendChild(document.createTextNode(name));
+    });
+}
+
+//Draw one or more series as lines over shared labels, only every few labels are written out when there are many
+function lineChart(parent, title, labels, series, names) {
+    var box = chartBox(parent, title);
+    var width = 540, height = 220, left = 40, bottom = 20;
+    var svg = make("svg", {viewBox: "0 0 " + width + " " + height, width: "100%"}, box);
+    var highest = Math.max(1, Math.max.apply(null, series.map(function (values) { return Math.max.apply(null, values.concat([0])); })));
+    var x = function (index) { return left + (width - left - 5) * (labels.length > 1 ? index / (labels.length - 1) : 0.5); };
+    var y = function (value) { return (height - bottom) * (1 - value / highest) + 5; };
+    make("text", {x: 0, y: 12, text: (Math.round(highest * 100) / 100).toString()}, svg);
+    make("line", {x1: left, x2: width, y1: y(0), y2: y(0), stroke: "#ccc"}, svg);
+    var labelEvery = Math.max(1, Math.ceil(labels.length / 12));
+    labels.forEach(function (label, index) {
+        if (index % labelEvery == 0) make("text", {x: x(index), y: height - 3, "text-anchor": "middle", text: label}, svg);
+    });
+    series.forEach(function (values, seriesIndex) {
+        var points = values.map(function (value, index) { return (index ? "L" : "M") + x(index).toFixed(1) + "," + y(value).toFixed(1); });
+        var path = make("path", {d: points.join(""), fill: "none", stroke: colors[seriesIndex % colors.length], "stroke-width": 1.5}, svg);
+        if (names) make("title", {text: names[seriesIndex]}, path);
+    });
+    if (names) legend(box, names);
+}
+
+//Draw groups of bars, one group per label and one bar per series in each group
+function barChart(parent, title, labels, series, names) {
+    var box = chartBox(parent, title);
+    var width = 540, height = 220, left = 40, bottom = 20;
+    var svg = make("svg", {viewBox: "0 0 " + width + " " + height, width: "100%"}, box);
+    var highest = Math.max(1, Math.max.apply(null, series.map(function (values) { return Math.max.apply(null, values.concat([0])); })));
+    var groupWidth = (width - left) / Math.max(1, labels.length);
+    var barWidth = groupWidth * 0.8 / series.length;
+    make("text", {x: 0, y: 12, text: (Math.round(highest * 100) / 100).toString()}, svg);
+    labels.forEach(function (label, index) {
+        series.forEach(function (values, seriesIndex) {
+            var barHeight = (height - bottom - 5) * values[index] / highest;
+            var bar = make("rect", {x: left + groupWidth * (index + 0.1) + barWidth * seriesIndex, y: height - bottom - barHeight,
+                                    width: barWidth, height: barHeight, fill: colors[(series.length > 1 ? seriesIndex : index) % colors.length]}, svg);
+            make("title", {text: label + (names ? " " + names[seriesIndex] : "") + ": " + values[index]}, bar);
+        });
+        if (groupWidth > 30) make("text", {x: left + groupWidth * (index + 0.5), y: height - 3, "text-anchor": "middle", text: label.slice(0, 14)}, svg);
+    });
+    if (names) legend(box, names);
+}
+
+function monthLabels(firstYear, count) {
+    var labels = [];
+    for (var index = 0; index < count; index++) labels.push(monthNames[index % 12] + " " + (firstYear + Math.floor(index / 12)));
+    return labels;
+}
+
+function range(count) {
+    var values = [];
+    for (var index = 0; index < count; index++) values.push(index);
+    return values;
+}
+
+function table(parent, header, rows, onPick) {
+    var element = make("table", {}, parent);
+    var headRow = make("tr", {}, element);
+    header.forEach(function (name) { make("th", {text: name}, headRow); });
+    rows.forEach(function (row) {
+        var tableRow = make("tr", onPick ? {"class": "pick"} : {}, element);
+        row.cells.forEach(function (cell) { make("td", {text: cell === null ? "-" : cell}, tableRow); });
+        if (onPick) tableRow.addEventListener("click", function () { onPick(row.id); });
+    });
+    return element;
+}
+
+function showUser(id) {
+    var user = load("user-" + id);
+    var detail = document.getElementById("detail");
+    detail.innerHTML = "";
+    make("h2", {text: user.name}, detail);
+    make("p", {text: user.messages + " messages, " + user.words + " words, " + user.pics + " pictures, " + user.docs + " files, " +
+                     user.links + " links. Active " + user.activeDays + " of " + user.spanDays + " days, longest streak " +
+                     user.longestStreak + " days. Median response " + (user.medianResponseTime === null ? "-" :
+                     user.medianResponseTime.toFixed(2) + " minutes")}, detail);
+    var grid = make("div", {"class": "grid"}, detail);
+    if (user.monthTimeline.length) lineChart(grid, "Messages per Month", monthLabels(user.firstYear, user.monthTimeline.length), [user.monthTimeline]);
+    lineChart(grid, "Average Messages per Hour of Day", range(24).map(String), [range(24).map(function (hour) {
+        var entry = user.hours.filter(function (item) { return item.hour == hour; })[0];
+        return entry ? entry.averageMessages : 0;
+    })]);
+    barChart(grid, "Average Messages per Weekday", user.weekdays.map(function (item) { return item.weekday; }),
+             [user.weekdays.map(function (item) { return Math.round(item.averageMessages * 100) / 100; })]);
+    if (user.responsesByPerson.length) {
+        var box = chartBox(grid, "Response Times per Person Replied To (Minutes)");
+        table(box, ["Person", "Responses", "Median", "90th", "99th"], user.responsesByPerson.map(function (person) {
+            return {cells: [person.name, person.responses, person.median, person.percentile90, person.percentile99]};
+        }));
+    }
+    if (user.topWords) {
+        var wordBox = chartBox(grid, "Most Used Words");
+        table(wordBox, ["Word", "Times Used"], user.topWords.map(function (item) { return {cells: [item.text, item.count]}; }));
+    }
+    detail.scrollIntoView();
+}
+
+function showWord(id) {
+    var word = load(id);
+    var detail = document.getElementById("detail");
+    detail.innerHTML = "";
+    make("h2", {text: "Usage of \\"" + word.word + "\\""}, detail);
+    var grid = make("div", {"class": "grid"}, detail);
+    lineChart(grid, "Average Times Used per Month of the Year", monthNames, word.monthOfYear, word.entries);
+    if (word.firstYear !== null) lineChart(grid, "Times Used per Month", monthLabels(word.firstYear, word.months[0].length), word.months, word.entries);
+    var box = chartBox(grid, "Used By");
+    table(box, ["User", "Times Used"], word.users.slice(0, 100).map(function (item) { return {cells: item}; }));
+    detail.scrollIntoView();
+}
+
+function showUserTable(parent, users, filter) {
+    parent.innerHTML = "";
+    var rows = [];
+    for (var index = 0; index < users.ids.length && rows.length < 200; index++) {
+        if (filter && users.names[index].toLowerCase().indexOf(filter) == -1) continue;
+        rows.push({id: users.ids[index], cells: [users.names[index], users.ids[index], users.messages[index], users.words[index], users.averageResponse[index]]});
+    }
+    table(parent, ["Name", "Peer ID", "Messages", "Words", "Average Response (Minutes)"], rows, showUser);
+}
+
+function showOverview() {
+    var overview = load("overview");
+    var page = document.getElementById("page");
+    make("h1", {text: overview.title || "TeleGraph"}, page);
+    make("p", {"class": "note", text: overview.totalMessages + " messages from " + overview.numUsers + " users, made " + overview.generated}, page);
+    var grid = make("div", {"class": "grid"}, page);
+    if (overview.timeline) {
+        var start = new Date(overview.timeline.start + "T00:00:00");
+        var labels = overview.timeline.values.map(function (value, index) {
+            var day = new Date(start.getTime() + index * overview.timeline.step * 86400000);
+            return day.toISOString().slice(0, 10);
+        });
+        lineChart(grid, "Messages Sent" + (overview.timeline.step > 1 ? " per " + overview.timeline.step + " Days" : " per Day"), labels, [overview.timeline.values]);
+    }
+    barChart(grid, "Total Messages Sent", overview.entries, [overview.messages]);
+    if (overview.firstYear !== null) lineChart(grid, "Messages Sent per Month", monthLabels(overview.firstYear, overview.months[0].length), overview.months, overview.entries);
+    lineChart(grid, "Average Messages Sent per Month of the Year", monthNames, overview.monthOfYear, overview.entries);
+    lineChart(grid, "Average Messages Sent per Hour of Day", range(24).map(String), overview.hours, overview.entries);
+    barChart(grid, "Response Time Percentiles (Minutes)", overview.entries, [0, 1, 2].map(function (index) {
+        return overview.responseQuantiles.map(function (quantiles) { return quantiles[index]; });
+    }), ["Median", "90th Percentile", "99th Percentile"]);
+
+    if (overview.sessions) {
+        var sessions = overview.sessions;
+        var sessionBox = chartBox(grid, sessions.sessions + " Sessions, Split by " + sessions.sessionGap + " Minutes of Silence");
+        make("p", {text: "Median of " + sessions.medianMessages + " messages and " + sessions.medianMinutes + " minutes, " +
+                         sessions.averageParticipants + " people on average"}, sessionBox);
+        table(sessionBox, ["Responder", "Replied To", "Replies", "Average Minutes"], sessions.topReplies.map(function (pair) {
+            return {cells: [pair.responderName, pair.senderName, pair.replies, pair.averageMinutes]};
+        }));
+    }
+
+    if (overview.words.length) {
+        make("h2", {text: "Tracked Words"}, page);
+        table(page, ["Word", "Times Used"], overview.words.map(function (word) { return {id: word.id, cells: [word.word, word.count]}; }), showWord);
+    }
+
+    make("h2", {text: "Users"}, page);
+    var search = make("input", {type: "search", placeholder: "Filter by name"}, page);
+    var userTable = make("div", {}, page);
+    search.addEventListener("input", function () { showUserTable(userTable, overview.users, search.value.toLowerCase()); });
+    showUserTable(userTable, overview.users, "");
+    make("div", {id: "detail"}, page);
+}
+
+showOverview();
+</script>
+</body>
+</html>
+"""
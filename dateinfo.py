@@ -1,29 +1,94 @@
 import datetime
+from array import array
 from datetime import datetime
+from collections import namedtuple
+
+#Every calendar field TeleGraph needs from a time stamp, in local time. weekday goes from 0-6 starting on Monday and day
+#counts days since 1970-01-01
+CalendarDate = namedtuple("CalendarDate", ["year", "month", "dayOfYear", "weekday", "hour", "day"])
+
+#datetime.toordinal() of 1970-01-01
+epochOrdinal = 719163
+
+#Time zone offsets only ever change on quarter hours, so every time stamp in the same quarter hour lands on the same
+#calendar date and hour. Dates are cached per quarter hour {UNIX TIME CODE // 900 : CalendarDate}
+calendarCache = dict()
+calendarCacheLimit = 1 << 18
+
+def getCalendarDate(timeStamp):
+    """
+    Return the CalendarDate of a unix time stamp, only building a datetime the first time a quarter hour is seen
+    """
+    quarterHour = timeStamp // 900
+    calendarDate = calendarCache.get(quarterHour)
+    if calendarDate is None:
+        if len(calendarCache) >= calendarCacheLimit:
+            calendarCache.clear()
+        localTime = datetime.fromtimestamp(quarterHour * 900)
+        calendarDate = CalendarDate(localTime.year, localTime.month, localTime.timetuple().tm_yday, localTime.weekday(), localTime.hour,
+                                    localTime.toordinal() - epochOrdinal)
+        calendarCache[quarterHour] = calendarDate
+    return calendarDate
+
+#Layout of ActivityInfo.counts, the total messages and number of unique days of every weekday and hour
+weekdayTotals = 0
+weekdayDays = 7
+hourTotals = 14
+hourDays = 38
+numCounts = 62
+
+#Layout of ActivityInfo.hourSpans, the first and last day each hour was seen on in days since 1970-01-01
+hourFirstSeen = 0
+hourLastSeen = 24
+numHourSpans = 48
+
+#Bits of every possible byte of a day bitmap as a string of 0s and 1s, earliest day first
+dayBits = [format(byte, "08b")[::-1] for byte in range(256)]
 
 class ActivityInfo(object):
     """
     Class for holding all time related info for any object. Will keep track of times occurred per month/week/weekday. Unix 
-    Timestamp Required 
+    Timestamp Required. There is one of these for every user and every tracked word, so every count is kept in a few flat
+    arrays that are only created once the first timestamp comes in, use the getters to read them
     """
+    __slots__ = ("counts", "hourSpans", "months", "firstYear", "activeDays", "firstDay", "numActiveDays")
     
     def __init__(self):
         """
-        monthActivity - Number of messages per month, split up by years exp: {2017:{1:234}} Y, M, numMessage
-        weekdayActivity - Number of messages for a certain day of the week, not split up by year
-                        dict containing an array of 2 integers exp: {0: [123, 5]}, Sunday: [Total Messages, Unique Sundays]
-        hourActivity -  Number of messages sent for an hour interval, dict with keys ranging from 0-23 each containing
-                        an array of size 2 exp: {0: [53: 2]} {12AM [Total Messages, Number of Unique 12 AMs]} 
-        mostRecentDay - Day of the year most recently processed,
-                        used for counting how many unique days have 
-                        been counted for averaging 
+        counts - total messages and unique days for each weekday and hour, laid out as described by weekdayTotals,
+                        weekdayDays, hourTotals and hourDays above. A weekday or hour with no messages hasn't been seen yet
+        hourSpans - first and last day each hour was seen on, needed to count unique days per hour and to line them up in
+                        mergeActivity()
+        months - number of messages per month, one entry per month starting from January of firstYear
+        firstYear - earliest year seen
+        counts, hourSpans, months and firstYear are None until the first timestamp
+        activeDays - bitmap of every local day with at least one timestamp, bit n of the bitmap stands for firstDay + n
+        firstDay - day the first bit of activeDays stands for in days since 1970-01-01, always a multiple of 8 so two
+                        bitmaps line up on whole bytes
+        numActiveDays - number of bits set in activeDays
         """
-        self.monthActivity = dict()
-        self.weekdayActivity = dict()
-        self.hourActivity = dict()
-        self.mostRecentDay = 0
-        self.mostRecentDayHour = 0
+        self.counts = None
+        self.hourSpans = None
+        self.months = None
+        self.firstYear = None
+        self.activeDays = None
+        self.firstDay = None
+        self.numActiveDays = 0
+
+    def __getstate__(self):
+        return (self.counts, self.hourSpans, self.months, self.firstYear, self.activeDays, self.firstDay, self.numActiveDays)
 
+    def __setstate__(self, state):
+        self.counts, self.hourSpans, self.months, self.firstYear, self.activeDays, self.firstDay, self.numActiveDays = state
+
+    def startCounting(self, year):
+        """
+        Create the count arrays, called with the year of the first timestamp
+        """
+        self.counts = array('i', bytes(4 * numCounts))
+        self.hourSpans = array('i', bytes(4 * numHourSpans))
+        self.months = array('i', bytes(4 * 12))
+        self.firstYear = year
 
     def updateActivity(self, timeStamp):
         """
@@ -31,52 +96,177 @@ class ActivityInfo(object):
         instance variables 
         timeStamp - unix time stamp 
         """
-        self.updateMonth(timeStamp)
-        self.updateWeekday(timeStamp)
-        self.updateHours(timeStamp)
-    
-    def updateMonth(self, timeStamp):
-        month = datetime.fromtimestamp(timeStamp).month
-        year = datetime.fromtimestamp(timeStamp).year
-        #If this year doesn't exist in monthActivity add it as a key and store a dict containing 
-        #the month and 1 message
-        if year not in self.monthActivity:
-            self.monthActivity[year] = {month:1}
-        else:
-            if month not in self.monthActivity[year]:
-                self.monthActivity[year][month] = 1 #New month found in an existing year
-            else:
-                self.monthActivity[year][month]+=1  #Existing year and month found, increment message count
-        pass
+        calendarDate = getCalendarDate(timeStamp)
+        if self.counts is None:
+            self.startCounting(calendarDate.year)
+        self.updateMonth(calendarDate)
+        self.updateWeekday(calendarDate)
+        self.updateHours(calendarDate)
     
-    def updateWeekday(self, timeStamp):
-        weekday = datetime.fromtimestamp(timeStamp).weekday()
-        dayofYear = datetime.fromtimestamp(timeStamp).timetuple()[6] #Integer of the day of the year from 1-365
-        if weekday not in self.weekdayActivity:
-            self.weekdayActivity[weekday] = [1, 1]    #First occurence of a weekday initialize array
-        else:
-            if dayofYear != self.mostRecentDay:
-                self.weekdayActivity[weekday][1] += 1 #Encountered a new occurence of this weekday, increment count
-            self.weekdayActivity[weekday][0] += 1     #Update total messages for that weekday
-        self.mostRecentDay = dayofYear
-    
-    def updateHours(self, timeStamp):
-        hour = datetime.fromtimestamp(timeStamp).hour
-        currDay = datetime.fromtimestamp(timeStamp).timetuple()[6]
-        if hour not in self.hourActivity:
-            self.hourActivity[hour] = [1,1]
-        else: 
-            if currDay != self.mostRecentDayHour:
-                self.hourActivity[hour][1] += 1
-            self.hourActivity[hour][0] += 1
-        self.mostRecentDayHour = currDay
+    def updateMonth(self, calendarDate):
+        index = (calendarDate.year - self.firstYear) * 12 + calendarDate.month - 1
+        if 0 <= index < len(self.months):
+            self.months[index] += 1
+        else: #New year, make room for it
+            self.addMonthCount(calendarDate.year, calendarDate.month, 1)
+
+    def addMonthCount(self, year, month, count):
+        """
+        Add count messages to a month, making room for its year if it hasn't been seen before
+        """
+        if self.counts is None:
+            self.startCounting(year)
+        elif year < self.firstYear: #Only happens when merging out of order, shift everything over to make room
+            self.months = array('i', bytes(4 * 12 * (self.firstYear - year))) + self.months
+            self.firstYear = year
+        index = (year - self.firstYear) * 12 + month - 1
+        if index >= len(self.months):
+            self.months.extend(array('i', bytes(4 * ((year - self.firstYear + 1) * 12 - len(self.months)))))
+        self.months[index] += count
+
+    def updateWeekday(self, calendarDate):
+        if self.markDay(calendarDate.day):
+            self.counts[weekdayDays + calendarDate.weekday] += 1 #Encountered a new occurence of this weekday
+        self.counts[weekdayTotals + calendarDate.weekday] += 1
     
+    def updateHours(self, calendarDate):
+        hour = calendarDate.hour
+        counts = self.counts
+        #Timestamps come in order, so an hour is on a new day whenever it was last seen on a different one
+        if counts[hourTotals + hour] == 0:
+            self.hourSpans[hourFirstSeen + hour] = calendarDate.day
+            counts[hourDays + hour] = 1
+        elif self.hourSpans[hourLastSeen + hour] != calendarDate.day:
+            counts[hourDays + hour] += 1
+        self.hourSpans[hourLastSeen + hour] = calendarDate.day
+        counts[hourTotals + hour] += 1
+
+    def markDay(self, day):
+        """
+        Set the bit of a day in activeDays, growing the bitmap in either direction if needed
+        Returns True if the day wasn't active before
+        day - local day in days since 1970-01-01
+        """
+        if self.activeDays is None:
+            self.firstDay = day - day % 8
+            self.activeDays = bytearray()
+        elif day < self.firstDay: #Only happens with timestamps out of order
+            numBytes = (self.firstDay - day + 7) // 8
+            self.activeDays[0:0] = bytes(numBytes)
+            self.firstDay -= 8 * numBytes
+        offset = day - self.firstDay
+        index = offset >> 3
+        if index >= len(self.activeDays):
+            self.activeDays.extend(bytes(index + 1 - len(self.activeDays)))
+        bit = 1 << (offset & 7)
+        if self.activeDays[index] & bit:
+            return False
+        self.activeDays[index] |= bit
+        self.numActiveDays += 1
+        return True
+
+    def setWeekday(self, weekday, count, uniqueDays):
+        """
+        Fill in a weekday that hasn't been seen yet all at once, used by EventStore
+        """
+        self.counts[weekdayTotals + weekday] = count
+        self.counts[weekdayDays + weekday] = uniqueDays
+
+    def setHour(self, hour, count, uniqueDays, firstDay, lastDay):
+        """
+        Fill in an hour that hasn't been seen yet all at once, also used by EventStore
+        firstDay - day the hour was first seen on
+        lastDay - day the hour was last seen on
+        """
+        self.hourSpans[hourFirstSeen + hour] = firstDay
+        self.hourSpans[hourLastSeen + hour] = lastDay
+        self.counts[hourTotals + hour] = count
+        self.counts[hourDays + hour] = uniqueDays
+
+    def setActiveDays(self, firstDay, activeDays, numActiveDays):
+        """
+        Fill in the day bitmap all at once, used by EventStore
+        firstDay - day the first bit stands for, must be a multiple of 8
+        """
+        self.firstDay = firstDay
+        self.activeDays = bytearray(activeDays)
+        self.numActiveDays = numActiveDays
+
+    def hasActivity(self):
+        """
+        Check if any timestamp has been counted yet
+        """
+        return self.numActiveDays > 0
+
+    def mergeActivity(self, other):
+        """
+        Fold the activity of another ActivityInfo into this one. other must hold the timestamps processed right after the
+        ones held here so that unique days per hour come out the same as if every timestamp had gone through this object
+        other - ActivityInfo object built from the next chunk of timestamps
+        """
+        if not other.hasActivity():
+            return
+
+        for index, count in enumerate(other.months):
+            if count != 0:
+                self.addMonthCount(other.firstYear + index // 12, index % 12 + 1, count)
+
+        for weekday in range(7):
+            self.counts[weekdayTotals + weekday] += other.counts[weekdayTotals + weekday]
+            self.counts[weekdayDays + weekday] += other.counts[weekdayDays + weekday]
+        for day in self.mergeDays(other): #Days both objects were active on were counted twice
+            self.counts[weekdayDays + (day + 3) % 7] -= 1 #1970-01-01 was a Thursday
+
+        for hour in range(24):
+            if other.counts[hourTotals + hour] == 0:
+                continue
+            if self.counts[hourTotals + hour] == 0:
+                self.setHour(hour, other.counts[hourTotals + hour], other.counts[hourDays + hour],
+                                other.hourSpans[hourFirstSeen + hour], other.hourSpans[hourLastSeen + hour])
+                continue
+            self.counts[hourTotals + hour] += other.counts[hourTotals + hour]
+            self.counts[hourDays + hour] += other.counts[hourDays + hour]
+            if other.hourSpans[hourFirstSeen + hour] == self.hourSpans[hourLastSeen + hour]: #Day split between both chunks
+                self.counts[hourDays + hour] -= 1
+            self.hourSpans[hourLastSeen + hour] = other.hourSpans[hourLastSeen + hour]
+
+    def mergeDays(self, other):
+        """
+        Helper for mergeActivity(), combines the day bitmap of other with this one
+        Returns every day both objects were active on
+        """
+        if self.activeDays is None:
+            self.setActiveDays(other.firstDay, other.activeDays, other.numActiveDays)
+            return []
+
+        #Bitmaps always start on a multiple of 8, so shifting them to a common first day keeps whole bytes lined up
+        firstDay = min(self.firstDay, other.firstDay)
+        ours = int.from_bytes(self.activeDays, "little") << (self.firstDay - firstDay)
+        theirs = int.from_bytes(other.activeDays, "little") << (other.firstDay - firstDay)
+        sharedDays = []
+        shared = ours & theirs
+        while shared:
+            lowestBit = shared & -shared
+            sharedDays.append(firstDay + lowestBit.bit_length() - 1)
+            shared ^= lowestBit
+
+        merged = ours | theirs
+        self.setActiveDays(firstDay, merged.to_bytes((merged.bit_length() + 7) // 8, "little"),
+                            self.numActiveDays + other.numActiveDays - len(sharedDays))
+        return sharedDays
 
     def getMonthActivity(self):
         """
-        Return the month activity dictionary
+        Return the month activity dictionary, number of messages per month split up by years exp: {2017:{1:234}} Y, M, numMessage
         """
-        return self.monthActivity
+        monthActivity = dict()
+        for index, count in enumerate(self.months or []):
+            if count != 0:
+                year = self.firstYear + index // 12
+                if year not in monthActivity:
+                    monthActivity[year] = dict()
+                monthActivity[year][index % 12 + 1] = count
+        return monthActivity
 
 
     def getMonthActivityByYear(self):
@@ -85,60 +275,95 @@ class ActivityInfo(object):
         {2017:[1234, 1200 ... 2345]}
         """
         monthActByYear = dict() 
-        for year in self.monthActivity:
-            if year not in monthActByYear:
-                monthList = [0,0,0,0,0,0,0,0,0,0,0,0]
-                for month in self.monthActivity[year]:
-                    monthList[month-1] = self.monthActivity[year][month]
-                monthActByYear[year] = monthList
+        for start in range(0, len(self.months or []), 12):
+            monthList = self.months[start:start + 12].tolist()
+            if any(monthList):
+                monthActByYear[self.firstYear + start // 12] = monthList
 
         return monthActByYear
 
 
+    def getMonthTimeline(self):
+        """
+        Return (firstYear, list of messages sent each month starting from January of firstYear), (None, []) if there are none
+        """
+        return self.firstYear, self.months.tolist() if self.months is not None else []
+
     def getAveragedMonthActivity(self):
         """
         Return an array with average number of messages per month, index refers to months in order
         0 - January , 11 - December
         """
-        monthAct = self.monthActivity
-        monthTotalsTemp = dict() #Store a local dictionary with each month holding an array with total messages and unique months
         monthAveraged = [0,0,0,0,0,0,0,0,0,0,0,0] #Final array to return with only the averages
-        for year in monthAct: 
-            for month in monthAct[year]: 
-                if month not in monthTotalsTemp: #Found a new month
-                    monthTotalsTemp[month] = [monthAct[year][month], 1] #for this month: [number of messages: 1]
-                else: #Found another occurence of this month in a different year
-                    monthTotalsTemp[month][0] += monthAct[year][month]  #Add the number of messages from that month
-                    monthTotalsTemp[month][1] += 1 #Found this month in a new year, increment number of unique occurences 
-        
-        for month in sorted(monthTotalsTemp.keys(), reverse = False):
-            monthAveraged[month-1]=(round(monthTotalsTemp[month][0]/monthTotalsTemp[month][1]))
+        for month in range(12 if self.months is not None else 0):
+            monthCounts = [count for count in self.months[month::12] if count != 0] #Only years this month was active in count
+            if monthCounts:
+                monthAveraged[month] = round(sum(monthCounts) / len(monthCounts))
          
         return monthAveraged
 
     def getWeekdayActivity(self):
-        return self.weekdayActivity
+        """
+        Return a dictionary of every weekday seen, each holding [Total Messages, Unique Days] exp: {0: [123, 5]}
+        """
+        return {weekday: [self.counts[weekdayTotals + weekday], self.counts[weekdayDays + weekday]] for weekday in range(7)
+                    if self.counts is not None and self.counts[weekdayTotals + weekday] != 0}
     
     def getHourActivity(self):
-        return self.hourActivity
+        """
+        Return a dictionary of every hour seen, each holding [Total Messages, Unique Days] exp: {0: [53, 2]}
+        """
+        return {hour: [self.counts[hourTotals + hour], self.counts[hourDays + hour]] for hour in range(24)
+                    if self.counts is not None and self.counts[hourTotals + hour] != 0}
 
     def getAveragedHourActivity(self):
         """
-        Return an array with the average number of messages sent for a particular hour for a day. Returned array will be of length 24 with 
-        each index referring to the particular hour the average corresponds to
+        Return an array with the average number of messages sent for a particular hour over every active day. Returned array
+        will be of length 24 with each index referring to the particular hour the average corresponds to
         """
         averagedHourActivity = [0] * 24
-        weekAct = self.weekdayActivity
-        firstAvailableWeekDay = 0
-
-        for weekDay in weekAct:
-            firstAvailableWeekDay = weekDay
-            break
-
-        numDays = weekAct[firstAvailableWeekDay][1] * 7
-        hourAct = self.hourActivity
-        for hour in sorted(hourAct.keys()): 
-            avgMessage = hourAct[hour][0]/numDays
-            averagedHourActivity[hour] = avgMessage
+        if not self.hasActivity():
+            return averagedHourActivity
+
+        for hour in range(24):
+            if self.counts[hourTotals + hour] != 0:
+                averagedHourActivity[hour] = self.counts[hourTotals + hour]/self.numActiveDays
         
-        return averagedHourActivity
\ No newline at end of file
+        return averagedHourActivity
+
+    def getActiveDayCount(self):
+        """
+        Return the number of unique days with at least one timestamp
+        """
+        return self.numActiveDays
+
+    def isActiveOn(self, date):
+        """
+        Check if there was a timestamp on a date
+        date - datetime.date in local time
+        """
+        if not self.hasActivity():
+            return False
+        offset = date.toordinal() - epochOrdinal - self.firstDay
+        return 0 <= offset < 8 * len(self.activeDays) and bool(self.activeDays[offset >> 3] & (1 << (offset & 7)))
+
+    def getActiveDayStats(self):
+        """
+        Return a dictionary of statistics about the days with at least one timestamp, all in days
+        activeDays - number of active days
+        spanDays - days from the first active day to the last, both included
+        longestStreak - most active days in a row
+        longestGap - most inactive days in a row between two active days
+        lastStreak - active days in a row ending on the last active day
+        """
+        stats = {"activeDays": self.numActiveDays, "spanDays": 0, "longestStreak": 0, "longestGap": 0, "lastStreak": 0}
+        if not self.hasActivity():
+            return stats
+
+        dayString = "".join([dayBits[byte] for byte in self.activeDays]).strip("0")
+        streaks = dayString.split("0")
+        stats["spanDays"] = len(dayString)
+        stats["longestStreak"] = max(map(len, streaks))
+        stats["longestGap"] = max(map(len, dayString.split("1")))
+        stats["lastStreak"] = len(streaks[-1])
+        return stats
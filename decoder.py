@@ -0,0 +1,144 @@
+import sys, json, time
+
+#Optional faster JSON parsers, used in the order listed in decoderBackends when installed
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+decoderBackends = ["orjson", "simdjson", "json"]
+
+#Fields of the sender and media objects TeleGraph reads, the rest are left unparsed by simdjson
+senderFields = ("peer_id", "first_name", "last_name", "print_name")
+mediaFields = ("type", "caption", "url")
+
+#Only message events are used, and every one of them holds "message" as its event, other lines can be skipped unparsed
+messageMarker = b'"message"'
+
+def getAvailableBackends():
+    """
+    Return the names of every JSON backend that can be used on this machine, fastest first
+    """
+    installed = {"simdjson": simdjson is not None, "orjson": orjson is not None, "json": True}
+    return [backend for backend in decoderBackends if installed[backend]]
+
+class MessageDecoder(object):
+    """
+    Class used to turn lines of a dump into message dictionaries as fast as possible. Lines that can't be a message event
+    are skipped before being parsed, and only the fields TeleGraph uses are pulled out (event, date, from, text, media)
+    """
+
+    def __init__(self, backend = "auto"):
+        """
+        backend - "auto" to use the fastest installed parser, or one of "orjson", "simdjson" or "json"
+        """
+        if backend == "auto":
+            backend = getAvailableBackends()[0]
+        if backend not in getAvailableBackends():
+            raise ValueError("JSON backend " + backend + " is not installed, available backends: " + ", ".join(getAvailableBackends()))
+
+        self.backend = backend
+        if backend == "simdjson":
+            self.parser = simdjson.Parser()
+            self.decode = self.decodeSimdjson
+        elif backend == "orjson":
+            self.decode = self.decodeOrjson
+        else:
+            self.decode = self.decodeJson
+
+    def __getstate__(self):
+        #simdjson parsers can't be pickled, build a new one when sent to another process
+        return {"backend": self.backend}
+
+    def __setstate__(self, state):
+        self.__init__(state["backend"])
+
+    def decodeJson(self, line):
+        """
+        Return the message held in line as a dictionary, or None if line isn't a message event
+        line - bytes or string holding one JSON object
+        """
+        if messageMarker not in toBytes(line):
+            return None
+        messageData = json.loads(line)
+        return messageData if messageData.get("event") == "message" else None
+
+    def decodeOrjson(self, line):
+        """
+        Same as decodeJson() using orjson
+        """
+        line = toBytes(line)
+        if messageMarker not in line:
+            return None
+        messageData = orjson.loads(line)
+        return messageData if messageData.get("event") == "message" else None
+
+    def decodeSimdjson(self, line):
+        """
+        Same as decodeJson() using simdjson, which parses lazily so only the fields used are ever turned into python objects
+        """
+        line = toBytes(line)
+        if messageMarker not in line:
+            return None
+        document = self.parser.parse(line)
+        if document.get("event") != "message":
+            return None
+
+        #Objects returned by simdjson are only valid until the next parse, copy out what we need
+        messageData = {"event": "message", "date": document["date"], "from": copyFields(document["from"], senderFields)}
+        if "text" in document:
+            messageData["text"] = document["text"]
+        if "media" in document:
+            messageData["media"] = copyFields(document["media"], mediaFields)
+        return messageData
+
+def copyFields(jsonObject, fields):
+    """
+    Helper for decodeSimdjson(), copy the given fields out of a simdjson object into a dictionary when they are present
+    """
+    return {field: jsonObject[field] for field in fields if field in jsonObject}
+
+def toBytes(line):
+    """
+    Helper used to accept both bytes and strings
+    """
+    return line if isinstance(line, bytes) else line.encode("utf8")
+
+def buildSyntheticLines(numLines, seed = 0):
+    """
+    Return a list of lines resembling a telegram-history-dump file, used by the benchmark below
+    """
+    from synthetic import DumpSettings, generateLines
+    return [line.encode("utf8") for line in generateLines(DumpSettings(numLines, seed = seed))]
+
+def benchmark(lines):
+    """
+    Time every available backend on a list of lines against parsing every line with json.loads, printing messages/sec
+    """
+    startTime = time.perf_counter()
+    baseline = [messageData for messageData in map(json.loads, lines) if messageData["event"] == "message"]
+    baselineTime = time.perf_counter() - startTime
+    print("json.loads on every line: " + str(round(len(lines) / baselineTime)) + " lines/sec")
+
+    for backend in getAvailableBackends():
+        decode = MessageDecoder(backend).decode
+        startTime = time.perf_counter()
+        decoded = [messageData for messageData in map(decode, lines) if messageData is not None]
+        backendTime = time.perf_counter() - startTime
+        if len(decoded) != len(baseline):
+            raise RuntimeError(backend + " decoded " + str(len(decoded)) + " messages, expected " + str(len(baseline)))
+        print(backend + ": " + str(round(len(lines) / backendTime)) + " lines/sec (" + str(round(baselineTime / backendTime, 2)) + "x)")
+
+if __name__ == "__main__":
+    #python decoder.py [file.jsonl] - benchmark each backend on a dump, or on 200,000 synthetic lines if none is given
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as file:
+            benchmarkLines = file.read().splitlines()
+    else:
+        benchmarkLines = buildSyntheticLines(200000)
+    benchmark(benchmarkLines)
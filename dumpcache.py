@@ -0,0 +1,165 @@
+import os, pickle, hashlib
+import instrument
+from ingest import ChatData, ingestFile, processAppended
+from reader import getCompression, readLines
+
+#Bump whenever the layout of the cache or of the pickled objects inside of it changes
+cacheVersion = 11
+
+#The dump is identified by hashing a handful of evenly spaced blocks instead of the whole file so checking it stays quick
+hashBlockSize = 1 << 16
+hashNumBlocks = 16
+#Once the dump has been modified, everything the cache covers is checked against a hash of each block of this size
+fullHashBlockSize = 1 << 22
+
+def getCachePath(fileName):
+    """
+    Return the path of the cache file kept next to a dump
+    """
+    return fileName + ".telegraph"
+
+def hashFileRange(file, end):
+    """
+    Return a hash of the first end bytes of a file, sampled from hashNumBlocks blocks spread evenly across the range
+    file - file object opened in binary mode
+    end - number of bytes from the start of the file to hash
+    """
+    fileHash = hashlib.blake2b(str(end).encode())
+    if end <= hashBlockSize * hashNumBlocks:
+        file.seek(0)
+        fileHash.update(file.read(end))
+    else:
+        for block in range(hashNumBlocks):
+            file.seek((end - hashBlockSize) * block // (hashNumBlocks - 1))
+            fileHash.update(file.read(hashBlockSize))
+    return fileHash.hexdigest()
+
+def hashFileBlocks(file, end, blockHashes = (), hashedEnd = 0):
+    """
+    Return a list holding a hash of every fullHashBlockSize block of the first end bytes of a file, the last one can be shorter
+    blockHashes, hashedEnd - hashes returned for the first hashedEnd bytes of the same file, the ones of whole blocks are
+                    reused instead of being read again
+    """
+    numReused = min(hashedEnd, end) // fullHashBlockSize
+    blockHashes = list(blockHashes[:numReused])
+    file.seek(numReused * fullHashBlockSize)
+    for blockStart in range(numReused * fullHashBlockSize, end, fullHashBlockSize):
+        blockHashes.append(hashlib.blake2b(file.read(min(fullHashBlockSize, end - blockStart))).hexdigest())
+    return blockHashes
+
+def loadCache(cachePath):
+    """
+    Load a cache file, returns None if there isn't one or if it was made by a different version of TeleGraph
+    """
+    try:
+        with open(cachePath, "rb") as cacheFile:
+            cache = pickle.load(cacheFile)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(cache, dict) or cache.get("version") != cacheVersion:
+        return None
+    return cache
+
+def saveCache(cachePath, cache):
+    """
+    Write a cache file, going through a temporary file so a run that gets interrupted never leaves a broken cache behind.
+    The cache only saves time, so a dump in a read only directory or a full disk skips writing it instead of failing the run
+    Returns True if the cache was written
+    """
+    tempPath = cachePath + ".tmp"
+    try:
+        with open(tempPath, "wb") as cacheFile:
+            pickle.dump(cache, cacheFile, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(tempPath, cachePath)
+    except OSError:
+        try:
+            os.remove(tempPath)
+        except OSError:
+            pass
+        return False
+    return True
+
+def replayRecords(records, peerNames, checkWordCount, hourRange, keyWords, useEventStore = False, topWords = 0, sessionGap = 0):
+    """
+    Build a ChatData object from cached message records instead of reading the dump
+    records - list of (UNIX TIME CODE, ID, text, mediaFlag) in the order they were processed
+    peerNames - name of each sender {ID : name}
+    """
+    chatData = ChatData(checkWordCount, hourRange, keyWords, useEventStore, topWords = topWords, sessionGap = sessionGap)
+    for timeStamp, currID, messageText, mediaFlag in records:
+        chatData.addMessage({'date': timeStamp}, currID, peerNames[currID], messageText, mediaFlag)
+    chatData.finishProcessing()
+    return chatData
+
+def ingestFileCached(fileName, checkWordCount, hourRange, keyWords, numProcesses = 1, useEventStore = False, jsonBackend = "auto",
+                        topWords = 0, sessionGap = 0):
+    """
+    Same as ingestFile() but keeps every parsed message along with the final stats in a cache file next to the dump
+    Running on an unchanged dump with the same settings loads the stats straight from the cache, changing the tracked
+    words or search settings reprocesses the cached messages without reading the dump, and if lines were appended to the
+    dump since the last run only those new lines are read. A dump changed in any other way is read again in full
+    """
+    cachePath = getCachePath(fileName)
+    settings = (list(checkWordCount), tuple(hourRange), list(keyWords), useEventStore, topWords, sessionGap)
+    fileStats = os.stat(fileName)
+    with instrument.stage("loadCache"):
+        cache = loadCache(cachePath)
+
+    with open(fileName, "rb") as file:
+        #The cache is only usable if everything it covers is still at the start of the file, untouched
+        if cache is not None:
+            if fileStats.st_size == cache["offset"] and fileStats.st_mtime == cache["mtime"]:
+                isValid = hashFileRange(file, cache["offset"]) == cache["hash"]
+            elif fileStats.st_size > cache["offset"] and getCompression(fileName) is None:
+                #Lines were appended, every byte the cache covers is checked since the sampled blocks can miss an edit
+                isValid = hashFileBlocks(file, cache["offset"]) == cache["blockHashes"]
+            else:
+                #Edited in place, truncated, or a compressed dump that changed and can't be read from where the cache ends
+                isValid = False
+            if not isValid:
+                cache = None
+        unchanged = cache is not None and fileStats.st_size == cache["offset"]
+
+        if unchanged and cache["settings"] == settings:
+            return cache["chatData"]
+
+        if cache is None:
+            chatData = ingestFile(fileName, checkWordCount, hourRange, keyWords, numProcesses, useEventStore, True, jsonBackend,
+                                    topWords = topWords, sessionGap = sessionGap)
+        elif unchanged:
+            with instrument.stage("replayRecords"):
+                chatData = replayRecords(cache["records"], cache["peerNames"], checkWordCount, hourRange, keyWords, useEventStore,
+                                            topWords, sessionGap)
+            chatData.records = cache["records"]
+        else:
+            #Appended lines hold messages sent after every cached one, so they are merged after the cached messages
+            with instrument.stage("read"):
+                appendedData = processAppended(list(readLines(file, start = cache["offset"], end = fileStats.st_size)),
+                                                {"checkWordCount": checkWordCount, "hourRange": hourRange, "keyWords": keyWords,
+                                                "useEventStore": useEventStore, "keepRecords": True, "jsonBackend": jsonBackend,
+                                                "instrumented": instrument.isEnabled(), "topWords": topWords, "sessionGap": sessionGap})
+            if cache["settings"] == settings:
+                chatData = cache["chatData"]
+            else:
+                with instrument.stage("replayRecords"):
+                    chatData = replayRecords(cache["records"], cache["peerNames"], checkWordCount, hourRange, keyWords, useEventStore,
+                                                topWords, sessionGap)
+            chatData.records = cache["records"]
+            with instrument.stage("merge"):
+                chatData.merge(appendedData)
+            with instrument.stage("finishProcessing"):
+                chatData.finishProcessing()
+            instrument.collect(chatData)
+
+        records = chatData.records
+        chatData.records = None #Records are stored once in the cache, not again inside the pickled stats
+        with instrument.stage("saveCache"):
+            #The blocks a valid cache covers were already hashed, only the ones appended since are read
+            if cache is not None:
+                blockHashes = hashFileBlocks(file, fileStats.st_size, cache["blockHashes"], cache["offset"])
+            else:
+                blockHashes = hashFileBlocks(file, fileStats.st_size)
+            saveCache(cachePath, {"version": cacheVersion, "offset": fileStats.st_size, "mtime": fileStats.st_mtime,
+                                    "hash": hashFileRange(file, fileStats.st_size), "blockHashes": blockHashes, "records": records,
+                                    "peerNames": chatData.peerNames, "settings": settings, "chatData": chatData})
+    return chatData
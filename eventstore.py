@@ -0,0 +1,200 @@
+import time
+from array import array
+import numpy as np
+from dateinfo import ActivityInfo
+
+class EventStore(object):
+    """
+    Class used to store every message as a row in a set of columns instead of updating nested dictionaries one message at a
+    time. Once every message has been added, activity histograms and per user totals are computed for everyone at once
+    with a handful of numpy operations
+    """
+
+    def __init__(self):
+        """
+        timeStamps - unix time stamp of each message
+        peerIDs - peer_id of the sender of each message
+        wordCounts - number of words in each message
+        charCounts - number of characters in each message
+        mediaFlags - media type of each message, see UserData.updateData()
+        wordHitMessages - message each tracked word hit belongs to, as an index into the columns above
+        wordHitWords - tracked word of each hit, as an index into WordTracker.uniqueWords
+        wordHitCounts - number of times the word was counted in that message
+        """
+        self.timeStamps = array('q')
+        self.peerIDs = array('q')
+        self.wordCounts = array('q')
+        self.charCounts = array('q')
+        self.mediaFlags = array('b')
+        self.wordHitMessages = array('q')
+        self.wordHitWords = array('i')
+        self.wordHitCounts = array('q')
+
+    def addMessage(self, timeStamp, peerID, message, mediaFlag, numWords = None):
+        """
+        Append a single message to the store
+        timeStamp - unix time stamp
+        peerID - peer_id of the sender
+        message - string containing only the text of the message
+        mediaFlag - media type of the message
+        numWords - number of words in message if it was already split up, counted here otherwise
+        """
+        self.timeStamps.append(timeStamp)
+        self.peerIDs.append(peerID)
+        self.wordCounts.append(len(message.split()) if numWords is None else numWords)
+        self.charCounts.append(len(message))
+        self.mediaFlags.append(mediaFlag)
+
+    def addWordHits(self, wordIndex, count):
+        """
+        Record that the message added last used a tracked word count times
+        wordIndex - index of the word in WordTracker.uniqueWords
+        """
+        self.wordHitMessages.append(len(self.timeStamps) - 1)
+        self.wordHitWords.append(wordIndex)
+        self.wordHitCounts.append(count)
+
+    def merge(self, other):
+        """
+        Append every message of another store, other must hold the messages processed right after the ones held here
+        """
+        offset = len(self.timeStamps)
+        self.wordHitMessages.frombytes((np.frombuffer(other.wordHitMessages, dtype = np.int64) + offset).tobytes())
+        self.wordHitWords.extend(other.wordHitWords)
+        self.wordHitCounts.extend(other.wordHitCounts)
+        self.timeStamps.extend(other.timeStamps)
+        self.peerIDs.extend(other.peerIDs)
+        self.wordCounts.extend(other.wordCounts)
+        self.charCounts.extend(other.charCounts)
+        self.mediaFlags.extend(other.mediaFlags)
+
+    def getNumMessages(self):
+        return len(self.timeStamps)
+
+    def getColumns(self):
+        """
+        Return every column as a numpy array, in the order (timeStamps, peerIDs, wordCounts, charCounts, mediaFlags)
+        """
+        return (np.frombuffer(self.timeStamps, dtype = np.int64), np.frombuffer(self.peerIDs, dtype = np.int64),
+                np.frombuffer(self.wordCounts, dtype = np.int64), np.frombuffer(self.charCounts, dtype = np.int64),
+                np.frombuffer(self.mediaFlags, dtype = np.int8))
+
+    def getWordHits(self):
+        """
+        Return the tracked word hits as numpy arrays, in the order (wordHitMessages, wordHitWords, wordHitCounts)
+        """
+        return (np.frombuffer(self.wordHitMessages, dtype = np.int64), np.frombuffer(self.wordHitWords, dtype = np.int32),
+                np.frombuffer(self.wordHitCounts, dtype = np.int64))
+
+    def applyToUsers(self, userDict):
+        """
+        Fill in the message counts, lengths, media counts and ActivityInfo of every user in userDict from the store
+        userDict - dictionary of users {ID : UserData()}, every sender in the store must already be in it
+        """
+        if self.getNumMessages() == 0:
+            return
+
+        timeStamps, peerIDs, wordCounts, charCounts, mediaFlags = self.getColumns()
+        userIDs, userIndex = np.unique(peerIDs, return_inverse = True)
+        numUsers = len(userIDs)
+
+        numMessages = np.bincount(userIndex, minlength = numUsers)
+        totalLength = np.bincount(userIndex, weights = wordCounts, minlength = numUsers).astype(np.int64)
+        totalCharacters = np.bincount(userIndex, weights = charCounts, minlength = numUsers).astype(np.int64)
+        mediaCounts = np.bincount(userIndex * 4 + mediaFlags, minlength = numUsers * 4).reshape(numUsers, 4)
+        activity = buildActivity(timeStamps, userIndex, numUsers)
+
+        for index in range(numUsers):
+            currentUser = userDict[int(userIDs[index])]
+            currentUser.numMessages = int(numMessages[index])
+            currentUser.totalLength = int(totalLength[index])
+            currentUser.totalCharacters = int(totalCharacters[index])
+            currentUser.mediaSent["pics"] = int(mediaCounts[index, 1])
+            currentUser.mediaSent["docs"] = int(mediaCounts[index, 2])
+            currentUser.mediaSent["links"] = int(mediaCounts[index, 3])
+            currentUser.activity = activity[index]
+
+def localCalendar(timeStamps):
+    """
+    Convert an array of unix time stamps to local time the same way datetime.fromtimestamp() does
+    Returns arrays of (days, hours), days count days since 1970-01-01 and hours go from 0-23
+    """
+    #Time zone offsets only change on quarter hours, so look up the offset once for each quarter hour that appears
+    quarterHours, quarterIndex = np.unique(timeStamps // 900, return_inverse = True)
+    offsets = np.array([time.localtime(int(quarter) * 900).tm_gmtoff for quarter in quarterHours], dtype = np.int64)
+    localTimes = timeStamps + offsets[quarterIndex]
+    return localTimes // 86400, (localTimes % 86400) // 3600
+
+def buildActivity(timeStamps, userIndex, numUsers):
+    """
+    Build an ActivityInfo object for every user identical to one that had each of their time stamps passed to
+    updateActivity() in order
+    Returns a list of ActivityInfo objects, indexed the same as userIndex
+    timeStamps - array of unix time stamps in the order they were processed
+    userIndex - array holding which user each time stamp belongs to, from 0 to numUsers - 1
+    """
+    days, hours = localCalendar(timeStamps)
+    return buildDailyActivity(userIndex, days, hours, np.ones(len(days), dtype = np.int64), numUsers)
+
+def buildDailyActivity(userIndex, days, hours, counts, numUsers):
+    """
+    Build an ActivityInfo object for every user out of counts of time stamps per day and hour, the same (user, day, hour)
+    may show up more than once. Users without any counts get an empty ActivityInfo
+    Returns a list of ActivityInfo objects, indexed the same as userIndex
+    userIndex - array holding which user each count belongs to, from 0 to numUsers - 1
+    days - array of local days in days since 1970-01-01
+    hours - array of local hours from 0-23, or None to leave the hours empty when they aren't known
+    counts - array of the number of time stamps each entry stands for
+    """
+    activity = [ActivityInfo() for index in range(numUsers)]
+    if len(days) == 0:
+        return activity
+
+    #Messages per month, split up by year. The first month added for a user also creates their count arrays
+    monthsSinceEpoch = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    firstMonth = int(monthsSinceEpoch.min())
+    numMonths = int(monthsSinceEpoch.max()) - firstMonth + 1
+    monthKeys, monthIndex = np.unique(userIndex * numMonths + (monthsSinceEpoch - firstMonth), return_inverse = True)
+    messagesPerMonth = np.bincount(monthIndex, weights = counts)
+    for key, count in zip(monthKeys.tolist(), messagesPerMonth.tolist()):
+        month = key % numMonths + firstMonth
+        activity[key // numMonths].addMonthCount(month // 12 + 1970, month % 12 + 1, int(count))
+
+    #Every (user, day) pair with a message, sorted by user and then by day
+    firstDay = int(days.min())
+    numDays = int(days.max()) - firstDay + 1
+    userDays = np.unique(userIndex * numDays + (days - firstDay))
+    activeUsers = userDays // numDays
+    activeDays = userDays % numDays + firstDay
+
+    #Messages and unique days per weekday, 1970-01-01 was a Thursday
+    messagesPerWeekday = np.bincount(userIndex * 7 + (days + 3) % 7, weights = counts, minlength = numUsers * 7).reshape(numUsers, 7)
+    daysPerWeekday = np.bincount(activeUsers * 7 + (activeDays + 3) % 7, minlength = numUsers * 7).reshape(numUsers, 7)
+
+    #Day bitmap of each user, starting on a multiple of 8 like ActivityInfo.markDay() does
+    userStarts = np.searchsorted(activeUsers, np.arange(numUsers + 1))
+    for index in range(numUsers):
+        userActiveDays = activeDays[userStarts[index]:userStarts[index + 1]]
+        if len(userActiveDays) == 0:
+            continue
+        bitmapStart = int(userActiveDays[0]) - int(userActiveDays[0]) % 8
+        bits = np.zeros(int(userActiveDays[-1]) - bitmapStart + 1, dtype = bool)
+        bits[userActiveDays - bitmapStart] = True
+        activity[index].setActiveDays(bitmapStart, np.packbits(bits, bitorder = 'little').tobytes(), len(userActiveDays))
+        for weekday in np.flatnonzero(messagesPerWeekday[index]):
+            activity[index].setWeekday(int(weekday), int(messagesPerWeekday[index, weekday]), int(daysPerWeekday[index, weekday]))
+
+    if hours is None:
+        return activity
+
+    #Messages and unique days per hour along with the first and last day each hour was seen on
+    messagesPerHour = np.bincount(userIndex * 24 + hours, weights = counts, minlength = numUsers * 24)
+    hourDays = np.unique((userIndex * 24 + hours) * numDays + (days - firstDay))
+    hourKeys, hourStarts, daysPerHour = np.unique(hourDays // numDays, return_index = True, return_counts = True)
+    firstSeen = hourDays[hourStarts] % numDays + firstDay
+    lastSeen = hourDays[hourStarts + daysPerHour - 1] % numDays + firstDay
+    for position, key in enumerate(hourKeys.tolist()):
+        activity[key // 24].setHour(key % 24, int(messagesPerHour[key]), int(daysPerHour[position]), int(firstSeen[position]),
+                                    int(lastSeen[position]))
+
+    return activity
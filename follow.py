@@ -0,0 +1,191 @@
+import os, sys, copy, time, argparse
+import instrument
+from ingest import ingestFile, processAppended
+from reader import readLines, findLastLineEnd, getCompression
+from dumpcache import cacheVersion, hashFileRange, loadCache, saveCache
+from report import saveReport, getReportFormat
+from telegraph import AnalysisOptions, addOptionArguments, selectUsers, writeGraphs, writeDashboard
+
+def getCheckpointPath(fileName):
+    """
+    Return the path of the checkpoint file kept next to a followed dump
+    """
+    return fileName + ".follow"
+
+class DumpFollower(object):
+    """
+    Class used to follow a dump that telegram-history-dump is still adding to. Whatever is in the file at the start is read
+    the usual way, after that only newly appended lines are read and merged into the stats already held in memory, so
+    history is never processed again. The stats and the offset read up to are checkpointed next to the dump
+    """
+
+    def __init__(self, fileName, options = None, useCheckpoint = True):
+        """
+        fileName - path to the .jsonl dump
+        options - AnalysisOptions, the output paths are where snapshots are written
+        useCheckpoint - resume from the checkpoint next to the dump and keep it updated, see getCheckpointPath()
+        chatData - ChatData holding the stats of every line read so far, every user is kept, filters are only applied
+                    to snapshots
+        offset - byte offset every line before has been read, a line still being written past it is left for later
+        fileHash - hash of the file up to offset, used to notice when the dump gets replaced, see hashFileRange()
+        lastSize - size of the file the last time it was checked
+        numNewMessages - messages read since the last snapshot
+        """
+        self.fileName = fileName
+        self.options = options if options is not None else AnalysisOptions()
+        self.useCheckpoint = useCheckpoint
+        self.checkpointPath = getCheckpointPath(fileName)
+        self.settings = (list(self.options.trackWordUsage), tuple(self.options.hourRange), list(self.options.keyWords),
+                            self.options.useEventStore, self.options.topWords,
+                            self.options.sessionGap)
+        self.chatData = None
+        self.offset = 0
+        self.fileHash = None
+        self.lastSize = None
+        self.numNewMessages = 0
+
+    def load(self, useCheckpoint = None):
+        """
+        Read everything already in the dump, or pick up from the checkpoint if it still matches the start of the file
+        useCheckpoint - overrides self.useCheckpoint, False forces the dump to be read again from the start
+        """
+        if useCheckpoint is None:
+            useCheckpoint = self.useCheckpoint
+        checkpoint = loadCache(self.checkpointPath) if useCheckpoint else None
+        with open(self.fileName, "rb") as file:
+            fileSize = os.fstat(file.fileno()).st_size
+            if (checkpoint is not None and checkpoint["settings"] == self.settings and checkpoint["offset"] <= fileSize
+                    and hashFileRange(file, checkpoint["offset"]) == checkpoint["hash"]):
+                self.chatData = checkpoint["chatData"]
+                self.offset = checkpoint["offset"]
+                self.fileHash = checkpoint["hash"]
+                return
+
+            #Lines already in the file are newest first like any other dump
+            self.offset = findLastLineEnd(file, 0, fileSize)
+            with instrument.stage("ingest"):
+                self.chatData = ingestFile(self.fileName, self.options.trackWordUsage, self.options.hourRange,
+                                            self.options.keyWords, self.options.numProcesses, self.options.useEventStore,
+                                            jsonBackend = self.options.jsonBackend, end = self.offset,
+                                            topWords = self.options.topWords, sessionGap = self.options.sessionGap)
+            self.fileHash = hashFileRange(file, self.offset)
+        self.numNewMessages += self.chatData.getTotalMessageCount()
+
+    def poll(self):
+        """
+        Read every finished line appended to the dump since the last call and merge it into the stats
+        Returns the number of new messages read
+        """
+        fileSize = os.stat(self.fileName).st_size
+        if fileSize == self.lastSize:
+            return 0
+        self.lastSize = fileSize
+
+        with open(self.fileName, "rb") as file:
+            #Anything other than lines added to the end means the dump was replaced, start over
+            if fileSize < self.offset or hashFileRange(file, self.offset) != self.fileHash:
+                self.numNewMessages = 0
+                self.load(useCheckpoint = False)
+                return self.chatData.getTotalMessageCount()
+
+            end = findLastLineEnd(file, self.offset, fileSize)
+            if end == self.offset:
+                return 0
+            with instrument.stage("read"):
+                newData = self.readAppended(list(readLines(file, start = self.offset, end = end)))
+            self.offset = end
+            self.fileHash = hashFileRange(file, end)
+
+        with instrument.stage("merge"):
+            self.chatData.merge(newData)
+        self.numNewMessages += newData.getTotalMessageCount()
+        return newData.getTotalMessageCount()
+
+    def readAppended(self, lines):
+        """
+        Return a ChatData of lines appended to the dump, see processAppended()
+        lines - list of lines in file order
+        """
+        return processAppended(lines, {"checkWordCount": self.options.trackWordUsage, "hourRange": self.options.hourRange,
+                                        "keyWords": self.options.keyWords, "useEventStore": self.options.useEventStore,
+                                        "jsonBackend": self.options.jsonBackend, "topWords": self.options.topWords,
+                                        "sessionGap": self.options.sessionGap})
+
+    def writeSnapshot(self):
+        """
+        Write the stats, the export and dashboard if there are any, and the graphs unless options.makeGraphs is off, to the paths in
+        options, then checkpoint. Every file is written next to its final path first and moved into place, so nothing
+        reading them ever sees half a file
+        """
+        #Filters are applied to a copy, the users they drop are still needed for new messages
+        view = copy.copy(self.chatData)
+        view.userDict = dict(view.userDict)
+        view = selectUsers(view, self.options)
+
+        with instrument.stage("snapshot"):
+            if self.options.statsPath is not None:
+                saveReport(view, self.options.statsPath + ".tmp", "text")
+                os.replace(self.options.statsPath + ".tmp", self.options.statsPath)
+            if self.options.exportPath is not None:
+                saveReport(view, self.options.exportPath + ".tmp", getReportFormat(self.options.exportPath))
+                os.replace(self.options.exportPath + ".tmp", self.options.exportPath)
+            if self.options.dashboardPath is not None:
+                dashboardOptions = copy.copy(self.options)
+                dashboardOptions.dashboardPath = self.options.dashboardPath + ".tmp"
+                writeDashboard(view, dashboardOptions)
+                os.replace(dashboardOptions.dashboardPath, self.options.dashboardPath)
+            if self.options.makeGraphs:
+                writeGraphs(view, self.options, self.options.graphPath + ".tmp")
+                os.replace(self.options.graphPath + ".tmp", self.options.graphPath)
+            if self.useCheckpoint:
+                saveCache(self.checkpointPath, {"version": cacheVersion, "offset": self.offset, "hash": self.fileHash,
+                                                "settings": self.settings, "chatData": self.chatData})
+        self.numNewMessages = 0
+
+    def follow(self, pollInterval = 1.0, snapshotInterval = 30.0, duration = None):
+        """
+        Keep reading new lines until interrupted, writing a snapshot at most every snapshotInterval seconds whenever
+        there were new messages. A final snapshot is written on the way out
+        pollInterval - seconds to wait between checks of the file
+        duration - stop after this many seconds, None to run until interrupted
+        """
+        if self.chatData is None:
+            self.load()
+        startTime = lastSnapshot = time.monotonic()
+        self.writeSnapshot()
+        try:
+            while duration is None or time.monotonic() - startTime < duration:
+                time.sleep(pollInterval)
+                self.poll()
+                if self.numNewMessages > 0 and time.monotonic() - lastSnapshot >= snapshotInterval:
+                    self.writeSnapshot()
+                    lastSnapshot = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        if self.numNewMessages > 0:
+            self.writeSnapshot()
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Follow a telegram-history-dump .jsonl file as it grows and keep its stats up to date")
+    parser.add_argument("fileName", help = "path to the .jsonl file")
+    addOptionArguments(parser)
+    parser.add_argument("--stats", default = "fullStats.txt", dest = "statsPath", help = "where to write the full stats")
+    parser.add_argument("--graphs", default = "output.pdf", dest = "graphPath", help = "where to write the graphs")
+    parser.add_argument("--export", default = None, dest = "exportPath", help = "also write every stat to this .jsonl or .csv file")
+    parser.add_argument("--dashboard", default = None, dest = "dashboardPath", help = "also write an interactive HTML dashboard to this file")
+    parser.add_argument("--interval", type = float, default = 1.0, dest = "pollInterval", help = "seconds between checks for new lines")
+    parser.add_argument("--snapshot-interval", type = float, default = 30.0, dest = "snapshotInterval", help = "seconds between snapshots of the stats")
+    parser.add_argument("--duration", type = float, default = None, help = "stop after this many seconds instead of running until interrupted")
+    parser.add_argument("--no-checkpoint", action = "store_false", dest = "useCheckpoint", help = "don't resume from or write the checkpoint next to the file")
+    arguments = parser.parse_args(arguments)
+    if getCompression(arguments.fileName) is not None:
+        parser.error("compressed dumps can't be followed, only plain .jsonl files that are still being written to")
+
+    follower = DumpFollower(arguments.fileName, AnalysisOptions.fromConfig(arguments), arguments.useCheckpoint)
+    follower.load()
+    print("Following " + arguments.fileName + " from " + str(follower.chatData.getTotalMessageCount()) + " messages, press Ctrl+C to stop")
+    follower.follow(arguments.pollInterval, arguments.snapshotInterval, arguments.duration)
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding = "utf8")
+    main()
@@ -1,4 +1,7 @@
+import os, math, hashlib, tempfile, multiprocessing
 import user
+from responsetimes import ResponseHistogram
+from vocabulary import VocabularyInfo
 
 import matplotlib.backends.backend_pdf
 import matplotlib.pyplot as plt
@@ -6,48 +9,270 @@ import matplotlib._color_data as mcd
 import numpy as np
 from labellines import labelLine, labelLines
 
-from processFile import checkWordCount, userDict
-
-userList = []
-totalMessagesPerUser = []
-responseTimePerUser = []
-totalUsers = len(userDict.keys())
+#Optional, used to join pages drawn on separate processes or kept in the page cache back into a single pdf. Without it every
+#page is drawn in this process, every time
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
 
 months = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
 globalColors = mcd.TABLEAU_COLORS
 bigGraphThreshold = 5 #If the number of users exceeds this number, switch to the larger graph 
-pdf = matplotlib.backends.backend_pdf.PdfPages("output.pdf")
-
-#Gather totalMessages and AverageResponseTime for all users and trim names if they're too long 
-for user in userDict:
-    currentUserName = userDict[user].getFullName()
-    currentUserId = userDict[user].getPeerID()
-    currentMessages = userDict[user].getNumMessages()
-    if len(currentUserName) >= 26: #Ensure that long names will still fit on the graph
-        currentUserName = currentUserName[:-5] + "..."
-
-    #Code used to check if the same user (determined by name) occurs twice in the data, due to phone number change 
-    for secondUser in userDict: #Loop through the users again to check if any of them have the same print name
-        secondUserName = userDict[secondUser].getFullName()
-        secondUserId = userDict[secondUser].getPeerID()
-        secondUserMessages = userDict[secondUser].getNumMessages()
-        if currentUserName == secondUserName and currentUserId != secondUserId: #If they have the same print name but different IDs combine total messages
-            currentMessages+= userDict[secondUser].getNumMessages()
-
-    userList.append(currentUserName)
-    totalMessagesPerUser.append(currentMessages)    
-    responseTimePerUser.append(userDict[user].getAverageResponseTime())
-
-def graphData():
-    if totalUsers >= 1:
-        configureGraph()
-        graphTotalMessages()
-        graphAverageResponeTime()
-        graphAverageMessagesPerHour()
-        graphAverageMessagesPerMonth()
-        trackWordUsageGroup()
-
-def configureGraph():
+maxVocabularyGraphs = 9 #Most users given their own chart on the most used words page, the most active come first
+pageCacheVersion = 1 #Bump whenever the way a page is drawn changes, so pages drawn before aren't reused
+maxCachedPages = 256 #Most pages kept in a page cache, the ones used longest ago are removed first
+
+def gatherTotals(userDict, userIDs = None):
+    """
+    Gather totalMessages and AverageResponseTime for all users and trim names if they're too long
+    userIDs - optional list of the users to gather totals for, defaults to every user. Duplicate names are still looked
+                up across all of userDict
+    Returns (userList, totalMessagesPerUser, responseTimePerUser)
+    """
+    userList = []
+    totalMessagesPerUser = []
+    responseTimePerUser = []
+
+    #The same user (determined by name) can occur twice in the data due to a phone number change, index the total messages
+    #sent under each name once so every user's duplicates are found with a single lookup
+    messagesPerName = dict()
+    for user in userDict:
+        userName = userDict[user].getFullName()
+        messagesPerName[userName] = messagesPerName.get(userName, 0) + userDict[user].getNumMessages()
+
+    for user in (userDict if userIDs is None else userIDs):
+        fullName = userDict[user].getFullName()
+        currentUserName = fullName
+        currentMessages = userDict[user].getNumMessages()
+        if len(currentUserName) >= 26: #Ensure that long names will still fit on the graph
+            currentUserName = currentUserName[:-5] + "..."
+
+        #If other users have the same print name but different IDs combine total messages
+        currentMessages += messagesPerName.get(currentUserName, 0)
+        if currentUserName == fullName:
+            currentMessages -= userDict[user].getNumMessages()
+
+        userList.append(currentUserName)
+        totalMessagesPerUser.append(currentMessages)    
+        responseTimePerUser.append(userDict[user].getAverageResponseTime() if userDict[user].numResponses else 0) #Users that never replied to anyone have no average
+
+    return userList, totalMessagesPerUser, responseTimePerUser
+
+def splitTopUsers(userDict, maxUsers):
+    """
+    Split users into the maxUsers users that sent the most messages, kept in their original order, and everyone else
+    Returns (topUsers, otherUsers) as lists of IDs, otherUsers is empty if there are no more than maxUsers users
+    """
+    if not maxUsers or len(userDict) <= maxUsers:
+        return list(userDict), []
+    mostActive = set(sorted(userDict, key = lambda user: userDict[user].getNumMessages(), reverse = True)[:maxUsers])
+    return [user for user in userDict if user in mostActive], [user for user in userDict if user not in mostActive]
+
+def sumSeries(userDict, userIDs, getSeries):
+    """
+    Add up a per user series, such as getAveragedMonthActivity(), across the given users
+    getSeries - function taking a UserData and returning its series
+    """
+    return list(np.sum([getSeries(userDict[user]) for user in userIDs], axis = 0))
+
+def getPageCachePath(outputPath):
+    """
+    Return the path of the directory holding the page cache of a pdf, kept next to it
+    """
+    return outputPath + ".pages"
+
+def graphData(userDict, checkWordCount, outputPath = "output.pdf", numProcesses = 1, maxUsers = None, pageCachePath = None):
+    """
+    Draw every graph for the given users and save them to a pdf
+    userDict - dictionary of users to graph {ID : UserData()}
+    checkWordCount - list of tracked words, each gets its own graph
+    outputPath - path of the pdf to write
+    numProcesses - number of processes to draw pages on, only used when pypdf is installed
+    maxUsers - optional limit on the number of users drawn individually, everyone else is drawn as a single "Others" entry
+    pageCachePath - optional directory to keep every drawn page in, pages whose data hasn't changed since an earlier run
+                    are taken from it instead of being drawn again, see renderPagesCached(). Only used when pypdf is installed
+    """
+    pages = gatherPages(userDict, checkWordCount, maxUsers) if len(userDict) >= 1 else []
+    totalUsers = len(pages[0][1][0]) if pages else 0 #Number of entries actually drawn on each graph
+
+    numProcesses = min(numProcesses, len(pages), os.cpu_count() or 1) #More processes than cores only adds overhead
+    if pageCachePath is not None and PdfWriter is not None:
+        renderPagesCached(pages, totalUsers, outputPath, numProcesses, pageCachePath)
+    elif numProcesses > 1 and PdfWriter is not None:
+        renderPagesParallel(pages, totalUsers, outputPath, numProcesses)
+    else:
+        configureGraph(totalUsers)
+        with matplotlib.backends.backend_pdf.PdfPages(outputPath) as pdf:
+            for page in pages:
+                savePage(pdf, page, totalUsers)
+
+def gatherPages(userDict, checkWordCount, maxUsers = None):
+    """
+    Pull everything the graphs need out of userDict, so pages can be drawn without the users themselves. When there are
+    more than maxUsers users, only the most active ones get their own entry and the rest are added up into one "Others" entry
+    Returns a list of (graph function name, arguments) in the order the pages appear in the pdf
+    """
+    topUsers, otherUsers = splitTopUsers(userDict, maxUsers)
+    userList, totalMessagesPerUser, responseTimePerUser = gatherTotals(userDict, topUsers)
+    userNames = [userDict[user].getFirstName() for user in topUsers]
+    hourActivityPerUser = [userDict[user].getAveragedHourActivity() for user in topUsers]
+    monthActivityPerUser = [userDict[user].getAveragedMonthActivity() for user in topUsers]
+    responseQuantilesPerUser = [userDict[user].getResponseQuantiles() for user in topUsers]
+
+    if otherUsers:
+        othersName = "Others (" + str(len(otherUsers)) + ")"
+        otherResponses = sum(userDict[user].numResponses for user in otherUsers)
+        otherResponseTime = sum(userDict[user].totalResponseTime for user in otherUsers)
+        userList.append(othersName)
+        userNames.append(othersName)
+        totalMessagesPerUser.append(sum(userDict[user].getNumMessages() for user in otherUsers))
+        responseTimePerUser.append(otherResponseTime / otherResponses / 60 if otherResponses else 0)
+        hourActivityPerUser.append(sumSeries(userDict, otherUsers, lambda currentUser: currentUser.getAveragedHourActivity()))
+        monthActivityPerUser.append(sumSeries(userDict, otherUsers, lambda currentUser: currentUser.getAveragedMonthActivity()))
+        otherHistogram = ResponseHistogram()
+        for user in otherUsers:
+            otherHistogram.merge(userDict[user].getResponseHistogram())
+        responseQuantilesPerUser.append(otherHistogram.getQuantiles())
+
+    pages = [("graphTotalMessages", (userList, totalMessagesPerUser)),
+            ("graphAverageResponeTime", (userList, responseTimePerUser)),
+            ("graphResponseTimePercentiles", (userList, responseQuantilesPerUser)),
+            ("graphAverageMessagesPerHour", (userNames, hourActivityPerUser)),
+            ("graphAverageMessagesPerMonth", (userNames, monthActivityPerUser))]
+    pages.extend(gatherTopWords(userDict, topUsers, otherUsers, userNames))
+    pages.extend(trackWordUsageGroup(userDict, checkWordCount, topUsers, otherUsers, userNames))
+    return pages
+
+def gatherTopWords(userDict, topUsers, otherUsers, userNames):
+    """
+    Gather the most used words of the maxVocabularyGraphs most active entries, only if most used words were looked for
+    topUsers, otherUsers, userNames - same as in trackWordUsageGroup()
+    Returns a list holding the page drawn by graphTopWords(), or an empty list
+    """
+    entries = [(userDict[user].getNumMessages(), userNames[index], userDict[user].vocabulary) for index, user in enumerate(topUsers)
+                if userDict[user].vocabulary is not None]
+    otherVocabularies = [userDict[user].vocabulary for user in otherUsers if userDict[user].vocabulary is not None]
+    if otherVocabularies:
+        otherVocabulary = VocabularyInfo(otherVocabularies[0].numShown)
+        for vocabulary in otherVocabularies:
+            otherVocabulary.merge(vocabulary)
+        entries.append((sum(userDict[user].getNumMessages() for user in otherUsers), userNames[-1], otherVocabulary))
+    if not entries:
+        return []
+
+    entries = sorted(entries, key = lambda entry: entry[0], reverse = True)[:maxVocabularyGraphs]
+    topWordsPerUser = [[(word, count) for word, count, error in vocabulary.getTopWords()] for numMessages, name, vocabulary in entries]
+    return [("graphTopWords", ([name for numMessages, name, vocabulary in entries], topWordsPerUser))]
+
+def drawPage(page, totalUsers):
+    """
+    Draw a single page from gatherPages() and return its figure
+    """
+    graphFunction, arguments = page
+    return globals()[graphFunction](*arguments, totalUsers)
+
+def savePage(pdf, page, totalUsers):
+    """
+    Draw a single page and add it to pdf, closing the figure afterwards so memory doesn't grow with the number of pages
+    """
+    currentFigure = drawPage(page, totalUsers)
+    pdf.savefig(currentFigure)
+    plt.close(currentFigure)
+
+def startRenderWorker(totalUsers):
+    """
+    Set up a process used by renderPagesParallel(), pages are only ever saved to files so no window is needed
+    """
+    plt.switch_backend("Agg")
+    configureGraph(totalUsers)
+
+def renderPageFile(task):
+    """
+    Draw a single page to its own pdf, used as the worker function for renderPageFiles(). The pdf is written next to its
+    path first and moved into place, so a run that gets interrupted never leaves half a page in the page cache
+    task - tuple of (page, totalUsers, path of the pdf to write)
+    """
+    page, totalUsers, pagePath = task
+    with matplotlib.backends.backend_pdf.PdfPages(pagePath + ".tmp") as pdf:
+        savePage(pdf, page, totalUsers)
+    os.replace(pagePath + ".tmp", pagePath)
+    return pagePath
+
+def renderPageFiles(tasks, totalUsers, numProcesses):
+    """
+    Draw every task from renderPageFile() to its own pdf, on a pool of processes if numProcesses is more than 1
+    """
+    if numProcesses > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(min(numProcesses, len(tasks)), startRenderWorker, (totalUsers,)) as pool:
+            pool.map(renderPageFile, tasks, chunksize = 1)
+    elif tasks:
+        configureGraph(totalUsers)
+        for task in tasks:
+            renderPageFile(task)
+
+def joinPageFiles(pagePaths, outputPath):
+    """
+    Join single page pdfs into outputPath in the order given
+    """
+    writer = PdfWriter()
+    for pagePath in pagePaths:
+        writer.append(pagePath)
+    writer.compress_identical_objects() #Every page pdf carries its own copy of shared resources such as fonts
+    with open(outputPath, "wb") as outputFile:
+        writer.write(outputFile)
+
+def renderPagesParallel(pages, totalUsers, outputPath, numProcesses):
+    """
+    Draw every page on a pool of processes, each to its own temporary pdf, then join them into outputPath in order
+    """
+    with tempfile.TemporaryDirectory() as pageDirectory:
+        tasks = [(page, totalUsers, os.path.join(pageDirectory, str(pageNumber) + ".pdf")) for pageNumber, page in enumerate(pages)]
+        renderPageFiles(tasks, totalUsers, numProcesses)
+        joinPageFiles([pagePath for page, totalUsers, pagePath in tasks], outputPath)
+
+def getPageKey(page, totalUsers):
+    """
+    Return a hash of everything that decides how a page looks: the graph function, the series and names it is given, the
+    number of entries the styling is picked for, and the versions of the drawing code and matplotlib
+    """
+    pageDescription = repr((pageCacheVersion, matplotlib.__version__, totalUsers, page))
+    return hashlib.blake2b(pageDescription.encode("utf8"), digest_size = 16).hexdigest()
+
+def renderPagesCached(pages, totalUsers, outputPath, numProcesses, pageCachePath):
+    """
+    Draw only the pages that aren't in the page cache yet, each to its own pdf in pageCachePath named after getPageKey(),
+    then join every page into outputPath in order. Changing a single tracked word or filter only draws the pages it changes
+    """
+    os.makedirs(pageCachePath, exist_ok = True)
+    pagePaths = [os.path.join(pageCachePath, getPageKey(page, totalUsers) + ".pdf") for page in pages]
+
+    tasks = dict() #The same page can be asked for twice, such as a word tracked twice
+    for page, pagePath in zip(pages, pagePaths):
+        if pagePath not in tasks and not os.path.exists(pagePath):
+            tasks[pagePath] = (page, totalUsers, pagePath)
+    renderPageFiles(list(tasks.values()), totalUsers, numProcesses)
+
+    for pagePath in pagePaths:
+        os.utime(pagePath) #Mark every page as just used so prunePageCache() keeps it
+    joinPageFiles(pagePaths, outputPath)
+    prunePageCache(pageCachePath, set(pagePaths))
+
+def prunePageCache(pageCachePath, keepPaths):
+    """
+    Remove the pages used longest ago once pageCachePath holds more than maxCachedPages, along with anything left behind by
+    an interrupted run. Pages in keepPaths are never removed
+    """
+    cachedPaths = [os.path.join(pageCachePath, fileName) for fileName in os.listdir(pageCachePath)]
+    for pagePath in cachedPaths:
+        if pagePath.endswith(".tmp"):
+            os.remove(pagePath)
+    cachedPaths = sorted((pagePath for pagePath in cachedPaths if pagePath.endswith(".pdf") and pagePath not in keepPaths),
+                            key = os.path.getmtime, reverse = True)
+    for pagePath in cachedPaths[max(maxCachedPages - len(keepPaths), 0):]:
+        os.remove(pagePath)
+
+def configureGraph(totalUsers):
     #Set the defaults for all of our graphs 
     plt.rcParams['axes.facecolor'] = 'white'
     plt.rcParams['axes.spines.right'] = False
@@ -61,9 +286,9 @@ def configureGraph():
         plt.rcParams['ytick.labelsize'] = 15
         plt.rcParams['axes.labelsize'] = 'x-large'
 
-def graphTotalMessages():
+def graphTotalMessages(userList, totalMessagesPerUser, totalUsers):
     """
-    Create a histogram showing the total messages sent for each user and save to the output pdf 
+    Create a histogram showing the total messages sent for each user, returns the figure
     """
     currentFigure = plt.figure()
     totalMessageGraph = plt.subplot()
@@ -78,11 +303,11 @@ def graphTotalMessages():
     totalMessageGraph.set_xlabel("Users")
     currentFigure.autofmt_xdate()
 
-    pdf.savefig(currentFigure)
+    return currentFigure
 
-def graphAverageResponeTime():
+def graphAverageResponeTime(userList, responseTimePerUser, totalUsers):
     """
-    Create a histogram showing the average response time for each user and save to the output pdf 
+    Create a histogram showing the average response time for each user, returns the figure
     """
     currentFigure = plt.figure()
     averageResponseTimeGraph = plt.subplot()
@@ -97,19 +322,46 @@ def graphAverageResponeTime():
     averageResponseTimeGraph.set_ylabel("Response Time (Minutes)")
     averageResponseTimeGraph.set_xlabel("Users")
 
-    pdf.savefig(currentFigure)
+    return currentFigure
+
+def graphResponseTimePercentiles(userList, responseQuantilesPerUser, totalUsers):
+    """
+    Create a bar graph of every user's median, 90th and 99th percentile response time side by side, returns the figure
+    """
+    currentFigure = plt.figure()
+    responseTimeGraph = plt.subplot()
+    positions = np.arange(len(userList))
+    barWidth = 0.27
+
+    for index, label in enumerate(["Median", "90th Percentile", "99th Percentile"]):
+        #Users that never replied to anyone have no response times
+        responseTimes = [quantiles[index] or 0 for quantiles in responseQuantilesPerUser]
+        plt.bar(positions + (index - 1) * barWidth, responseTimes, barWidth, label = label)
+
+    responseTimeGraph.set_yscale("symlog") #Percentiles of the same user can be minutes and hours apart
+    responseTimeGraph.set_xticks(positions)
+    responseTimeGraph.set_xticklabels(userList)
+    responseTimeGraph.legend()
+    currentFigure.autofmt_xdate()
+
+    if totalUsers <= bigGraphThreshold:
+        responseTimeGraph.set_title("Response Time Percentiles")
+    else:
+        responseTimeGraph.set_title("Response Time Percentiles", size = 20)
 
+    responseTimeGraph.set_ylabel("Response Time (Minutes)")
+    responseTimeGraph.set_xlabel("Users")
 
-def graphAverageMessagesPerMonth():
+    return currentFigure
+
+def graphAverageMessagesPerMonth(userNames, monthActivityPerUser, totalUsers):
     """
-    Create a line graph of every user's average messages sent per month and save to output pdf 
+    Create a line graph of every user's average messages sent per month, returns the figure
     """
     currentFigure = plt.figure()
     averageMessagesPerMonth = plt.subplot()
     
-    for user in userDict:
-        userName = userDict[user].getFirstName()
-        userMonthActivity = userDict[user].getAveragedMonthActivity()
+    for userName, userMonthActivity in zip(userNames, monthActivityPerUser):
         currentPlot = averageMessagesPerMonth.plot(list(range(0,12)), userMonthActivity, label = userName)
 
     if totalUsers <= bigGraphThreshold:
@@ -128,19 +380,16 @@ def graphAverageMessagesPerMonth():
        
     currentFigure.autofmt_xdate()
 
-    pdf.savefig(currentFigure)
+    return currentFigure
 
-def graphAverageMessagesPerHour():
+def graphAverageMessagesPerHour(userNames, hourActivityPerUser, totalUsers):
     """
-    Create a line graph of every user's average messages sent per hour
+    Create a line graph of every user's average messages sent per hour, returns the figure
     """
-
     currentFigure = plt.figure()
     averageMessagesPerHour = plt.subplot()
 
-    for user in userDict:
-        userName = userDict[user].getFirstName()
-        userHourActivity = userDict[user].getAveragedHourActivity()
+    for userName, userHourActivity in zip(userNames, hourActivityPerUser):
         currentPlot = averageMessagesPerHour.plot(list(range(0,24)),userHourActivity, label = userName)
 
     if totalUsers <= bigGraphThreshold:
@@ -159,40 +408,78 @@ def graphAverageMessagesPerHour():
 
     currentFigure.autofmt_xdate()
 
-    pdf.savefig(currentFigure)
+    return currentFigure
+
+def graphTopWords(userNames, topWordsPerUser, totalUsers):
+    """
+    Create a grid of bar graphs holding each user's most used words, returns the figure
+    topWordsPerUser - list of (word, count) for each user, most used first
+    """
+    numColumns = min(3, len(userNames))
+    numRows = math.ceil(len(userNames) / numColumns)
+    currentFigure, axes = plt.subplots(numRows, numColumns, squeeze = False)
+    colors = list(globalColors)
+
+    for index, topWordsGraph in enumerate(axes.flat):
+        if index >= len(userNames):
+            topWordsGraph.axis("off") #Leave the unused spots of the last row empty
+            continue
+        topWords = topWordsPerUser[index][::-1] #Most used word at the top
+        topWordsGraph.barh([word for word, count in topWords], [count for word, count in topWords], color = colors[index % len(colors)])
+        topWordsGraph.set_title(userNames[index])
+
+    if totalUsers <= bigGraphThreshold:
+        currentFigure.suptitle("Most Used Words")
+    else:
+        currentFigure.suptitle("Most Used Words", size = 20)
+    currentFigure.tight_layout()
 
-def trackWordUsageGroup():
+    return currentFigure
+
+def trackWordUsageGroup(userDict, checkWordCount, topUsers = None, otherUsers = None, userNames = None):
     """
-    Generate a new figure for each word and plot a line graph for each user's usage of said word over a year 
+    Gather every user's usage of each tracked word over a year, each word gets its own page drawn by graphWordUsage()
+    topUsers, otherUsers - optional split from splitTopUsers(), the usage of otherUsers is added up into one entry
+    userNames - name of each entry, the first name of each user by default
+    Returns a list of pages in the same layout as gatherPages()
     """
+    if topUsers is None:
+        topUsers, otherUsers = list(userDict), []
+    if userNames is None:
+        userNames = [userDict[user].getFirstName() for user in topUsers]
+
+    trackedWordsPerUser = {user: userDict[user].getTrackedWords() for user in userDict}
+    pages = []
     for word in checkWordCount:
-        currentFigure = plt.figure()
-        trackedWordGraph = plt.subplot()
-        
-        for user in userDict:
-            userName = userDict[user].getFirstName()
-            
-            userTrackedWordHistory = userDict[user].getTrackedWords()
-            currentWordHistory = userTrackedWordHistory[word][1].getAveragedMonthActivity()
-
-            wordUsagePlot = plt.plot(list(range(0,12)), currentWordHistory, label = userName)
-        
-        if totalUsers <= bigGraphThreshold:
-            labelLines(plt.gca().get_lines())
-            trackedWordGraph.set_title("Usage of " + "\"" + word + "\"" + " per Month")
-            trackedWordGraph.set_ylabel("Times Used")
-            trackedWordGraph.set_xticks(np.arange(12))
-            trackedWordGraph.set_xticklabels(months)
-        else:
-            trackedWordGraph.legend()
-            trackedWordGraph.set_title("Usage of " + "\"" + word + "\"" + " per Month", size = 22)
-            trackedWordGraph.set_ylabel("Times Used")
-            trackedWordGraph.set_xticks(np.arange(12))
-            trackedWordGraph.set_xticklabels(months, fontsize = 16)
-        
-        currentFigure.autofmt_xdate()
-        pdf.savefig(currentFigure)
-
-graphData()
-
-pdf.close()
\ No newline at end of file
+        getWordHistory = lambda currentUser: trackedWordsPerUser[currentUser.getPeerID()][word][1].getAveragedMonthActivity()
+        wordHistoryPerUser = [getWordHistory(userDict[user]) for user in topUsers]
+        if otherUsers:
+            wordHistoryPerUser.append(sumSeries(userDict, otherUsers, getWordHistory))
+        pages.append(("graphWordUsage", (word, userNames, wordHistoryPerUser)))
+    return pages
+
+def graphWordUsage(word, userNames, wordHistoryPerUser, totalUsers):
+    """
+    Create a line graph of each user's usage of word over a year, returns the figure
+    """
+    currentFigure = plt.figure()
+    trackedWordGraph = plt.subplot()
+    
+    for userName, currentWordHistory in zip(userNames, wordHistoryPerUser):
+        wordUsagePlot = plt.plot(list(range(0,12)), currentWordHistory, label = userName)
+    
+    if totalUsers <= bigGraphThreshold:
+        labelLines(plt.gca().get_lines())
+        trackedWordGraph.set_title("Usage of " + "\"" + word + "\"" + " per Month")
+        trackedWordGraph.set_ylabel("Times Used")
+        trackedWordGraph.set_xticks(np.arange(12))
+        trackedWordGraph.set_xticklabels(months)
+    else:
+        trackedWordGraph.legend()
+        trackedWordGraph.set_title("Usage of " + "\"" + word + "\"" + " per Month", size = 22)
+        trackedWordGraph.set_ylabel("Times Used")
+        trackedWordGraph.set_xticks(np.arange(12))
+        trackedWordGraph.set_xticklabels(months, fontsize = 16)
+    
+    currentFigure.autofmt_xdate()
+    return currentFigure
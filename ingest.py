@@ -0,0 +1,438 @@
+import time, datetime, multiprocessing
+from collections import deque
+import user
+import instrument
+from eventstore import EventStore
+from rollup import DailyRollup
+from conversations import SessionTracker
+from wordtracker import WordTracker
+from decoder import MessageDecoder
+from reader import readLinesReversed, findShardBoundaries, getCompression, openCompressed, readChunks, splitLinesReversed, defaultChunkSize
+
+def parseMessage(messageData):
+    """
+    Pull out the text, media type and sender of a message event
+    Returns a tuple of (messageText, mediaFlag, peerID, senderName), see UserData.updateData() for mediaFlag values
+    messageData - JSON object of a single message event
+    """
+    mediaFlag = 0
+    messageText = ''
+
+    #Data of only the sender of the current message, includes peer_id, name, and phone number
+    currentSenderData = messageData['from']
+
+    #Code used to check if a message was sent or a photo/file
+    if 'text' not in messageData:
+        if 'media' in messageData:
+            mediaDict = messageData['media'] #Store the object containing info about the media sent
+            if 'caption' in mediaDict: #Found a photo
+                messageText = mediaDict['caption'] #Pass the caption
+                mediaFlag = 1
+            elif mediaDict['type'] == 'document': #Found a file
+                messageText = 'Document' #Pass in a blank string as no message was sent with it
+                mediaFlag = 2
+    else: #Encountered a normal message
+        messageText = messageData['text']
+        if 'media' in messageData: #Links are unique in that they include both text and media fields
+            mediaDict = messageData['media']
+            if 'url' in mediaDict: #Double check that it's a link
+                messageText = '' #ignoring links sent so they don't skew word count
+                mediaFlag = 3
+
+    currID = currentSenderData['peer_id']
+    if 'first_name' in currentSenderData: #set currSender as the sender's full name if available
+        currSender = currentSenderData['first_name'] + " " + currentSenderData['last_name']
+    else:
+        currSender = currentSenderData['print_name'] + str(currID)
+
+    return messageText, mediaFlag, currID, currSender
+
+class ChatData(object):
+    """
+    Class used to store every user's stats gathered from a dump, or from a single chunk of one when processing in parallel
+    """
+
+    def __init__(self, checkWordCount, hourRange, keyWords, useEventStore = False, keepRecords = False, jsonBackend = "auto",
+                    instrumented = False, topWords = 0, sessionGap = 0):
+        """
+        checkWordCount - list of words or phrases to track usage of
+        wordTracker - WordTracker built from checkWordCount, finds every tracked word in a message in one pass
+        hourRange - size 2 tuple with a range of hours from (0,23) to search in
+        keyWords - optional list of keywords to narrow down searches
+        userDict - dictionary of every user found {ID : UserData()}
+        totalMessageCount - number of message events processed
+        firstMessage - {ID: UNIX TIME CODE} of the first message processed, used to chain response times between chunks
+        mostRecentMessage - {ID: UNIX TIME CODE} of the last message processed
+        eventStore - EventStore used to compute activity and totals all at once at the end, None to update every user's
+                    stats one message at a time
+        records - list of every message processed stripped down to (UNIX TIME CODE, ID, text, mediaFlag), only kept if
+                    keepRecords is set so the messages can be processed again without reading the dump, see dumpcache.py
+        peerNames - name of each sender as of the first message processed from them {ID : name}
+        decoder - MessageDecoder used to turn lines into messages, jsonBackend picks the JSON parser it uses
+        instrumentation - Instrumentation timing every stage of reading the dump, only kept if instrumented is set,
+                    see instrument.py
+        rollup - DailyRollup of every message, built from the event store once processing is finished. None without an
+                    event store, see sliceDates()
+        topWords - number of most used words, phrases and emoji to find for each user, 0 to not look for any
+        sessionTracker - SessionTracker splitting the chat into sessions ended by sessionGap minutes of silence and
+                    finding who replies to whom, None if sessionGap is 0
+        """
+        self.checkWordCount = checkWordCount
+        self.wordTracker = WordTracker(checkWordCount)
+        self.hourRange = hourRange
+        self.keyWords = keyWords
+        self.userDict = dict()
+        self.totalMessageCount = 0
+        self.firstMessage = None
+        self.mostRecentMessage = {0:0}
+        self.eventStore = EventStore() if useEventStore else None
+        self.records = [] if keepRecords else None
+        self.peerNames = dict()
+        self.decoder = MessageDecoder(jsonBackend)
+        self.instrumentation = instrument.Instrumentation() if instrumented else None
+        self.rollup = None
+        self.topWords = topWords
+        self.sessionTracker = SessionTracker(sessionGap) if sessionGap > 0 else None
+
+    def processLine(self, currentLine):
+        """
+        Load a single line of the dump and update the stats of whoever sent it
+        currentLine - string or bytes holding one JSON object
+        """
+        #Load the message into a python dictionary, lines that aren't messages come back as None
+        messageData = self.decoder.decode(currentLine)
+
+        if messageData is not None:
+            self.processMessage(messageData)
+
+    def processMessage(self, messageData):
+        """
+        Update all stats with a single message event
+        messageData - JSON object of a message event
+        """
+        messageText, mediaFlag, currID, currSender = parseMessage(messageData)
+        self.addMessage(messageData, currID, currSender, messageText, mediaFlag)
+
+    def addMessage(self, messageData, currID, currSender, messageText, mediaFlag):
+        """
+        Update all stats with a message that has already been parsed, see parseMessage()
+        messageData - JSON object of the message, only 'date' is required
+        """
+        self.totalMessageCount+=1
+
+        #Correctly set the first message as the most recent message to set an intial date correctly
+        if self.firstMessage is None:
+            self.firstMessage = {currID:messageData['date']}
+            self.mostRecentMessage = self.firstMessage
+
+        #Declare a new user if they aren't already in userDict, {ID : UserData()}
+        if currID not in self.userDict:
+            self.userDict[currID] = user.UserData(currID, currSender)
+            self.peerNames[currID] = currSender
+
+        #Update all relevant info about the current sender of this message
+        self.userDict[currID].updateData(messageData, messageText, mediaFlag, self.wordTracker, self.mostRecentMessage,
+                                            self.eventStore, self.topWords)
+
+        #Run search methods for the current message to see if matches parameters set in start.py
+        if self.hourRange[0] <= self.hourRange[1]: #Only look for messages if a valid hour range was provided
+            self.searchMessage(messageData, currID, messageText)
+
+        if self.records is not None:
+            self.records.append((messageData['date'], currID, messageText, mediaFlag))
+
+        if self.sessionTracker is not None:
+            self.sessionTracker.addMessage(messageData['date'], currID)
+
+        #Store the time and user of the message just processed exp:(12345676: UNIX TIME CODE)
+        self.mostRecentMessage = {currID:messageData['date']}
+
+    def searchMessage(self, messageData, currID, messageText):
+        """
+        Check if a message matches the search settings and save it to its sender if it does
+        """
+        self.userDict[currID].findMessage(messageData, messageText, self.hourRange, self.keyWords)
+
+    def merge(self, other):
+        """
+        Combine the results of the chunk processed right after this one into this object, giving the same result as
+        processing both chunks in one go
+        other - ChatData object built from the next chunk of the dump
+        """
+        if other.firstMessage is None:
+            return
+
+        #The first message of other was never compared against the message before it, count that response now
+        boundaryResponses = []
+        if self.firstMessage is not None:
+            for currID in other.firstMessage:
+                if currID not in self.mostRecentMessage: #Ignore concurrent messages sent by the same user
+                    for sender in self.mostRecentMessage:
+                        responseTime = other.firstMessage[currID] - self.mostRecentMessage[sender]
+                        other.userDict[currID].addResponseTime(responseTime, sender)
+                        boundaryResponses.append((other.firstMessage[currID], currID, sender, responseTime))
+        else:
+            self.firstMessage = other.firstMessage
+
+        #Event stores can only be combined before they're applied, otherwise apply both and merge the finished users
+        if self.eventStore is not None and other.eventStore is not None:
+            self.eventStore.merge(other.eventStore)
+        else:
+            self.finishProcessing()
+            other.finishProcessing()
+            if self.rollup is not None and other.rollup is not None:
+                for timeStamp, currID, sender, responseTime in boundaryResponses:
+                    other.rollup.addResponse(timeStamp, currID, sender, responseTime)
+                self.rollup.merge(other.rollup)
+            else:
+                self.rollup = None
+
+        for currID in other.userDict:
+            if currID not in self.userDict:
+                self.userDict[currID] = other.userDict[currID]
+                self.peerNames[currID] = other.peerNames[currID]
+            else:
+                self.userDict[currID].mergeData(other.userDict[currID])
+
+        if self.records is not None and other.records is not None:
+            self.records.extend(other.records)
+
+        if self.sessionTracker is not None and other.sessionTracker is not None:
+            self.sessionTracker.merge(other.sessionTracker)
+
+        if other.instrumentation is not None:
+            if self.instrumentation is None:
+                self.instrumentation = other.instrumentation
+            else:
+                self.instrumentation.merge(other.instrumentation)
+
+        self.totalMessageCount += other.totalMessageCount
+        self.mostRecentMessage = other.mostRecentMessage
+
+    def finishProcessing(self):
+        """
+        Called once every message has been processed, fills in every user's stats from the event store if one was used
+        """
+        if self.eventStore is not None:
+            self.rollup = DailyRollup.fromEventStore(self.eventStore, self.wordTracker)
+            self.eventStore.applyToUsers(self.userDict)
+            self.eventStore = None
+
+    def sliceDates(self, firstDate = None, lastDate = None):
+        """
+        Return a new ChatData holding only the messages sent between two local dates, rebuilt from the daily rollup in a
+        fraction of the time it takes to read the dump. Searched messages sent in the range are kept, tracked words only
+        keep their activity per month and weekday, and most used words and sessions aren't kept at all
+        firstDate, lastDate - datetime.date objects, both included, either can be None to leave that end open
+        """
+        if self.rollup is None:
+            raise ValueError("Daily rollups are only built when the event store is used")
+        sliced = ChatData(self.checkWordCount, self.hourRange, self.keyWords)
+        sliced.rollup = self.rollup.slice(firstDate, lastDate)
+        sliced.userDict = sliced.rollup.buildUserDict(self.peerNames, list(self.userDict))
+        sliced.peerNames = {peerID: self.peerNames[peerID] for peerID in sliced.userDict}
+        sliced.totalMessageCount = sliced.rollup.getTotalMessageCount()
+
+        #Searched messages are stored with their local ISO time, which starts with the date
+        firstDay = (firstDate or datetime.date.min).isoformat()
+        lastDay = (lastDate or datetime.date.max).isoformat()
+        for peerID in sliced.userDict:
+            if peerID in self.userDict:
+                sliced.userDict[peerID].searchedMessages = {message: timeSent for message, timeSent in self.userDict[peerID].searchedMessages.items()
+                                                            if firstDay <= timeSent[:10] <= lastDay}
+        return sliced
+
+    def getUserDict(self):
+        """
+        Return the dictionary of every user found {ID : UserData()}
+        """
+        return self.userDict
+
+    def getTotalMessageCount(self):
+        """
+        Return the number of message events processed
+        """
+        return self.totalMessageCount
+
+def processShard(shard):
+    """
+    Process a single byte range of the dump, used as the worker function for parallel processing
+    shard - tuple of (fileName, start, end, chatSettings), chatSettings is a dictionary of arguments for ChatData
+    """
+    fileName, start, end, chatSettings = shard
+    chatData = ChatData(**chatSettings)
+    with open(fileName, "rb") as file:
+        processLines(chatData, readLinesReversed(file, start = start, end = end))
+    return chatData
+
+def processChunk(chunk):
+    """
+    Process a single chunk of a compressed dump, used as the worker function for compressed dumps
+    chunk - tuple of (data, chatSettings), data is a block of whole lines from readChunks(), see processShard() for chatSettings
+    """
+    data, chatSettings = chunk
+    chatData = ChatData(**chatSettings)
+    processLines(chatData, splitLinesReversed(data))
+    return chatData
+
+def processAppended(lines, chatSettings):
+    """
+    Return a ChatData of lines appended to the end of a dump by a later run of telegram-history-dump. They hold messages
+    sent after every message already in the dump, so they are processed oldest first and merged after the stats of the
+    rest of the dump. Lines are appended in the order they were sent, but a batch that is newest first like the rest of
+    the dump is turned around
+    lines - list of lines in file order
+    chatSettings - dictionary of arguments for ChatData
+    """
+    chatData = ChatData(**chatSettings)
+    messages = [messageData for messageData in map(chatData.decoder.decode, lines) if messageData is not None]
+    if len(messages) > 1 and messages[0]['date'] > messages[-1]['date']:
+        messages.reverse()
+    for messageData in messages:
+        chatData.processMessage(messageData)
+    if chatData.instrumentation is not None:
+        chatData.instrumentation.count("lines", len(lines))
+        chatData.instrumentation.count("bytes", sum(len(currentLine) + 1 for currentLine in lines))
+        chatData.instrumentation.count("messages", len(messages))
+    return chatData
+
+def processLines(chatData, lines):
+    """
+    Call chatData.processLine() on every line, timing each step when chatData is instrumented
+    """
+    if chatData.instrumentation is not None:
+        processLinesInstrumented(chatData, lines)
+    else:
+        for currentLine in lines:
+            chatData.processLine(currentLine)
+
+def processLinesInstrumented(chatData, lines):
+    """
+    Same as calling chatData.processLine() on every line, but times reading, decoding, updating users and searching
+    separately. Kept apart from the normal loop so runs without instrumentation pay nothing for it
+    """
+    instrumentation = chatData.instrumentation
+    readTime = decodeTime = updateTime = 0.0
+    numLines = numBytes = numMessages = 0
+    chatData.searchMessage = instrumentation.timed("search", chatData.searchMessage)
+    try:
+        lines = iter(lines)
+        while True:
+            startTime = time.perf_counter()
+            currentLine = next(lines, None)
+            readDone = time.perf_counter()
+            if currentLine is None:
+                readTime += readDone - startTime
+                break
+            messageData = chatData.decoder.decode(currentLine)
+            decodeDone = time.perf_counter()
+            if messageData is not None:
+                chatData.processMessage(messageData)
+                numMessages += 1
+            updateTime += time.perf_counter() - decodeDone
+            readTime += readDone - startTime
+            decodeTime += decodeDone - readDone
+            numLines += 1
+            numBytes += len(currentLine) + 1
+    finally:
+        del chatData.searchMessage #Back to the normal method, the timed one can't be pickled
+
+    #Searching is timed on its own inside of processMessage(), take it out of updateData
+    searchTime = instrumentation.stages["search"][0] if "search" in instrumentation.stages else 0.0
+    instrumentation.addTime("read", readTime, numLines + 1)
+    instrumentation.addTime("decode", decodeTime, numLines)
+    instrumentation.addTime("updateData", updateTime - searchTime, numMessages)
+    instrumentation.count("lines", numLines)
+    instrumentation.count("bytes", numBytes)
+    instrumentation.count("messages", numMessages)
+
+def ingestFile(fileName, checkWordCount, hourRange, keyWords, numProcesses = 1, useEventStore = False, keepRecords = False,
+                jsonBackend = "auto", end = None, topWords = 0, sessionGap = 0):
+    """
+    Process an entire dump and return a ChatData object with every user's stats
+    fileName - path to the .jsonl dump, which can also be compressed with gzip, bz2, xz or zstd, see ingestCompressed()
+    checkWordCount, hourRange, keyWords - see ChatData
+    numProcesses - number of processes to split the work across, the file is cut into chunks that are processed
+                    separately and merged back together in order, giving the same result as a single process
+    useEventStore - compute activity histograms and totals with numpy once every message is read, see EventStore
+    keepRecords - hold on to a stripped down copy of every message, see ChatData
+    jsonBackend - JSON parser to use, see MessageDecoder
+    end - only read the file up to this byte offset, which must be the end of a line, defaults to the end of the file.
+            Ignored for compressed dumps, which are always read in full
+    topWords - number of most used words, phrases and emoji to find for each user, see ChatData
+    sessionGap - minutes of silence that end a session, 0 to not split the chat into sessions, see ChatData
+    """
+    chatSettings = {"checkWordCount": checkWordCount, "hourRange": hourRange, "keyWords": keyWords,
+                    "useEventStore": useEventStore, "keepRecords": keepRecords, "jsonBackend": jsonBackend,
+                    "instrumented": instrument.isEnabled(), "topWords": topWords, "sessionGap": sessionGap}
+    compression = getCompression(fileName)
+    if compression is not None:
+        chatData = ingestCompressed(fileName, compression, chatSettings, numProcesses)
+    elif numProcesses <= 1:
+        chatData = processShard((fileName, 0, end, chatSettings))
+    else:
+        with open(fileName, "rb") as file:
+            boundaries = findShardBoundaries(file, numProcesses * 4, end) #Use extra chunks so faster processes can pick up slack
+
+        #The file is in reverse order, so the last chunk of the file has to be processed and merged first
+        shards = [(fileName, start, end, chatSettings) for start, end in reversed(boundaries)]
+
+        chatData = ChatData(**chatSettings)
+        with multiprocessing.Pool(numProcesses) as pool:
+            for shardData in pool.imap(processShard, shards):
+                with instrument.stage("merge"):
+                    chatData.merge(shardData)
+    with instrument.stage("finishProcessing"):
+        chatData.finishProcessing()
+    instrument.collect(chatData)
+    return chatData
+
+def ingestCompressed(fileName, compression, chatSettings, numProcesses = 1, chunkSize = defaultChunkSize):
+    """
+    Process a compressed dump without ever decompressing all of it, returns a ChatData object that still needs finishProcessing()
+    Compressed files can only be read forward, so the dump is decompressed a chunk at a time from its start, and since the
+    newest messages come first each chunk is older than the one before it. Every chunk is processed on its own in reverse,
+    then has the newer chunks merged into it, see pushChunk()
+    compression - format of the file, see getCompression()
+    chatSettings - dictionary of arguments for ChatData
+    numProcesses - number of processes working on chunks at once, at most two chunks per process are held in memory
+    chunkSize - number of decompressed bytes in each chunk, see readChunks()
+    """
+    chunkStack = []
+    with openCompressed(fileName, compression) as file:
+        chunks = ((data, chatSettings) for data in readChunks(file, chunkSize))
+        if numProcesses <= 1:
+            for chunk in chunks:
+                pushChunk(chunkStack, processChunk(chunk))
+        else:
+            with multiprocessing.Pool(numProcesses) as pool:
+                #Chunks are handed out as results come back instead of through imap(), which would decompress the whole dump up front
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.apply_async(processChunk, (chunk,)))
+                    if len(pending) >= numProcesses * 2:
+                        pushChunk(chunkStack, pending.popleft().get())
+                while pending:
+                    pushChunk(chunkStack, pending.popleft().get())
+
+    if not chunkStack:
+        return ChatData(**chatSettings)
+    chatData = chunkStack.pop()[1] #Oldest chunks are on top of the stack
+    with instrument.stage("merge"):
+        while chunkStack:
+            chatData.merge(chunkStack.pop()[1])
+    return chatData
+
+def pushChunk(chunkStack, chunkData):
+    """
+    Add the ChatData of the next chunk of a compressed dump to chunkStack, a list of (number of chunks, ChatData) holding
+    runs of chunks with the newest at the bottom. Neighbouring runs of the same length are merged like a binary counter,
+    so each chunk is merged about log2(number of chunks) times rather than the growing total being merged into every chunk
+    """
+    chunkStack.append((1, chunkData))
+    with instrument.stage("merge"):
+        while len(chunkStack) > 1 and chunkStack[-1][0] == chunkStack[-2][0]:
+            numChunks, olderData = chunkStack.pop()
+            newerChunks, newerData = chunkStack.pop()
+            olderData.merge(newerData)
+            chunkStack.append((numChunks + newerChunks, olderData))
@@ -0,0 +1,151 @@
+import sys, json, time, contextlib
+
+#resource is only available on unix, peak memory is left out without it
+try:
+    import resource
+except ImportError:
+    resource = None
+
+#Instrumentation of the current run, None while instrumentation is turned off so nothing is ever timed
+current = None
+
+class Instrumentation(object):
+    """
+    Class used to record how long each stage of a run takes, how many times each stage ran, and counters such as the
+    number of messages and bytes read
+    """
+
+    def __init__(self):
+        """
+        stages - total wall time and number of calls of each stage {name : [seconds, calls]}, in the order first seen
+        counters - running totals {name : amount}
+        startTime - perf_counter() time the instrumentation was created
+        """
+        self.stages = dict()
+        self.counters = dict()
+        self.startTime = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Time the code run inside a with block as one call of the named stage. Stages can be nested, the time of the
+        outer stage includes the stages inside of it
+        """
+        self.addTime(name, 0.0, 0) #List stages in the order they start rather than the order they finish
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addTime(name, time.perf_counter() - startTime)
+
+    def addTime(self, name, seconds, calls = 1):
+        """
+        Add time spent in a stage, used directly by loops that time many small calls themselves
+        """
+        if name not in self.stages:
+            self.stages[name] = [0.0, 0]
+        self.stages[name][0] += seconds
+        self.stages[name][1] += calls
+
+    def count(self, name, amount = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def timed(self, name, function):
+        """
+        Return a version of function that times every call to it as the named stage
+        """
+        def timedFunction(*arguments):
+            startTime = time.perf_counter()
+            try:
+                return function(*arguments)
+            finally:
+                self.addTime(name, time.perf_counter() - startTime)
+        return timedFunction
+
+    def merge(self, other):
+        """
+        Add the stages and counters of another Instrumentation, such as one recorded in a worker process, to this one
+        """
+        for name in other.stages:
+            self.addTime(name, other.stages[name][0], other.stages[name][1])
+        for name in other.counters:
+            self.count(name, other.counters[name])
+
+    def getSummary(self):
+        """
+        Return everything recorded so far as a dictionary that can be written as JSON
+        """
+        summary = {"totalSeconds": time.perf_counter() - self.startTime,
+                    "stages": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.stages.items()},
+                    "counters": dict(self.counters), "peakMemoryMB": getPeakMemory()}
+        #Runs served from the cache parse no messages, a throughput of 0 would only be misleading
+        if "ingest" in self.stages and self.stages["ingest"][0] > 0 and self.counters.get("messages", 0) > 0:
+            summary["messagesPerSecond"] = self.counters.get("messages", 0) / self.stages["ingest"][0]
+            summary["bytesPerSecond"] = self.counters.get("bytes", 0) / self.stages["ingest"][0]
+        return summary
+
+    def printSummary(self, outputFile = None):
+        """
+        Print a table of every stage followed by the counters, throughput and peak memory. Time spent reading a dump
+        on several processes is added up across all of them
+        outputFile - file to print to, defaults to sys.stdout
+        """
+        summary = self.getSummary()
+        print("Stage".ljust(20) + "Seconds".rjust(10) + "Calls".rjust(12) + "  % of run", file = outputFile)
+        for name in summary["stages"]:
+            seconds = summary["stages"][name]["seconds"]
+            share = 100 * seconds / summary["totalSeconds"] if summary["totalSeconds"] else 0
+            print(name.ljust(20) + str(round(seconds, 3)).rjust(10) + str(summary["stages"][name]["calls"]).rjust(12) +
+                    str(round(share, 1)).rjust(10), file = outputFile)
+        print("Total".ljust(20) + str(round(summary["totalSeconds"], 3)).rjust(10), file = outputFile)
+
+        for name in summary["counters"]:
+            print(name.capitalize() + ": " + str(summary["counters"][name]), file = outputFile)
+        if "messagesPerSecond" in summary:
+            print("Messages/sec: " + str(round(summary["messagesPerSecond"])), file = outputFile)
+            print("MB/sec: " + str(round(summary["bytesPerSecond"] / 1e6, 2)), file = outputFile)
+        if summary["peakMemoryMB"] is not None:
+            print("Peak memory (MB): " + str(round(summary["peakMemoryMB"], 1)), file = outputFile)
+
+    def writeJson(self, path):
+        with open(path, "w", encoding = "utf8") as jsonFile:
+            json.dump(self.getSummary(), jsonFile, indent = 4)
+
+def getPeakMemory():
+    """
+    Return the most memory this process and any processes it waited on have used at once in MB, or None if unknown
+    """
+    if resource is None:
+        return None
+    peakMemory = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peakMemory / (1024 * 1024 if sys.platform == "darwin" else 1024) #Reported in bytes on macOS and kilobytes elsewhere
+
+def enable():
+    """
+    Turn instrumentation on for everything run from now on, returns the new Instrumentation
+    """
+    global current
+    current = Instrumentation()
+    return current
+
+def disable():
+    global current
+    current = None
+
+def isEnabled():
+    return current is not None
+
+def stage(name):
+    """
+    Time a with block as the named stage when instrumentation is on, does nothing otherwise
+    """
+    return current.stage(name) if current is not None else contextlib.nullcontext()
+
+def collect(chatData):
+    """
+    Move the instrumentation recorded while reading a dump, possibly in other processes, into the current one
+    """
+    if chatData.instrumentation is not None:
+        if current is not None:
+            current.merge(chatData.instrumentation)
+        chatData.instrumentation = None
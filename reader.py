@@ -0,0 +1,171 @@
+import os, gzip, bz2, lzma
+
+try:
+    import zstandard #Optional, only needed to read dumps compressed with zstd
+except ImportError:
+    zstandard = None
+
+#Number of bytes pulled from the dump at a time when walking it backwards
+defaultBlockSize = 1 << 16
+
+#Number of decompressed bytes read from a compressed dump at a time, see readChunks()
+defaultChunkSize = 1 << 25
+
+#Bytes each compressed format starts with, files are recognized by these rather than by their name
+compressionMagic = (("gzip", b"\x1f\x8b"), ("bz2", b"BZh"), ("xz", b"\xfd7zXZ\x00"), ("zstd", b"\x28\xb5\x2f\xfd"))
+
+#Extensions compressed dumps are usually saved with, used when looking for dumps in a directory
+compressedExtensions = (".gz", ".bz2", ".xz", ".zst")
+
+def readLinesReversed(file, blockSize = defaultBlockSize, start = 0, end = None):
+    """
+    Generator that yields every line of a file starting from the last line and working towards the first, the same
+    order as reversed(file.readlines()) but without ever holding more than one block of the file in memory
+    file - file object opened in binary mode, lines are yielded as bytes without their trailing newline
+    blockSize - number of bytes read from the end of the file at a time
+    start - byte offset to stop reading at, must be the start of a line
+    end - byte offset to start reading backwards from, must be the end of a line, defaults to the end of the file
+    """
+    if end is None:
+        file.seek(0, os.SEEK_END)
+        end = file.tell()
+
+    position = end
+    remainder = b"" #Partial line left over at the front of the previous block
+    while position > start:
+        readSize = min(blockSize, position - start)
+        position -= readSize
+        file.seek(position)
+        lines = (file.read(readSize) + remainder).split(b"\n")
+        remainder = lines[0] #First piece may continue in the block before this one, hold on to it
+        for line in reversed(lines[1:]):
+            if line.strip(): #Skip blank lines such as the one after the final newline
+                yield line
+
+    if remainder.strip():
+        yield remainder
+
+def findShardBoundaries(file, numShards, end = None):
+    """
+    Split a file into byte ranges that each start and end on a line boundary so they can be read independently
+    Returns a list of (start, end) tuples in file order, empty ranges are left out
+    file - file object opened in binary mode
+    numShards - number of ranges to split the file into
+    end - byte offset to split the file up to, must be the end of a line, defaults to the end of the file
+    """
+    if end is None:
+        file.seek(0, os.SEEK_END)
+        end = file.tell()
+    fileSize = end
+
+    offsets = [0]
+    for shard in range(1, numShards):
+        target = fileSize * shard // numShards
+        if target <= offsets[-1]:
+            continue
+        file.seek(target - 1)
+        file.readline() #Move forward to the start of the next line
+        offsets.append(min(file.tell(), fileSize))
+    offsets.append(fileSize)
+
+    return [(offsets[i], offsets[i + 1]) for i in range(len(offsets) - 1) if offsets[i] < offsets[i + 1]]
+
+def readLines(file, blockSize = defaultBlockSize, start = 0, end = None):
+    """
+    Generator that yields every line of a file from first to last, reading one block at a time
+    file - file object opened in binary mode, lines are yielded as bytes without their trailing newline
+    start - byte offset to start reading at, must be the start of a line
+    end - byte offset to stop reading at, must be the end of a line, defaults to the end of the file
+    """
+    if end is None:
+        file.seek(0, os.SEEK_END)
+        end = file.tell()
+
+    file.seek(start)
+    position = start
+    remainder = b"" #Partial line left over at the end of the previous block
+    while position < end:
+        block = file.read(min(blockSize, end - position))
+        if not block:
+            break
+        position += len(block)
+        lines = (remainder + block).split(b"\n")
+        remainder = lines.pop() #Last piece may continue in the next block, hold on to it
+        for line in lines:
+            if line.strip():
+                yield line
+
+    if remainder.strip():
+        yield remainder
+
+def findLastLineEnd(file, start, end, blockSize = defaultBlockSize):
+    """
+    Return the offset just past the last newline between start and end, or start if there is none. Used to leave a line
+    that is still being written alone until it's finished
+    file - file object opened in binary mode
+    """
+    position = end
+    while position > start:
+        readSize = min(blockSize, position - start)
+        position -= readSize
+        file.seek(position)
+        lineEnd = file.read(readSize).rfind(b"\n")
+        if lineEnd != -1:
+            return position + lineEnd + 1
+    return start
+
+def getCompression(fileName):
+    """
+    Return the compression format of a file, one of "gzip", "bz2", "xz" or "zstd", or None if it isn't compressed
+    """
+    with open(fileName, "rb") as file:
+        header = file.read(6)
+    for compression, magic in compressionMagic:
+        if header.startswith(magic):
+            return compression
+    return None
+
+def openCompressed(fileName, compression):
+    """
+    Return a binary file object that decompresses fileName while it's read, only reading forward from the start is cheap
+    compression - format of the file, see getCompression()
+    """
+    if compression == "gzip":
+        return gzip.open(fileName, "rb")
+    if compression == "bz2":
+        return bz2.open(fileName, "rb")
+    if compression == "xz":
+        return lzma.open(fileName, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError(fileName + " is compressed with zstd, install zstandard to read it")
+        return zstandard.ZstdDecompressor().stream_reader(open(fileName, "rb"), read_across_frames = True, closefd = True)
+    raise ValueError("Unknown compression " + str(compression))
+
+def readChunks(file, chunkSize = defaultChunkSize):
+    """
+    Generator that splits a file into chunks of whole lines while reading it forward a single time, so compressed files
+    never have to be decompressed all at once. Each chunk ends right after a newline, except for the last one
+    file - file object opened in binary mode, only read() is used
+    chunkSize - number of bytes read at a time, a chunk is this long plus the rest of its last line
+    """
+    remainder = b"" #Partial line left over at the end of the previous read
+    while True:
+        block = file.read(chunkSize)
+        if not block:
+            break
+        lineEnd = block.rfind(b"\n") + 1
+        if lineEnd == 0: #A single line longer than the whole read, keep reading until it ends
+            remainder += block
+            continue
+        yield remainder + block[:lineEnd]
+        remainder = block[lineEnd:]
+
+    if remainder.strip():
+        yield remainder
+
+def splitLinesReversed(chunk):
+    """
+    Return every non blank line of a chunk from readChunks() as bytes, last line first, see readLinesReversed()
+    """
+    return [line for line in reversed(chunk.split(b"\n")) if line.strip()]
@@ -0,0 +1,256 @@
+import os, csv, json
+
+#Reports are written through a large buffer so big groups turn into a handful of writes instead of one per line
+writeBufferSize = 1 << 20
+
+class TextReportWriter(object):
+    """
+    Class used to write reports in the human readable layout of fullStats.txt
+    """
+    #Most people listed under each user's response times, the people they replied to most come first
+    maxResponsesByPerson = 10
+
+    #Most sessions, people and pairs of people listed in the sessions section, the longest and most active come first
+    maxSessionsListed = 10
+
+    def __init__(self, outputFile):
+        """
+        outputFile - text file to write to
+        """
+        self.outputFile = outputFile
+
+    def writeStart(self):
+        self.outputFile.write("\n")
+
+    def writeUser(self, userReport):
+        """
+        Write the stats of a single user
+        userReport - dictionary from UserData.getReport()
+        """
+        lines = ["-------------------" + userReport["name"] + "-------------------",
+                    "    Peer ID: " + str(userReport["peerID"]),
+                    "    Messages Sent: " + str(userReport["messages"]),
+                    "    Pictures Sent: " + str(userReport["pics"]),
+                    "    Files Sent: " + str(userReport["docs"]),
+                    "    Links Sent: " + str(userReport["links"]),
+                    "    Average Message Length (Words): " + str(round(userReport["averageWords"])),
+                    "    Average Characters Per Message: " + str(round(userReport["averageCharacters"])),
+                    "    Average Response Time(Minutes): " + str(userReport["averageResponseTime"]),
+                    "    Median Response Time(Minutes): " + str(userReport["medianResponseTime"]),
+                    "    90th Percentile Response Time(Minutes): " + str(userReport["responseTime90"]),
+                    "    99th Percentile Response Time(Minutes): " + str(userReport["responseTime99"]),
+                    "    Days Active: " + str(userReport["activeDays"]) + " of " + str(userReport["spanDays"]),
+                    "    Longest Streak (Days): " + str(userReport["longestStreak"]),
+                    "    Longest Break (Days): " + str(userReport["longestBreak"])]
+        for word, count in userReport["trackedWords"].items():
+            lines.append("    " + word + " : " + str(count))
+
+        #Only there when most used words were looked for
+        for title, key in (("Most Used Words: ", "topWords"), ("Most Used Phrases: ", "topPhrases"), ("Most Used Emoji: ", "topEmoji")):
+            if userReport[key] is not None:
+                lines.append(title)
+                for item in userReport[key]:
+                    countText = str(item["count"]) if item["error"] == 0 else str(item["count"]) + " (at most " + str(item["error"]) + " too high)"
+                    lines.append("    " + item["text"] + " : " + countText)
+
+        lines.append("Messages Sent per Month: ")
+        year = None
+        for month in userReport["months"]:
+            if month["year"] != year: #Months are grouped under their year
+                year = month["year"]
+                lines.append(str(year))
+            lines.append("    " + str(month["month"]) + ": " + str(month["messages"]))
+
+        lines.append("Average Messages Sent per Weekday:")
+        for weekday in userReport["weekdays"]:
+            lines.append("    " + weekday["weekday"] + ": " + str(weekday["averageMessages"]))
+
+        lines.append("Average Messages sent for each hour: ")
+        for hour in userReport["hours"]:
+            lines.append("    " + str(hour["hour"]) + ": " + str(hour["averageMessages"]))
+
+        lines.append("Response Times per Person Replied To (Minutes): ")
+        for person in userReport["responsesByPerson"][:self.maxResponsesByPerson]:
+            lines.append("    " + person["name"] + ": Median " + str(person["median"]) + ", 90th " + str(person["percentile90"]) +
+                            ", 99th " + str(person["percentile99"]) + " (" + str(person["responses"]) + " responses)")
+        if userReport["peopleRepliedTo"] > self.maxResponsesByPerson:
+            lines.append("    ...and " + str(userReport["peopleRepliedTo"] - self.maxResponsesByPerson) + " more")
+
+        lines.append("\n" + "Found " + str(len(userReport["searchedMessages"])) + " message(s) matching your parameters.")
+        lines.append("")
+        for message in userReport["searchedMessages"]:
+            lines.append("    " + message["text"] + "  : " + message["sent"])
+        self.outputFile.write("\n".join(lines) + "\n")
+
+    def writeSessions(self, sessionReport):
+        """
+        Write the sessions of the whole chat and who replies to whom
+        sessionReport - dictionary from SessionTracker.getReport()
+        """
+        lines = ["-------------------Sessions-------------------",
+                    "    Sessions (Split by " + str(sessionReport["sessionGap"]) + " Minutes of Silence): " + str(sessionReport["sessions"]),
+                    "    Average Messages per Session: " + str(sessionReport["averageMessages"]),
+                    "    Median Messages per Session: " + str(sessionReport["medianMessages"]),
+                    "    Average People per Session: " + str(sessionReport["averageParticipants"]),
+                    "    Average Session Length (Minutes): " + str(sessionReport["averageMinutes"]),
+                    "    Median Session Length (Minutes): " + str(sessionReport["medianMinutes"])]
+        lines.append("Longest Sessions: ")
+        for session in sessionReport["longestSessions"]:
+            lines.append("    " + session["start"] + " to " + session["end"] + ": " + str(session["messages"]) + " messages from " +
+                            str(session["participants"]) + " people, started by " + session["initiatorName"])
+        lines.append("Sessions Joined per Person: ")
+        for person in sessionReport["sessionsByUser"]:
+            lines.append("    " + person["name"] + ": " + str(person["joined"]) + " joined, " + str(person["started"]) + " started")
+        lines.append("Most Replies Between People (Minutes): ")
+        for pair in sessionReport["topReplies"]:
+            lines.append("    " + pair["responderName"] + " to " + pair["senderName"] + ": " + str(pair["replies"]) + " replies, Average " +
+                            str(pair["averageMinutes"]))
+        if sessionReport["replyPairs"] > len(sessionReport["topReplies"]):
+            lines.append("    ...and " + str(sessionReport["replyPairs"] - len(sessionReport["topReplies"])) + " more")
+        self.outputFile.write("\n" + "\n".join(lines) + "\n")
+
+    def writeEnd(self, summary):
+        """
+        Write the totals of the whole chat
+        summary - dictionary holding totalMessages
+        """
+        self.outputFile.write("\n" + "Total Messages Processed: " + str(summary["totalMessages"]) + "\n\n")
+
+class JsonLinesReportWriter(object):
+    """
+    Class used to write reports as JSON Lines, one object per user holding every stat from UserData.getReport() with
+    "type": "user", then a "type": "sessions" object holding every session and reply pair from SessionTracker.getReport()
+    if the chat was split into sessions, followed by a single "type": "summary" object
+    """
+    maxResponsesByPerson = None
+    maxSessionsListed = None
+
+    def __init__(self, outputFile):
+        self.outputFile = outputFile
+
+    def writeStart(self):
+        pass
+
+    def writeUser(self, userReport):
+        self.outputFile.write(json.dumps({"type": "user", **userReport}, ensure_ascii = False) + "\n")
+
+    def writeSessions(self, sessionReport):
+        self.outputFile.write(json.dumps({"type": "sessions", **sessionReport}, ensure_ascii = False) + "\n")
+
+    def writeEnd(self, summary):
+        self.outputFile.write(json.dumps({"type": "summary", **summary}, ensure_ascii = False) + "\n")
+
+class CsvReportWriter(object):
+    """
+    Class used to write reports as a single long CSV table with one value per row, laid out as
+    peerID, name, section, key, value. Sections are:
+        stat - key is the name of a stat from UserData.getReport() such as messages or averageResponseTime
+        trackedWord - key is the word, value is the times it was used
+        topWord, topPhrase, topEmoji - key is the word, phrase or emoji, value is the times it was used, which can be
+                    overcounted by up to the matching topWordError, topPhraseError or topEmojiError
+        month - key is YYYY-MM, value is the messages sent that month
+        weekday, hour - key is the weekday name or hour, value is the average messages sent
+        responses, responseMedian, response90, response99 - key is the peerID of the person replied to
+        searchedMessage - key is the local ISO time the message was sent, value is the message
+        sessionStat - key is the name of a stat from SessionTracker.getReport() such as sessions or averageMinutes,
+                    peerID and name are left empty
+        sessionMessages, sessionPeople, sessionMinutes - key is the local ISO time a session started,
+                    peerID and name are whoever started it
+        sessionsJoined, sessionsStarted - key is left empty, value is the number of sessions
+        replies, replyAverage - key is the peerID of the person replied to, value is the number of replies to them and
+                    the average minutes taken, only counting replies inside of a session
+        summary - totals of the whole chat, peerID and name are left empty
+    """
+    header = ("peerID", "name", "section", "key", "value")
+    maxResponsesByPerson = None
+    maxSessionsListed = None
+    statKeys = ("messages", "pics", "docs", "links", "words", "characters", "averageWords", "averageCharacters", "averageResponseTime",
+                "medianResponseTime", "responseTime90", "responseTime99", "activeDays", "spanDays", "longestStreak", "longestBreak",
+                "peopleRepliedTo")
+    sessionStatKeys = ("sessionGap", "sessions", "averageMessages", "medianMessages", "averageParticipants", "averageMinutes",
+                        "medianMinutes", "replyPairs")
+
+    def __init__(self, outputFile):
+        """
+        outputFile - text file to write to, opened with newline = "" as the csv module expects
+        """
+        self.writer = csv.writer(outputFile)
+
+    def writeStart(self):
+        self.writer.writerow(self.header)
+
+    def writeUser(self, userReport):
+        peerID, name = userReport["peerID"], userReport["name"]
+        rows = [(peerID, name, "stat", key, userReport[key]) for key in self.statKeys]
+        rows.extend((peerID, name, "trackedWord", word, count) for word, count in userReport["trackedWords"].items())
+        for section, key in (("topWord", "topWords"), ("topPhrase", "topPhrases"), ("topEmoji", "topEmoji")):
+            for item in userReport[key] or []:
+                rows.append((peerID, name, section, item["text"], item["count"]))
+                rows.append((peerID, name, section + "Error", item["text"], item["error"]))
+        rows.extend((peerID, name, "month", str(month["year"]) + "-" + str(month["month"]).zfill(2), month["messages"])
+                    for month in userReport["months"])
+        rows.extend((peerID, name, "weekday", weekday["weekday"], weekday["averageMessages"]) for weekday in userReport["weekdays"])
+        rows.extend((peerID, name, "hour", hour["hour"], hour["averageMessages"]) for hour in userReport["hours"])
+        for person in userReport["responsesByPerson"]:
+            rows.append((peerID, name, "responses", person["peerID"], person["responses"]))
+            rows.append((peerID, name, "responseMedian", person["peerID"], person["median"]))
+            rows.append((peerID, name, "response90", person["peerID"], person["percentile90"]))
+            rows.append((peerID, name, "response99", person["peerID"], person["percentile99"]))
+        rows.extend((peerID, name, "searchedMessage", message["sent"], message["text"]) for message in userReport["searchedMessages"])
+        self.writer.writerows(rows)
+
+    def writeSessions(self, sessionReport):
+        rows = [("", "", "sessionStat", key, sessionReport[key]) for key in self.sessionStatKeys]
+        for session in sessionReport["longestSessions"]:
+            initiator = (session["initiator"], session["initiatorName"])
+            rows.append(initiator + ("sessionMessages", session["start"], session["messages"]))
+            rows.append(initiator + ("sessionPeople", session["start"], session["participants"]))
+            rows.append(initiator + ("sessionMinutes", session["start"], session["minutes"]))
+        for person in sessionReport["sessionsByUser"]:
+            rows.append((person["peerID"], person["name"], "sessionsJoined", "", person["joined"]))
+            rows.append((person["peerID"], person["name"], "sessionsStarted", "", person["started"]))
+        for pair in sessionReport["topReplies"]:
+            rows.append((pair["responder"], pair["responderName"], "replies", pair["sender"], pair["replies"]))
+            rows.append((pair["responder"], pair["responderName"], "replyAverage", pair["sender"], pair["averageMinutes"]))
+        self.writer.writerows(rows)
+
+    def writeEnd(self, summary):
+        self.writer.writerows(("", "", "summary", key, summary[key]) for key in summary)
+
+reportWriters = {"text": TextReportWriter, "jsonl": JsonLinesReportWriter, "csv": CsvReportWriter}
+
+#Formats picked from the extension of the file written to, anything else is written as text
+reportExtensions = {".jsonl": "jsonl", ".json": "jsonl", ".csv": "csv"}
+
+def getReportFormat(path):
+    """
+    Return the report format matching the extension of path, "text" if it isn't .jsonl, .json or .csv
+    """
+    return reportExtensions.get(os.path.splitext(path)[1].lower(), "text")
+
+def writeReport(chatData, outputFile, reportFormat = "text"):
+    """
+    Write the stats of every user in chatData, then the sessions of the chat if it was split into them, followed by the
+    totals of the chat. Each user's stats are turned into plain data once by UserData.getReport() and handed to the writer
+    of the format asked for
+    outputFile - text file to write to
+    reportFormat - "text", "jsonl" or "csv", see reportWriters
+    """
+    writer = reportWriters[reportFormat](outputFile)
+    writer.writeStart()
+    userDict = chatData.getUserDict()
+    for peerID in userDict:
+        writer.writeUser(userDict[peerID].getReport(chatData.peerNames, writer.maxResponsesByPerson))
+    if chatData.sessionTracker is not None:
+        writer.writeSessions(chatData.sessionTracker.getReport(chatData.peerNames, writer.maxSessionsListed))
+    writer.writeEnd({"totalMessages": chatData.getTotalMessageCount(), "users": len(userDict)})
+
+def saveReport(chatData, path, reportFormat = None):
+    """
+    Write a report of chatData to a file through a large buffer
+    reportFormat - see writeReport(), picked from the extension of path if not given, see getReportFormat()
+    """
+    if reportFormat is None:
+        reportFormat = getReportFormat(path)
+    with open(path, "w", encoding = "utf8", newline = "" if reportFormat == "csv" else None, buffering = writeBufferSize) as outputFile:
+        writeReport(chatData, outputFile, reportFormat)
@@ -0,0 +1,146 @@
+import math
+from array import array
+
+#Gaps between messages longer than this many seconds (10 hours) are both people being asleep rather than a response
+maxResponseTime = 36000
+
+#Each bucket covers response times up to this much larger than the bucket before it, so any quantile read off a
+#histogram is within half of that (2.5%) of the real one. Times under 24 seconds each get a bucket of their own
+bucketGrowth = 1.05
+
+def buildBuckets():
+    """
+    Work out the bucket of every whole number of seconds below maxResponseTime
+    Returns (bucketTable, bucketBounds), bucketTable[seconds] is the bucket of a response time and bucketBounds[bucket]
+    is the (first, last) response time in seconds that falls in that bucket
+    """
+    bucketTable = array('B')
+    bucketBounds = []
+    previousPower = None
+    for seconds in range(maxResponseTime):
+        power = 0 if seconds == 0 else int(math.log(seconds, bucketGrowth)) + 1
+        if power != previousPower: #Short times skip powers since whole seconds can't be split any finer
+            bucketBounds.append((seconds, seconds))
+            previousPower = power
+        bucketBounds[-1] = (bucketBounds[-1][0], seconds)
+        bucketTable.append(len(bucketBounds) - 1)
+    return bucketTable, bucketBounds
+
+bucketTable, bucketBounds = buildBuckets()
+
+class ResponseHistogram(object):
+    """
+    Class used to hold a distribution of response times in a fixed set of log sized buckets. Memory is bounded by the number
+    of buckets no matter how many responses are added, and two histograms are merged by adding up their buckets, so histograms
+    built from separate chunks of a file or separate chats combine into exactly the histogram of all of them
+    """
+    __slots__ = ("buckets",)
+
+    def __init__(self):
+        """
+        buckets - number of responses in each bucket that has any, see bucketBounds {bucket : count}
+        """
+        self.buckets = dict()
+
+    def __iadd__(self, other):
+        self.merge(other)
+        return self
+
+    def add(self, responseTime):
+        """
+        Count a single response time in seconds, anything below 0 counts as 0 and anything at or above maxResponseTime is ignored
+        """
+        if responseTime < maxResponseTime:
+            bucket = bucketTable[responseTime] if responseTime > 0 else 0
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other):
+        """
+        Add every response of another ResponseHistogram to this one
+        """
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def getCount(self):
+        return sum(self.buckets.values())
+
+    def getQuantile(self, quantile):
+        """
+        Return the response time in minutes that quantile (0-1) of responses are at or under, None if there are no responses.
+        The middle of the bucket the quantile lands in is returned
+        """
+        return self.getQuantiles((quantile,))[0]
+
+    def getQuantiles(self, quantiles = (0.5, 0.9, 0.99)):
+        """
+        Return a list holding the response time in minutes of each quantile, the same as getQuantile() gives for each of them.
+        Every quantile is read off in a single walk over the buckets
+        """
+        count = self.getCount()
+        if count == 0:
+            return [None] * len(quantiles)
+        ranks = [max(1, math.ceil(quantile * count)) for quantile in quantiles]
+        results = [None] * len(quantiles)
+        pending = sorted(range(len(quantiles)), key = ranks.__getitem__, reverse = True) #Lowest rank last so it can be popped first
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            while pending and seen >= ranks[pending[-1]]:
+                results[pending.pop()] = (bucketBounds[bucket][0] + bucketBounds[bucket][1]) / 2 / 60
+            if not pending:
+                break
+        return results
+
+    def getHistogram(self):
+        """
+        Return a list of (first second, last second, number of responses) for every bucket with any responses, shortest first
+        """
+        return [(bucketBounds[bucket][0], bucketBounds[bucket][1], self.buckets[bucket]) for bucket in sorted(self.buckets)]
+
+class PairedResponses(object):
+    """
+    Class used to hold the response times of a single user split up by who they were replying to. Every (person, bucket)
+    pair is a single entry of one flat dictionary, which takes far less memory than a ResponseHistogram per person in
+    large groups where most people only reply to each other a handful of times
+    """
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        """
+        counts - number of responses to each person in each bucket {peer_id << 8 | bucket : count}
+        """
+        self.counts = dict()
+
+    def add(self, responseTime, repliedTo):
+        """
+        Count a single response time in seconds, see ResponseHistogram.add()
+        repliedTo - peer_id of the sender of the message being replied to
+        """
+        if responseTime < maxResponseTime:
+            key = repliedTo << 8 | (bucketTable[responseTime] if responseTime > 0 else 0)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+
+    def getHistogram(self, repliedTo = None):
+        """
+        Return a ResponseHistogram of every response to repliedTo, or of every response at all if repliedTo is None
+        """
+        histogram = ResponseHistogram()
+        for key, count in self.counts.items():
+            if repliedTo is None or key >> 8 == repliedTo:
+                histogram.buckets[key & 255] = histogram.buckets.get(key & 255, 0) + count
+        return histogram
+
+    def getHistogramsByPerson(self):
+        """
+        Return a ResponseHistogram for every person replied to {peer_id : ResponseHistogram}
+        """
+        histograms = dict()
+        for key, count in self.counts.items():
+            if key >> 8 not in histograms:
+                histograms[key >> 8] = ResponseHistogram()
+            histograms[key >> 8].buckets[key & 255] = count
+        return histograms
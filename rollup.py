@@ -0,0 +1,302 @@
+import datetime
+import numpy as np
+import user
+from eventstore import localCalendar, buildDailyActivity
+from responsetimes import maxResponseTime, bucketTable
+
+#Layout of DailyRollup.totals, the totals of one user on one day
+messagesTotal = 0
+wordsTotal = 1
+charactersTotal = 2
+picsTotal = 3
+docsTotal = 4
+linksTotal = 5
+responsesTotal = 6
+numTotals = 7
+
+#datetime.date.toordinal() of 1970-01-01
+epochOrdinal = 719163
+
+class DailyRollup(object):
+    """
+    Class holding a compact table with one row for every day each user sent a message, small enough to keep next to the
+    final stats. Every user's stats for any range of dates can be rebuilt from the rows of those days alone, without
+    reading the dump again. Rows are sorted by day and then by peer_id
+    """
+
+    def __init__(self, trackedWords, days = None, peerIDs = None, totals = None, responseSeconds = None, hours = None,
+                    wordEntries = None, responseEntries = None):
+        """
+        trackedWords - every tracked word without repeats, in the order of WordTracker.uniqueWords
+        days - local day of each row in days since 1970-01-01
+        peerIDs - sender of each row
+        totals - array of shape (rows, numTotals) laid out as described by messagesTotal, wordsTotal... above
+        responseSeconds - sum of every response time of each row, kept apart from totals since it needs 64 bit integers
+        hours - array of shape (rows, 24) holding the messages sent in each hour of the day
+        wordEntries - tracked words used on each row as a tuple of arrays (row, word index, times counted, times the
+                        word's ActivityInfo was updated), only rows that used a word have an entry
+        responseEntries - response times of each row as a tuple of arrays (row, key, count), keys are laid out the same
+                        as PairedResponses.counts
+        Entries are sorted by row, every array defaults to empty
+        """
+        self.trackedWords = list(trackedWords)
+        self.days = days if days is not None else np.zeros(0, dtype = np.int32)
+        self.peerIDs = peerIDs if peerIDs is not None else np.zeros(0, dtype = np.int64)
+        self.totals = totals if totals is not None else np.zeros((0, numTotals), dtype = np.int32)
+        self.responseSeconds = responseSeconds if responseSeconds is not None else np.zeros(0, dtype = np.int64)
+        self.hours = hours if hours is not None else np.zeros((0, 24), dtype = np.uint16)
+        self.wordEntries = wordEntries if wordEntries is not None else emptyEntries(4)
+        self.responseEntries = responseEntries if responseEntries is not None else emptyEntries(3)
+
+    @classmethod
+    def fromEventStore(cls, eventStore, wordTracker):
+        """
+        Build the rollup of every message in an EventStore
+        wordTracker - WordTracker the store's word hits were counted with
+        """
+        if eventStore.getNumMessages() == 0:
+            return cls(wordTracker.uniqueWords)
+        timeStamps, peerIDs, wordCounts, charCounts, mediaFlags = eventStore.getColumns()
+        days, hours = localCalendar(timeStamps)
+        numMessages = len(timeStamps)
+
+        #Response times the same way UserData.calculateResponseTime() counts them, between messages of different senders
+        gaps = np.diff(timeStamps)
+        isResponse = (peerIDs[1:] != peerIDs[:-1]) & (gaps < maxResponseTime)
+        responseSeconds = np.zeros(numMessages, dtype = np.int64)
+        responseSeconds[1:][isResponse] = gaps[isResponse]
+        isResponse = np.concatenate(([False], isResponse))
+
+        order, rowStarts, sortedRows = groupRows(days, peerIDs)
+        rowOfMessage = np.empty(numMessages, dtype = np.int64)
+        rowOfMessage[order] = sortedRows
+        numRows = len(rowStarts)
+        columns = [np.ones(numMessages), wordCounts, charCounts, mediaFlags == 1, mediaFlags == 2, mediaFlags == 3, isResponse]
+        totals = np.stack([np.bincount(rowOfMessage, weights = column, minlength = numRows) for column in columns], axis = 1)
+        rowSeconds = np.bincount(rowOfMessage, weights = responseSeconds, minlength = numRows)
+        rowHours = np.bincount(rowOfMessage * 24 + hours, minlength = numRows * 24).reshape(numRows, 24)
+        rollup = cls(wordTracker.uniqueWords, days[order][rowStarts].astype(np.int32), peerIDs[order][rowStarts],
+                        totals.astype(np.int32), rowSeconds.astype(np.int64), rowHours.astype(np.uint16))
+
+        hitMessages, hitWords, hitCounts = eventStore.getWordHits()
+        timesListed = np.array([wordTracker.getTimesListed(word) for word in wordTracker.uniqueWords], dtype = np.int64)
+        rollup.wordEntries = sumEntries(rowOfMessage[hitMessages], hitWords.astype(np.int64), [hitCounts, timesListed[hitWords]])
+
+        responseMessages = np.flatnonzero(isResponse)
+        responseBuckets = np.frombuffer(bucketTable, dtype = np.uint8)[np.maximum(responseSeconds[responseMessages], 0)]
+        rollup.responseEntries = sumEntries(rowOfMessage[responseMessages],
+                                            peerIDs[responseMessages - 1] << 8 | responseBuckets.astype(np.int64),
+                                            [np.ones(len(responseMessages), dtype = np.int64)])
+        return rollup
+
+    def getNumRows(self):
+        return len(self.days)
+
+    def getTotalMessageCount(self):
+        return int(self.totals[:, messagesTotal].sum())
+
+    def getDateRange(self):
+        """
+        Return the first and last local date with a message as a tuple of datetime.date, or (None, None) if there are none
+        """
+        if self.getNumRows() == 0:
+            return None, None
+        return dayToDate(int(self.days[0])), dayToDate(int(self.days[-1]))
+
+    def merge(self, other):
+        """
+        Add every row of another rollup to this one, rows of the same user on the same day are added together
+        """
+        if self.trackedWords != other.trackedWords:
+            raise ValueError("Rollups tracking different words can't be merged")
+        if other.getNumRows() == 0:
+            return
+
+        #Rows from before the first day of other stay as they are, which keeps merging a few new days into a long history quick
+        split = int(np.searchsorted(self.days, other.days[0]))
+        if split > 0:
+            tail = self.getRows(split, self.getNumRows())
+            tail.merge(other)
+            head = self.getRows(0, split)
+            self.days = np.concatenate((head.days, tail.days))
+            self.peerIDs = np.concatenate((head.peerIDs, tail.peerIDs))
+            self.totals = np.concatenate((head.totals, tail.totals))
+            self.responseSeconds = np.concatenate((head.responseSeconds, tail.responseSeconds))
+            self.hours = np.concatenate((head.hours, tail.hours))
+            self.wordEntries = appendEntries(head.wordEntries, tail.wordEntries, split)
+            self.responseEntries = appendEntries(head.responseEntries, tail.responseEntries, split)
+            return
+
+        numRows = self.getNumRows()
+        days = np.concatenate((self.days, other.days))
+        peerIDs = np.concatenate((self.peerIDs, other.peerIDs))
+        order, rowStarts, sortedRows = groupRows(days, peerIDs)
+        newRows = np.empty(len(days), dtype = np.int64)
+        newRows[order] = sortedRows
+
+        self.days = days[order][rowStarts]
+        self.peerIDs = peerIDs[order][rowStarts]
+        self.totals = np.add.reduceat(np.concatenate((self.totals, other.totals))[order], rowStarts)
+        self.responseSeconds = np.add.reduceat(np.concatenate((self.responseSeconds, other.responseSeconds))[order], rowStarts)
+        self.hours = np.add.reduceat(np.concatenate((self.hours, other.hours))[order], rowStarts).astype(np.uint16)
+        self.wordEntries = mergeEntries(self.wordEntries, other.wordEntries, newRows, numRows)
+        self.responseEntries = mergeEntries(self.responseEntries, other.responseEntries, newRows, numRows)
+
+    def addResponse(self, timeStamp, peerID, repliedTo, responseTime):
+        """
+        Count a response to a message that wasn't in the same rollup, used when chaining chunks of a dump together. The
+        message itself must already have a row
+        """
+        if responseTime >= maxResponseTime:
+            return
+        day = int(localCalendar(np.array([timeStamp], dtype = np.int64))[0][0])
+        row = np.flatnonzero((self.days == day) & (self.peerIDs == peerID))[0]
+        self.totals[row, responsesTotal] += 1
+        self.responseSeconds[row] += responseTime
+        key = repliedTo << 8 | (bucketTable[responseTime] if responseTime > 0 else 0)
+        rows, keys, counts = self.responseEntries
+        first, last = np.searchsorted(rows, [row, row + 1])
+        index = first + int(np.searchsorted(keys[first:last], key))
+        if index < last and keys[index] == key:
+            counts[index] += 1
+        else:
+            self.responseEntries = (np.insert(rows, index, row), np.insert(keys, index, key), np.insert(counts, index, 1))
+
+    def slice(self, firstDate = None, lastDate = None):
+        """
+        Return a new DailyRollup holding only the rows between two local dates, both included
+        firstDate, lastDate - datetime.date objects, either can be None to leave that end open
+        """
+        start = 0 if firstDate is None else int(np.searchsorted(self.days, firstDate.toordinal() - epochOrdinal, side = "left"))
+        end = self.getNumRows() if lastDate is None else int(np.searchsorted(self.days, lastDate.toordinal() - epochOrdinal, side = "right"))
+        return self.getRows(start, end)
+
+    def getRows(self, start, end):
+        """
+        Return a new DailyRollup holding rows start to end, sharing memory with this one
+        """
+        return DailyRollup(self.trackedWords, self.days[start:end], self.peerIDs[start:end], self.totals[start:end],
+                            self.responseSeconds[start:end], self.hours[start:end], sliceEntries(self.wordEntries, start, end),
+                            sliceEntries(self.responseEntries, start, end))
+
+    def buildUserDict(self, peerNames, userOrder = None):
+        """
+        Rebuild every user in the rollup as the UserData a run over just these days would have made. Tracked words have no
+        per hour activity since the rollup only counts them per day, and no messages are searched
+        peerNames - name of each sender {ID : name}
+        userOrder - optional list of IDs giving the order of the returned dictionary, users missing from it come last
+        Returns a dictionary {ID : UserData()}
+        """
+        userIDs, userIndex = np.unique(self.peerIDs, return_inverse = True)
+        numUsers = len(userIDs)
+        totals = np.zeros((numUsers, numTotals), dtype = np.int64)
+        np.add.at(totals, userIndex, self.totals)
+        responseSeconds = np.zeros(numUsers, dtype = np.int64)
+        np.add.at(responseSeconds, userIndex, self.responseSeconds)
+
+        rows, hoursOfDay = np.nonzero(self.hours)
+        activity = buildDailyActivity(userIndex[rows], self.days[rows].astype(np.int64), hoursOfDay,
+                                        self.hours[rows, hoursOfDay].astype(np.int64), numUsers)
+
+        usersByID = {int(userIDs[index]): index for index in range(numUsers)}
+        userDict = dict()
+        orderedIDs = [peerID for peerID in userOrder or [] if peerID in usersByID]
+        orderedIDs += [peerID for peerID in usersByID if peerID not in set(orderedIDs)]
+        for peerID in orderedIDs:
+            index = usersByID[peerID]
+            currentUser = user.UserData(peerID, peerNames[peerID])
+            currentUser.numMessages = int(totals[index, messagesTotal])
+            currentUser.totalLength = int(totals[index, wordsTotal])
+            currentUser.totalCharacters = int(totals[index, charactersTotal])
+            currentUser.mediaSent["pics"] = int(totals[index, picsTotal])
+            currentUser.mediaSent["docs"] = int(totals[index, docsTotal])
+            currentUser.mediaSent["links"] = int(totals[index, linksTotal])
+            currentUser.numResponses = int(totals[index, responsesTotal])
+            currentUser.totalResponseTime = int(responseSeconds[index])
+            currentUser.activity = activity[index]
+            if self.trackedWords:
+                currentUser.trackedWords = self.trackedWords
+            userDict[peerID] = currentUser
+
+        responseRows, responseKeys, responseCounts = self.responseEntries
+        for row, key, count in zip(responseRows.tolist(), responseKeys.tolist(), responseCounts.tolist()):
+            responses = userDict[int(self.peerIDs[row])].responseTimes.counts
+            responses[key] = responses.get(key, 0) + count
+
+        wordRows, wordIndices, wordHits, wordUpdates = self.wordEntries
+        for wordIndex, word in enumerate(self.trackedWords):
+            entries = wordIndices == wordIndex
+            wordUsers = userIndex[wordRows[entries]]
+            wordActivity = buildDailyActivity(wordUsers, self.days[wordRows[entries]].astype(np.int64), None,
+                                                wordUpdates[entries], numUsers)
+            hitsPerUser = np.bincount(wordUsers, weights = wordHits[entries], minlength = numUsers)
+            for index in np.unique(wordUsers).tolist():
+                userDict[int(userIDs[index])].wordDict[word] = [int(hitsPerUser[index]), wordActivity[index]]
+        return userDict
+
+def dayToDate(day):
+    """
+    Convert a day in days since 1970-01-01 to a datetime.date
+    """
+    return datetime.date.fromordinal(day + epochOrdinal)
+
+def groupRows(days, peerIDs):
+    """
+    Sort entries by day and then by peer_id
+    Returns (order, rowStarts, sortedRows), order sorts the entries, rowStarts holds where each (day, peer_id) starts once
+    sorted and sortedRows holds the row of each sorted entry
+    """
+    order = np.lexsort((peerIDs, days))
+    sortedDays = days[order]
+    sortedPeers = peerIDs[order]
+    isStart = np.ones(len(order), dtype = bool)
+    isStart[1:] = (sortedDays[1:] != sortedDays[:-1]) | (sortedPeers[1:] != sortedPeers[:-1])
+    return order, np.flatnonzero(isStart), np.cumsum(isStart) - 1
+
+def emptyEntries(numColumns):
+    """
+    Return a tuple of numColumns empty entry arrays
+    """
+    return tuple(np.zeros(0, dtype = np.int64) for column in range(numColumns))
+
+def sumEntries(rows, keys, values):
+    """
+    Add up entries with the same row and key, sorted by row and then by key
+    values - list of arrays to add up, one value per entry in each
+    Returns a tuple of arrays (rows, keys, *values), only keys need 64 bit integers
+    """
+    if len(rows) == 0:
+        return emptyEntries(2 + len(values))
+    order = np.lexsort((keys, rows))
+    sortedRows = rows[order]
+    sortedKeys = keys[order]
+    isStart = np.ones(len(order), dtype = bool)
+    isStart[1:] = (sortedRows[1:] != sortedRows[:-1]) | (sortedKeys[1:] != sortedKeys[:-1])
+    starts = np.flatnonzero(isStart)
+    return (sortedRows[starts].astype(np.int32), sortedKeys[starts].astype(np.int64),
+            *(np.add.reduceat(np.asarray(value, dtype = np.int64)[order], starts).astype(np.int32) for value in values))
+
+def mergeEntries(ourEntries, otherEntries, newRows, numRows):
+    """
+    Helper for DailyRollup.merge(), moves the entries of both rollups to their merged rows and adds up duplicates
+    numRows - number of rows in our rollup before merging, the rows of other come right after them
+    """
+    rows = newRows[np.concatenate((ourEntries[0], otherEntries[0].astype(np.int64) + numRows))]
+    keys = np.concatenate((ourEntries[1], otherEntries[1]))
+    values = [np.concatenate((ours, theirs)) for ours, theirs in zip(ourEntries[2:], otherEntries[2:])]
+    return sumEntries(rows, keys, values)
+
+def appendEntries(ourEntries, otherEntries, numRows):
+    """
+    Helper for DailyRollup.merge(), puts the entries of a rollup whose rows all come after ours behind our entries
+    numRows - number of rows in our rollup, the rows of other come right after them
+    """
+    return ((np.concatenate((ourEntries[0], otherEntries[0] + numRows)),)
+            + tuple(np.concatenate((ours, theirs)) for ours, theirs in zip(ourEntries[1:], otherEntries[1:])))
+
+def sliceEntries(entries, start, end):
+    """
+    Helper for DailyRollup.slice(), keeps the entries of rows start to end and renumbers them from 0
+    """
+    first, last = np.searchsorted(entries[0], [start, end])
+    return (entries[0][first:last] - start,) + tuple(column[first:last] for column in entries[1:])
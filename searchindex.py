@@ -0,0 +1,295 @@
+import os, re, sys, time, pickle, argparse, datetime
+from array import array
+import numpy as np
+from ingest import parseMessage
+from decoder import MessageDecoder
+from reader import readLinesReversed, getCompression, openCompressed, readChunks, splitLinesReversed
+from dateinfo import getCalendarDate
+
+#Bump whenever the layout of the saved index changes
+indexVersion = 1
+
+#Words are split on anything that isn't a letter or number, every other symbol such as an emoji is its own token
+tokenPattern = re.compile(r"\w+|[^\w\s]")
+
+def tokenize(messageText):
+    """
+    Split a message into lowercase tokens
+    """
+    return tokenPattern.findall(messageText.lower())
+
+def getIndexPath(fileName):
+    """
+    Return the path of the search index kept next to a dump
+    """
+    return fileName + ".index"
+
+class SearchIndex(object):
+    """
+    Class used to search through every message of a dump without reading the dump again. Holds an inverted index mapping
+    each token to the ids of the messages containing it, along with the sender, time and hour of day of every message
+    so results can be narrowed down by sender, date and hour without looking at the messages themselves
+    """
+
+    def __init__(self):
+        """
+        postings - dictionary mapping each token to the ids of the messages that contain it, in order {token : array}
+        timeStamps - unix time stamp of each message, indexed by message id
+        senders - peer_id of the sender of each message
+        hours - hour of the day each message was sent in, from 0-23
+        texts - text of each message
+        peerNames - name of each sender {ID : name}
+        fileSize, fileMtime - size and modification time of the dump the index was built from
+        """
+        self.postings = dict()
+        self.timeStamps = array('q')
+        self.senders = array('q')
+        self.hours = array('b')
+        self.texts = []
+        self.peerNames = dict()
+        self.fileSize = None
+        self.fileMtime = None
+
+    def addMessage(self, timeStamp, peerID, senderName, messageText):
+        """
+        Add a single message to the index, messages are given ids in the order they are added
+        """
+        messageID = len(self.texts)
+        self.timeStamps.append(timeStamp)
+        self.senders.append(peerID)
+        self.hours.append(getCalendarDate(timeStamp).hour)
+        self.texts.append(messageText)
+        if peerID not in self.peerNames:
+            self.peerNames[peerID] = senderName
+
+        for token in set(tokenize(messageText)):
+            if token not in self.postings:
+                self.postings[token] = array('q')
+            self.postings[token].append(messageID)
+
+    def getNumMessages(self):
+        return len(self.texts)
+
+    def getMessage(self, messageID):
+        """
+        Return (peerID, senderName, timeStamp, text) of a single message
+        """
+        peerID = self.senders[messageID]
+        return peerID, self.peerNames[peerID], self.timeStamps[messageID], self.texts[messageID]
+
+    def findToken(self, token):
+        """
+        Return a sorted numpy array of the ids of every message containing token
+        """
+        return np.frombuffer(self.postings[token], dtype = np.int64) if token in self.postings else np.zeros(0, dtype = np.int64)
+
+    def findAllTokens(self, tokens):
+        """
+        Return the ids of every message containing all of the given tokens, starting from the rarest token
+        """
+        matches = None
+        for token in sorted(tokens, key = lambda token: len(self.postings.get(token, ()))):
+            tokenMatches = self.findToken(token)
+            matches = tokenMatches if matches is None else np.intersect1d(matches, tokenMatches, assume_unique = True)
+            if len(matches) == 0:
+                break
+        return matches
+
+    def search(self, keyWords = None, phrase = None, hourRange = None, dateRange = None, senders = None):
+        """
+        Return the ids of every message matching all of the given filters, oldest first
+        keyWords - optional list of words, a message matches if it contains any of them. A keyword made of several words
+                    matches messages containing all of those words
+        phrase - optional string, a message matches if it contains these words next to each other in the same order
+        hourRange - optional size 2 tuple with a range of hours from (0,23), both ends included
+        dateRange - optional size 2 tuple of datetime.date objects, both ends included, either end can be None
+        senders - optional list of peer_ids the message must be sent by
+        """
+        matches = np.arange(self.getNumMessages(), dtype = np.int64)
+
+        if keyWords:
+            #Empty or whitespace only keywords split into no tokens and can't be in any message
+            keyWordMatches = [self.findAllTokens(tokenize(keyWord)) for keyWord in keyWords if tokenize(keyWord)]
+            matches = np.unique(np.concatenate(keyWordMatches)) if keyWordMatches else np.zeros(0, dtype = np.int64)
+
+        if phrase:
+            phraseTokens = tokenize(phrase)
+            if phraseTokens:
+                matches = np.intersect1d(matches, self.findAllTokens(phraseTokens), assume_unique = True)
+            else:
+                matches = np.zeros(0, dtype = np.int64)
+
+        if hourRange is not None:
+            hours = np.frombuffer(self.hours, dtype = np.int8)[matches]
+            matches = matches[(hours >= hourRange[0]) & (hours <= hourRange[1])]
+
+        if dateRange is not None:
+            timeStamps = np.frombuffer(self.timeStamps, dtype = np.int64)[matches]
+            if dateRange[0] is not None:
+                matches, timeStamps = keepWhere(matches, timeStamps, timeStamps >= dayStart(dateRange[0]))
+            if dateRange[1] is not None:
+                matches, timeStamps = keepWhere(matches, timeStamps, timeStamps < dayStart(dateRange[1] + datetime.timedelta(days = 1)))
+
+        if senders:
+            messageSenders = np.frombuffer(self.senders, dtype = np.int64)[matches]
+            matches = matches[np.isin(messageSenders, senders)]
+
+        if phrase:
+            #Only the presence of each token is indexed, check the few messages left actually have them next to each other
+            matches = np.array([messageID for messageID in matches if containsSequence(tokenize(self.texts[messageID]), phraseTokens)],
+                                dtype = np.int64)
+
+        return matches
+
+    def save(self, indexPath):
+        """
+        Write the index to disk, postings are packed into a single array so loading doesn't rebuild millions of objects
+        """
+        tokens = list(self.postings.keys())
+        offsets = np.zeros(len(tokens) + 1, dtype = np.int64)
+        offsets[1:] = np.cumsum([len(self.postings[token]) for token in tokens])
+        packedPostings = np.concatenate([np.frombuffer(self.postings[token], dtype = np.int64) for token in tokens]) if tokens else np.zeros(0, dtype = np.int64)
+
+        tempPath = indexPath + ".tmp"
+        with open(tempPath, "wb") as indexFile:
+            pickle.dump({"version": indexVersion, "tokens": tokens, "offsets": offsets, "postings": packedPostings,
+                        "timeStamps": self.timeStamps, "senders": self.senders, "hours": self.hours, "texts": self.texts,
+                        "peerNames": self.peerNames, "fileSize": self.fileSize, "fileMtime": self.fileMtime},
+                        indexFile, protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(tempPath, indexPath)
+
+    @classmethod
+    def load(cls, indexPath):
+        """
+        Load an index written by save(), returns None if there isn't one or if it was made by a different version
+        """
+        try:
+            with open(indexPath, "rb") as indexFile:
+                saved = pickle.load(indexFile)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(saved, dict) or saved.get("version") != indexVersion:
+            return None
+
+        index = cls()
+        offsets = saved["offsets"]
+        packedPostings = saved["postings"]
+        for position, token in enumerate(saved["tokens"]):
+            index.postings[token] = packedPostings[offsets[position]:offsets[position + 1]]
+        index.timeStamps = saved["timeStamps"]
+        index.senders = saved["senders"]
+        index.hours = saved["hours"]
+        index.texts = saved["texts"]
+        index.peerNames = saved["peerNames"]
+        index.fileSize = saved["fileSize"]
+        index.fileMtime = saved["fileMtime"]
+        return index
+
+def containsSequence(tokens, sequence):
+    """
+    Check if sequence shows up in tokens as a run of consecutive items
+    """
+    length = len(sequence)
+    return any(tokens[start:start + length] == sequence for start in range(len(tokens) - length + 1))
+
+def keepWhere(matches, values, mask):
+    """
+    Helper for SearchIndex.search(), filter the matched ids and their values with the same mask
+    """
+    return matches[mask], values[mask]
+
+def dayStart(day):
+    """
+    Return the unix time stamp of midnight local time at the start of day
+    """
+    return int(time.mktime(day.timetuple()))
+
+def buildIndex(fileName):
+    """
+    Read through a dump and build a SearchIndex of every message in it, oldest message first
+    """
+    index = SearchIndex()
+    decoder = MessageDecoder()
+    fileStats = os.stat(fileName)
+    compression = getCompression(fileName)
+    if compression is None:
+        with open(fileName, "rb") as file:
+            for currentLine in readLinesReversed(file):
+                messageData = decoder.decode(currentLine)
+                if messageData is not None:
+                    messageText, mediaFlag, currID, currSender = parseMessage(messageData)
+                    index.addMessage(messageData['date'], currID, currSender, messageText)
+    else:
+        #Compressed dumps are read from the newest chunk to the oldest, every message ends up in the index anyway so the
+        #parsed messages of each chunk are held on to until the oldest one is reached
+        chunkMessages = []
+        with openCompressed(fileName, compression) as file:
+            for chunk in readChunks(file):
+                messages = []
+                for currentLine in splitLinesReversed(chunk):
+                    messageData = decoder.decode(currentLine)
+                    if messageData is not None:
+                        messageText, mediaFlag, currID, currSender = parseMessage(messageData)
+                        messages.append((messageData['date'], currID, currSender, messageText))
+                chunkMessages.append(messages)
+        for messages in reversed(chunkMessages):
+            for message in messages:
+                index.addMessage(*message)
+    index.fileSize = fileStats.st_size
+    index.fileMtime = fileStats.st_mtime
+    return index
+
+def loadIndex(fileName, rebuild = False):
+    """
+    Return the SearchIndex for a dump, loaded from disk if the saved one is still up to date, otherwise built and saved
+    fileName - path to the .jsonl dump
+    rebuild - always build a new index
+    """
+    indexPath = getIndexPath(fileName)
+    fileStats = os.stat(fileName)
+    index = None if rebuild else SearchIndex.load(indexPath)
+    if index is None or index.fileSize != fileStats.st_size or index.fileMtime != fileStats.st_mtime:
+        index = buildIndex(fileName)
+        index.save(indexPath)
+    return index
+
+def searchMessages(fileName, keyWords = None, phrase = None, hourRange = None, dateRange = None, senders = None):
+    """
+    Search a dump, building its index the first time. Returns a list of (peerID, senderName, timeStamp, text) tuples,
+    see SearchIndex.search() for the filters
+    """
+    index = loadIndex(fileName)
+    return [index.getMessage(messageID) for messageID in index.search(keyWords, phrase, hourRange, dateRange, senders)]
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Search every message of a telegram-history-dump .jsonl file")
+    parser.add_argument("fileName", help = "path to the .jsonl file")
+    parser.add_argument("-k", "--keyword", action = "append", dest = "keyWords", help = "match messages containing this word, can be repeated")
+    parser.add_argument("-p", "--phrase", help = "match messages containing these words in this order")
+    parser.add_argument("--hours", nargs = 2, type = int, metavar = ("FIRST", "LAST"), help = "only messages sent between these hours (0-23)")
+    parser.add_argument("--from", dest = "fromDate", type = datetime.date.fromisoformat, help = "only messages sent on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest = "toDate", type = datetime.date.fromisoformat, help = "only messages sent on or before this date (YYYY-MM-DD)")
+    parser.add_argument("-s", "--sender", action = "append", type = int, dest = "senders", help = "only messages from this peer ID, can be repeated")
+    parser.add_argument("--limit", type = int, default = None, help = "print at most this many results")
+    parser.add_argument("--rebuild", action = "store_true", help = "rebuild the index even if it is up to date")
+    arguments = parser.parse_args(arguments)
+
+    index = loadIndex(arguments.fileName, arguments.rebuild)
+    dateRange = None
+    if arguments.fromDate is not None or arguments.toDate is not None:
+        dateRange = (arguments.fromDate, arguments.toDate)
+
+    startTime = time.perf_counter()
+    matches = index.search(arguments.keyWords, arguments.phrase, arguments.hours, dateRange, arguments.senders)
+    searchTime = (time.perf_counter() - startTime) * 1000
+
+    print("Found " + str(len(matches)) + " message(s) matching your parameters in " + str(round(searchTime, 2)) + " ms.")
+    print()
+    for messageID in matches[:arguments.limit]:
+        peerID, senderName, timeStamp, messageText = index.getMessage(messageID)
+        daySent = datetime.datetime.fromtimestamp(timeStamp).isoformat()
+        print("    " + daySent + "  " + senderName + " (" + str(peerID) + "): " + messageText)
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding = "utf8")
+    main()
@@ -1,6 +1,6 @@
-import os,sys,processFile
+import os,sys,datetime
 '''
-Input the name of your .jsonl file, ensure it's in the same directory as this file
+Input the name of your .jsonl file, ensure it's in the same directory as this file. Compressed files such as .jsonl.gz work too
 '''
 fileName = ""
 
@@ -9,6 +9,21 @@ Track the usage of certain words throughout, input phrases or words as strings
 ''' 
 trackWordUsage = []
 
+'''
+Find each user's most used words, two word phrases and emoji without having to list them, set to how many of each to show.
+Counts are exact until a user has used 200 times as many different words or phrases as are shown. Past that they are
+estimates, fullStats.txt shows how far off a count could be, and runs with numProcesses above 1 can list slightly different
+entries and counts than a single process run. Keep at 0 to skip this, which reads large files faster
+'''
+topWords = 0
+
+'''
+Split the chat into sessions, stretches of conversation ended by this many minutes of silence, and find who replies to whom.
+fullStats.txt gets a section with the longest sessions, how many sessions each person joined and started, and which people
+reply to each other the most along with how long they take. Keep at 0 to skip this
+'''
+sessionGap = 0
+
 '''
 SEARCH TOOL:
 hourRange - Put in a range of hours (0,23) in which you're looking for, keep at (1,0) if you don't want to search for anything
@@ -31,4 +46,56 @@ be ignored
 '''
 includeOnlyByPeerID = []
 
-processFile 
+'''
+Number of processes used to read through your file. The file is split into chunks that are processed at the same time and
+combined at the end, the results are identical to using a single process. Keep at 1 to use a single process
+'''
+numProcesses = 1
+
+'''
+Store every message in columns and compute activity per month/weekday/hour and totals for every user at once with numpy,
+much faster for large files than updating each user one message at a time. Set to False to update users as messages are read
+'''
+useEventStore = True
+
+'''
+Keep every message and the final stats in a cache file next to your .jsonl file (yourConversation.jsonl.telegraph). Running
+again on the same file only loads the cache, changing trackWordUsage or the search settings skips reading the file, and if
+new messages were added to the file only those get read. Pages of output.pdf are kept in output.pdf.pages as well, so only
+graphs whose data changed get drawn again
+'''
+useCache = True
+
+'''
+JSON parser used to read your file. "auto" picks the fastest one installed: orjson, then simdjson, then python's built in json
+'''
+jsonBackend = "auto"
+
+'''
+Only give the most active users their own line or bar in output.pdf, everyone else is added up into a single "Others" entry.
+Useful for large groups where hundreds of lines would be unreadable and slow to draw. Keep at None to graph every user
+'''
+maxGraphedUsers = None
+
+'''
+Only count messages sent between two dates, both included, given as datetime.date(2018, 1, 1). Either end can be None to leave
+it open. Keep at None to count every message. Once a file has been read with useCache on, changing this only takes a moment
+'''
+dateRange = None
+
+'''
+Also write every stat to fullStats.jsonl or fullStats.csv for other programs to read, set to "jsonl" or "csv". Keep at None to
+only write fullStats.txt
+'''
+exportFormat = None
+
+'''
+Also write dashboard.html, a single page of interactive charts that opens in any browser. Per user and per word charts are
+only loaded once you click on them, so it opens right away even for huge groups. Set makeGraphs to False to skip drawing
+output.pdf altogether, which is much quicker for large groups with many tracked words
+'''
+makeDashboard = False
+makeGraphs = True
+
+if __name__ == "__main__":
+    import processFile
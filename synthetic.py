@@ -0,0 +1,144 @@
+import os, sys, json, math, random, argparse
+
+#Words messages are made of, the first few are common enough to be worth tracking in benchmarks
+vocabulary = ["hey", "lol", "ok", "good", "morning", "what", "are", "you", "doing", "\U0001F914", "the", "a", "to", "and", "is",
+                "it", "that", "this", "for", "on", "yeah", "no", "haha", "see", "tomorrow", "cat", "dog", "food", "time", "now",
+                "why", "how", "when", "where", "who", "going", "think", "know", "really", "nice", "cool", "thanks", "sure",
+                "maybe", "later", "today", "night", "work", "home", "game"]
+
+#Share of messages of each kind, "text" messages are plain text and "service" events are not messages at all
+defaultMediaMix = {"text": 0.9, "photo": 0.05, "document": 0.015, "webpage": 0.015, "service": 0.02}
+
+class DumpSettings(object):
+    """
+    Class holding the shape of a synthetic dump
+    """
+
+    def __init__(self, numMessages = 10000, numUsers = 10, mediaMix = None, meanWords = 8, timeSpan = 365 * 86400,
+                    endTime = 1530000000, userSkew = 1.0, seed = 0):
+        """
+        numMessages - number of message events, service events are added on top of these
+        numUsers - number of people in the chat
+        mediaMix - share of each kind of event {kind : share}, see defaultMediaMix for the kinds
+        meanWords - average number of words per text message, lengths follow a geometric distribution like real chats
+        timeSpan - number of seconds between the first and last message, roughly
+        endTime - unix time stamp of the newest message
+        userSkew - how unevenly messages are spread between users, 0 gives everyone the same share and larger
+                    values make a few users send most of the messages
+        seed - seed of the random generator, the same settings always give the same dump
+        """
+        self.numMessages = numMessages
+        self.numUsers = numUsers
+        self.mediaMix = dict(mediaMix or defaultMediaMix)
+        self.meanWords = meanWords
+        self.timeSpan = timeSpan
+        self.endTime = endTime
+        self.userSkew = userSkew
+        self.seed = seed
+
+def buildSenders(numUsers):
+    """
+    Return the JSON of the "from" object of every user, already encoded since it is repeated on every message they send
+    """
+    senders = []
+    for userNumber in range(numUsers):
+        sender = {"peer_id": 100000 + userNumber, "peer_type": "user", "first_name": "First" + str(userNumber),
+                    "last_name": "Last" + str(userNumber), "print_name": "First" + str(userNumber) + "_Last" + str(userNumber),
+                    "username": "user" + str(userNumber), "phone": str(15550000000 + userNumber), "flags": 196609}
+        senders.append(json.dumps(sender, ensure_ascii = False))
+    return senders
+
+def generateLines(settings):
+    """
+    Yield the lines of a synthetic telegram-history-dump file as strings without newlines, newest message first
+    like a real dump. Lines are made one at a time so dumps of any size can be written without holding them in memory
+    settings - DumpSettings
+    """
+    randomGenerator = random.Random(settings.seed)
+    senders = buildSenders(settings.numUsers)
+    receiver = json.dumps({"peer_id": 1, "peer_type": "chat", "title": "Synthetic Group", "print_name": "Synthetic_Group",
+                            "members_num": settings.numUsers})
+    userWeights = [1 / (rank + 1) ** settings.userSkew for rank in range(settings.numUsers)]
+    kinds = list(settings.mediaMix)
+    kindWeights = [settings.mediaMix[kind] for kind in kinds]
+    serviceShare = settings.mediaMix.get("service", 0)
+    numEvents = round(settings.numMessages / (1 - serviceShare)) if serviceShare < 1 else settings.numMessages
+    meanGap = settings.timeSpan / max(numEvents, 1)
+    #Chance of a text message ending after each word, giving meanWords words on average
+    stopChance = 1 / max(settings.meanWords, 1)
+
+    messagesLeft = settings.numMessages
+    timeStamp = settings.endTime
+    messageID = settings.numMessages
+    while messagesLeft > 0:
+        sender = randomGenerator.choices(senders, userWeights)[0]
+        kind = randomGenerator.choices(kinds, kindWeights)[0]
+        if kind == "service":
+            yield '{"event": "service", "date": ' + str(timeStamp) + ', "from": ' + sender + ', "action": {"type": "chat_add_user"}}'
+        else:
+            start = '{"event": "message", "id": ' + str(messageID) + ', "flags": 257, "out": false, "unread": false, "service": false, "from": ' + sender + ', "to": ' + receiver + ', "date": ' + str(timeStamp)
+            if kind == "photo":
+                yield start + ', "media": {"type": "photo", "caption": ' + json.dumps(buildText(randomGenerator, stopChance), ensure_ascii = False) + '}}'
+            elif kind == "document":
+                yield start + ', "media": {"type": "document"}}'
+            elif kind == "webpage":
+                url = "https://example.com/" + str(messageID)
+                yield start + ', "text": "' + url + '", "media": {"type": "webpage", "url": "' + url + '"}}'
+            else:
+                yield start + ', "text": ' + json.dumps(buildText(randomGenerator, stopChance), ensure_ascii = False) + '}'
+            messagesLeft -= 1
+            messageID -= 1
+        #Going back in time, gaps are exponential so messages come in bursts with quiet stretches in between
+        timeStamp -= max(1, round(randomGenerator.expovariate(1 / meanGap))) if meanGap > 0 else 0
+
+def buildText(randomGenerator, stopChance):
+    """
+    Return the text of a single message, at least one word long
+    """
+    numWords = 1 + int(math.log(1 - randomGenerator.random()) / math.log(1 - stopChance)) if stopChance < 1 else 1
+    return " ".join(randomGenerator.choices(vocabulary, k = numWords))
+
+def writeDump(fileName, settings):
+    """
+    Write a synthetic dump to fileName, returns the size of the file in bytes
+    """
+    with open(fileName, "w", encoding = "utf8", newline = "\n") as dumpFile:
+        for line in generateLines(settings):
+            dumpFile.write(line)
+            dumpFile.write("\n")
+    return os.path.getsize(fileName)
+
+def addDumpArguments(parser):
+    """
+    Add a command line argument for every setting in DumpSettings to an ArgumentParser
+    """
+    parser.add_argument("-u", "--users", type = int, default = 10, dest = "numUsers", help = "number of people in the chat")
+    parser.add_argument("--mean-words", type = float, default = 8, dest = "meanWords", help = "average number of words per text message")
+    parser.add_argument("--days", type = float, default = 365, help = "number of days the chat spans")
+    parser.add_argument("--skew", type = float, default = 1.0, dest = "userSkew", help = "how unevenly messages are spread between users, 0 for evenly")
+    parser.add_argument("--media", default = None, help = "share of each kind of event, such as text=0.8,photo=0.1,document=0.05,webpage=0.03,service=0.02")
+    parser.add_argument("--seed", type = int, default = 0, help = "seed of the random generator")
+
+def settingsFromArguments(numMessages, arguments):
+    """
+    Build DumpSettings for numMessages messages from arguments parsed with addDumpArguments()
+    """
+    mediaMix = None
+    if arguments.media:
+        mediaMix = {kind: float(share) for kind, share in (pair.split("=") for pair in arguments.media.split(","))}
+    return DumpSettings(numMessages, arguments.numUsers, mediaMix, arguments.meanWords, round(arguments.days * 86400),
+                        userSkew = arguments.userSkew, seed = arguments.seed)
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Write a synthetic telegram-history-dump .jsonl file")
+    parser.add_argument("fileName", help = "path of the .jsonl file to write")
+    parser.add_argument("-n", "--messages", type = int, default = 10000, dest = "numMessages", help = "number of messages")
+    addDumpArguments(parser)
+    arguments = parser.parse_args(arguments)
+
+    fileSize = writeDump(arguments.fileName, settingsFromArguments(arguments.numMessages, arguments))
+    print("Wrote " + str(arguments.numMessages) + " messages (" + str(round(fileSize / 1e6, 1)) + " MB) to " + arguments.fileName)
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding = "utf8")
+    main()
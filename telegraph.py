@@ -0,0 +1,214 @@
+import sys, argparse, datetime
+import report
+import dashboard
+import instrument
+from ingest import ingestFile
+from dumpcache import ingestFileCached
+
+class AnalysisOptions(object):
+    """
+    Class holding every setting for a run of TeleGraph, see start.py for what each setting does
+    """
+
+    def __init__(self, trackWordUsage = None, hourRange = (1,0), keyWords = None, ignoreByPeerID = None,
+                    includeOnlyByPeerID = None, numProcesses = 1, useEventStore = True, useCache = True,
+                    jsonBackend = "auto", maxGraphedUsers = None, dateRange = None, statsPath = "fullStats.txt", graphPath = "output.pdf",
+                    makeGraphs = True, exportPath = None, topWords = 0, sessionGap = 0, dashboardPath = None):
+        """
+        trackWordUsage, hourRange, keyWords, ignoreByPeerID, includeOnlyByPeerID, numProcesses, useEventStore, useCache,
+        jsonBackend, maxGraphedUsers, dateRange, topWords, sessionGap - same as their counterparts in start.py
+        statsPath - path to write the full stats to, None to skip writing them
+        graphPath - path to write the graphs to
+        makeGraphs - set to False for a stats only run, which never imports matplotlib
+        exportPath - path to also write every stat to as .jsonl or .csv for other programs to read, see report.py
+        dashboardPath - path to also write an interactive HTML dashboard to, which never needs matplotlib, see dashboard.py
+        """
+        self.trackWordUsage = list(trackWordUsage or [])
+        self.hourRange = tuple(hourRange)
+        self.keyWords = list(keyWords or [])
+        self.ignoreByPeerID = list(ignoreByPeerID or [])
+        self.includeOnlyByPeerID = list(includeOnlyByPeerID or [])
+        self.numProcesses = numProcesses
+        self.useEventStore = useEventStore
+        self.useCache = useCache
+        self.jsonBackend = jsonBackend
+        self.maxGraphedUsers = maxGraphedUsers
+        self.dateRange = tuple(dateRange) if dateRange is not None else None
+        self.statsPath = statsPath
+        self.graphPath = graphPath
+        self.makeGraphs = makeGraphs
+        self.exportPath = exportPath
+        self.topWords = topWords
+        self.sessionGap = sessionGap
+        self.dashboardPath = dashboardPath
+
+    @classmethod
+    def fromConfig(cls, config):
+        """
+        Build options from a module or object laid out like start.py, such as parsed command line arguments. Any setting
+        it doesn't have keeps its default
+        """
+        options = cls()
+        for setting in vars(options):
+            if hasattr(config, setting):
+                setattr(options, setting, getattr(config, setting))
+        #The command line takes the ends of dateRange as two separate options
+        if getattr(config, "fromDate", None) is not None or getattr(config, "toDate", None) is not None:
+            options.dateRange = (config.fromDate, config.toDate)
+        return options
+
+def analyze(fileName, options = None):
+    """
+    Process a dump and return a ChatData object holding the stats of every user that wasn't filtered out
+    fileName - path to the .jsonl dump
+    options - AnalysisOptions, defaults are used if not given
+    """
+    if options is None:
+        options = AnalysisOptions()
+
+    with instrument.stage("ingest"):
+        if options.useCache:
+            chatData = ingestFileCached(fileName, options.trackWordUsage, options.hourRange, options.keyWords,
+                                        options.numProcesses, options.useEventStore, options.jsonBackend, options.topWords,
+                                        options.sessionGap)
+        else:
+            chatData = ingestFile(fileName, options.trackWordUsage, options.hourRange, options.keyWords,
+                                    options.numProcesses, options.useEventStore, jsonBackend = options.jsonBackend,
+                                    topWords = options.topWords, sessionGap = options.sessionGap)
+    return selectUsers(chatData, options)
+
+def selectUsers(chatData, options):
+    """
+    Narrow chatData down to options.dateRange and drop the users filtered out by options, returns the narrowed down ChatData.
+    The users are removed from chatData itself unless a date range was given
+    """
+    if options.dateRange is not None:
+        with instrument.stage("sliceDates"):
+            chatData = chatData.sliceDates(*options.dateRange)
+    filterUsers(chatData.getUserDict(), options.ignoreByPeerID, options.includeOnlyByPeerID)
+    return chatData
+
+def filterUsers(userDict, ignoreByPeerID, includeOnlyByPeerID):
+    """
+    Remove any users that we don't want to graph from userDict
+    ignoreByPeerID - list of peerIDs to remove
+    includeOnlyByPeerID - list of the only peerIDs to keep, an empty list keeps everyone
+    """
+    for peerID in ignoreByPeerID:
+        userDict.pop(peerID, None)
+
+    if len(includeOnlyByPeerID) != 0: #Assume an empty list here means we want all users by default, only run if peerIDs were specified
+        invalidKeys = [peerID for peerID in userDict if peerID not in includeOnlyByPeerID]
+        for invalidKey in invalidKeys: #Remove all unwanted peerIDs
+            userDict.pop(invalidKey, None)
+
+def writeStats(chatData, outputFile = None):
+    """
+    Print stats for each user in chat followed by the total number of messages
+    outputFile - file to print to, defaults to sys.stdout
+    """
+    report.writeReport(chatData, outputFile or sys.stdout)
+
+def writeGraphs(chatData, options, outputPath = None):
+    """
+    Draw every graph to options.graphPath, matplotlib is only imported here. With options.useCache on, pages are kept
+    next to options.graphPath and only the ones that changed since the last run are drawn again
+    outputPath - write the pdf here instead of options.graphPath, the page cache stays next to options.graphPath
+    """
+    import graph
+    pageCachePath = graph.getPageCachePath(options.graphPath) if options.useCache else None
+    graph.graphData(chatData.getUserDict(), options.trackWordUsage, outputPath or options.graphPath, options.numProcesses,
+                    options.maxGraphedUsers, pageCachePath)
+
+def writeDashboard(chatData, options):
+    """
+    Write the interactive HTML dashboard to options.dashboardPath
+    """
+    dashboard.saveDashboard(chatData, options.dashboardPath, options.trackWordUsage, options.maxGraphedUsers)
+
+def run(fileName, options = None):
+    """
+    Process a dump and write its stats and graphs to the paths given in options, returns the ChatData object
+    """
+    if options is None:
+        options = AnalysisOptions()
+
+    chatData = analyze(fileName, options)
+    if options.statsPath is not None:
+        with instrument.stage("report"):
+            report.saveReport(chatData, options.statsPath, "text")
+    if options.exportPath is not None:
+        with instrument.stage("export"):
+            report.saveReport(chatData, options.exportPath)
+    if options.dashboardPath is not None:
+        with instrument.stage("dashboard"):
+            writeDashboard(chatData, options)
+    if options.makeGraphs:
+        with instrument.stage("render"):
+            writeGraphs(chatData, options)
+    return chatData
+
+def addOptionArguments(parser):
+    """
+    Add a command line argument for every setting in AnalysisOptions except the output paths to an ArgumentParser
+    """
+    parser.add_argument("-t", "--track", action = "append", dest = "trackWordUsage", default = [], help = "word or phrase to track, can be repeated")
+    parser.add_argument("--hours", nargs = 2, type = int, default = (1,0), dest = "hourRange", metavar = ("FIRST", "LAST"), help = "search for messages sent between these hours (0-23)")
+    parser.add_argument("-k", "--keyword", action = "append", dest = "keyWords", default = [], help = "narrow down the search to messages with this keyword, can be repeated")
+    parser.add_argument("--ignore", action = "append", type = int, dest = "ignoreByPeerID", default = [], help = "peer ID to leave out, can be repeated")
+    parser.add_argument("--include-only", action = "append", type = int, dest = "includeOnlyByPeerID", default = [], help = "only keep these peer IDs, can be repeated")
+    parser.add_argument("-p", "--processes", type = int, default = 1, dest = "numProcesses", help = "number of processes used to read the file")
+    parser.add_argument("--no-event-store", action = "store_false", dest = "useEventStore", help = "update users one message at a time instead of using numpy")
+    parser.add_argument("--no-cache", action = "store_false", dest = "useCache", help = "don't read or write the cache next to the file, or the page cache next to the graphs")
+    parser.add_argument("--json-backend", default = "auto", dest = "jsonBackend", help = "auto, orjson, simdjson or json")
+    parser.add_argument("--from", dest = "fromDate", type = datetime.date.fromisoformat, help = "only count messages sent on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest = "toDate", type = datetime.date.fromisoformat, help = "only count messages sent on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--top-words", type = int, default = 0, dest = "topWords", help = "find this many of each user's most used words, phrases and emoji")
+    parser.add_argument("--sessions", type = int, default = 0, dest = "sessionGap", metavar = "MINUTES", help = "split the chat into sessions ended by this many minutes of silence and find who replies to whom")
+    parser.add_argument("--top", type = int, default = None, dest = "maxGraphedUsers", help = "only graph this many of the most active users, the rest are added up as \"Others\"")
+    parser.add_argument("--stats-only", action = "store_false", dest = "makeGraphs", help = "skip the graphs and never load matplotlib")
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Gather statistics and graphs from a telegram-history-dump .jsonl file")
+    parser.add_argument("fileName", help = "path to the .jsonl file, which can also be compressed with gzip, bz2, xz or zstd")
+    addOptionArguments(parser)
+    parser.add_argument("--stats", default = "fullStats.txt", dest = "statsPath", help = "where to write the full stats, - for the console")
+    parser.add_argument("--graphs", default = "output.pdf", dest = "graphPath", help = "where to write the graphs")
+    parser.add_argument("--export", default = None, dest = "exportPath", help = "also write every stat to this .jsonl or .csv file")
+    parser.add_argument("--dashboard", default = None, dest = "dashboardPath", help = "also write an interactive HTML dashboard to this file")
+    parser.add_argument("--timings", action = "store_true", help = "print how long each stage took at the end of the run")
+    parser.add_argument("--timings-json", default = None, dest = "timingsPath", help = "write how long each stage took to this JSON file")
+    parser.add_argument("--profile", default = None, dest = "profilePath", help = "run under cProfile, write the stats to this file and print the slowest functions. Only the main process is profiled")
+    arguments = parser.parse_args(arguments)
+
+    options = AnalysisOptions.fromConfig(arguments)
+    printToConsole = options.statsPath == "-"
+    if printToConsole:
+        options.statsPath = None
+
+    if arguments.timings or arguments.timingsPath:
+        instrument.enable()
+    if arguments.profilePath:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    chatData = run(arguments.fileName, options)
+    if printToConsole:
+        with instrument.stage("report"):
+            writeStats(chatData)
+
+    if arguments.profilePath:
+        import pstats
+        profiler.disable()
+        profiler.dump_stats(arguments.profilePath)
+        pstats.Stats(profiler, stream = sys.stderr).sort_stats("cumulative").print_stats(25)
+    if instrument.isEnabled():
+        if arguments.timings:
+            instrument.current.printSummary(sys.stderr)
+        if arguments.timingsPath:
+            instrument.current.writeJson(arguments.timingsPath)
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding = "utf8")
+    main()
@@ -0,0 +1,24 @@
+import os, io, sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report
+import synthetic
+
+def getReportText(chatData):
+    """
+    Return the text report of chatData as a string, used to compare whole runs against each other
+    """
+    outputFile = io.StringIO()
+    report.writeReport(chatData, outputFile)
+    return outputFile.getvalue()
+
+@pytest.fixture
+def dumpPath(tmp_path):
+    """
+    Path of a small synthetic dump
+    """
+    path = str(tmp_path / "dump.jsonl")
+    synthetic.writeDump(path, synthetic.DumpSettings(numMessages = 3000, numUsers = 6, timeSpan = 60 * 86400))
+    return path
@@ -0,0 +1,27 @@
+import io, gzip, lzma
+import pytest
+from conftest import getReportText
+from ingest import ingestFile, ingestCompressed
+from reader import readChunks
+
+chatSettings = {"checkWordCount": ["lol", "good morning"], "hourRange": (1,0), "keyWords": [], "useEventStore": True,
+                "keepRecords": False, "jsonBackend": "auto", "instrumented": False, "topWords": 15, "sessionGap": 30}
+
+@pytest.mark.parametrize("chunkSize", [100, 4096, 65536])
+def test_read_chunks(dumpPath, chunkSize):
+    with open(dumpPath, "rb") as dumpFile:
+        contents = dumpFile.read()
+    chunks = list(readChunks(io.BytesIO(contents), chunkSize))
+    assert b"".join(chunks) == contents
+    assert len(chunks) > 1 and all(chunk.endswith(b"\n") for chunk in chunks)
+
+@pytest.mark.parametrize("compression, openFile", [("gzip", gzip.open), ("xz", lzma.open)])
+@pytest.mark.parametrize("chunkSize, numProcesses", [(100, 1), (4096, 1), (4096, 3), (50000, 2)])
+def test_chunked_matches_plain(dumpPath, compression, openFile, chunkSize, numProcesses):
+    with open(dumpPath, "rb") as dumpFile, openFile(dumpPath + "." + compression, "wb") as compressedFile:
+        compressedFile.write(dumpFile.read())
+    expected = ingestFile(dumpPath, chatSettings["checkWordCount"], (1,0), [], useEventStore = True, topWords = 15, sessionGap = 30)
+
+    chatData = ingestCompressed(dumpPath + "." + compression, compression, chatSettings, numProcesses, chunkSize)
+    chatData.finishProcessing()
+    assert getReportText(chatData) == getReportText(expected)
@@ -0,0 +1,87 @@
+import os, json, datetime
+import pytest
+import synthetic
+import dumpcache
+from conftest import getReportText
+from dumpcache import ingestFileCached, hashBlockSize, hashNumBlocks
+from ingest import ingestFile
+
+@pytest.fixture
+def largeDumpPath(tmp_path):
+    """
+    Path of a synthetic dump large enough that only part of it is sampled by hashFileRange()
+    """
+    path = str(tmp_path / "large.jsonl")
+    synthetic.writeDump(path, synthetic.DumpSettings(numMessages = 15000, numUsers = 6))
+    assert os.path.getsize(path) > 3 * hashBlockSize * hashNumBlocks
+    return path
+
+def test_same_size_edit_in_place(largeDumpPath):
+    dumpPath = largeDumpPath
+    before = ingestFileCached(dumpPath, ["lol"], (1,0), [])
+
+    #Move a message of one user onto another without changing the size of the file, between the first two sampled blocks
+    with open(dumpPath, "r+b") as dumpFile:
+        contents = dumpFile.read()
+        dumpFile.seek(contents.index(b'"peer_id": 100001', 2 * hashBlockSize))
+        dumpFile.write(b'"peer_id": 100002')
+    assert os.path.getsize(dumpPath) == len(contents)
+    fileStats = os.stat(dumpPath)
+    os.utime(dumpPath, (fileStats.st_atime, fileStats.st_mtime + 10))
+
+    after = ingestFileCached(dumpPath, ["lol"], (1,0), [])
+    expected = ingestFile(dumpPath, ["lol"], (1,0), [])
+    assert getReportText(after) == getReportText(expected)
+    assert getReportText(after) != getReportText(before)
+
+def test_appended_lines(dumpPath, tmp_path):
+    with open(dumpPath, "rb") as dumpFile:
+        lines = dumpFile.readlines()
+    #A later run of telegram-history-dump appends the days since, newest first like the rest of the dump
+    grownPath = str(tmp_path / "grown.jsonl")
+    with open(grownPath, "wb") as dumpFile:
+        dumpFile.writelines(lines[1000:])
+    ingestFileCached(grownPath, ["lol"], (1,0), [], useEventStore = True, sessionGap = 30)
+    with open(grownPath, "ab") as dumpFile:
+        dumpFile.writelines(lines[:1000])
+
+    #A fresh dump of the same chat holds every message newest first
+    grown = ingestFileCached(grownPath, ["lol"], (1,0), [], useEventStore = True, sessionGap = 30)
+    expected = ingestFile(dumpPath, ["lol"], (1,0), [], useEventStore = True, sessionGap = 30)
+    assert getReportText(grown) == getReportText(expected)
+    #Daily totals and response times of the days around where the lines were appended
+    firstDay = datetime.date.fromtimestamp(json.loads(lines[1000])["date"]) - datetime.timedelta(days = 3)
+    lastDay = datetime.date.fromtimestamp(json.loads(lines[999])["date"]) + datetime.timedelta(days = 3)
+    assert getReportText(grown.sliceDates(firstDay, lastDay)) == getReportText(expected.sliceDates(firstDay, lastDay))
+    assert grown.rollup.getTotalMessageCount() == expected.rollup.getTotalMessageCount()
+
+    #Changing a setting replays the cached messages in the order they were sent
+    replayed = ingestFileCached(grownPath, ["ok"], (1,0), [], useEventStore = True, sessionGap = 30)
+    assert getReportText(replayed) == getReportText(ingestFile(dumpPath, ["ok"], (1,0), [], useEventStore = True, sessionGap = 30))
+
+def test_prefix_edit_before_append(largeDumpPath):
+    dumpPath = largeDumpPath
+    ingestFileCached(dumpPath, [], (1,0), [])
+    with open(dumpPath, "r+b") as dumpFile:
+        contents = dumpFile.read()
+        dumpFile.seek(contents.index(b'"peer_id": 100001', 2 * hashBlockSize))
+        dumpFile.write(b'"peer_id": 100003')
+        dumpFile.seek(0, os.SEEK_END)
+        dumpFile.write(contents.splitlines(keepends = True)[-1])
+
+    assert getReportText(ingestFileCached(dumpPath, [], (1,0), [])) == getReportText(ingestFile(dumpPath, [], (1,0), []))
+
+def test_settings_changed(dumpPath):
+    ingestFileCached(dumpPath, ["lol"], (1,0), [])
+    replayed = ingestFileCached(dumpPath, ["ok", "good morning"], (1,0), [], sessionGap = 30)
+    expected = ingestFile(dumpPath, ["ok", "good morning"], (1,0), [], sessionGap = 30)
+    assert getReportText(replayed) == getReportText(expected)
+
+def test_cache_not_writable(dumpPath, monkeypatch):
+    #Tests usually run as a user that can write anywhere, so writing the cache is made to fail like it would in a read only directory
+    def failWrite(*arguments, **keywordArguments):
+        raise PermissionError("read only")
+    monkeypatch.setattr(dumpcache.pickle, "dump", failWrite)
+    chatData = ingestFileCached(dumpPath, [], (1,0), [])
+    assert getReportText(chatData) == getReportText(ingestFile(dumpPath, [], (1,0), []))
+    assert os.listdir(os.path.dirname(dumpPath)) == [os.path.basename(dumpPath)]
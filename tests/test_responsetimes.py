@@ -0,0 +1,10 @@
+from responsetimes import ResponseHistogram
+
+def test_quantile_units_match():
+    histogram = ResponseHistogram()
+    for responseTime in (5, 30, 90, 600, 3000, 3000, 7200):
+        histogram.add(responseTime)
+    quantiles = (0.5, 0.9, 0.99)
+    assert [histogram.getQuantile(quantile) for quantile in quantiles] == histogram.getQuantiles(quantiles)
+    assert 9 <= histogram.getQuantile(0.5) <= 11 #600 seconds lands in a bucket around 10 minutes
+    assert ResponseHistogram().getQuantile(0.5) is None
@@ -0,0 +1,19 @@
+from searchindex import SearchIndex
+
+def buildTestIndex():
+    index = SearchIndex()
+    index.addMessage(1530000000, 1, "Alice", "good morning!!!")
+    index.addMessage(1530000100, 2, "Bob", "morning, what are you doing")
+    index.addMessage(1530000200, 1, "Alice", "nothing much")
+    return index
+
+def test_keywords():
+    index = buildTestIndex()
+    assert list(index.search(keyWords = ["morning"])) == [0, 1]
+    assert list(index.search(keyWords = ["nothing", "what"])) == [1, 2]
+
+def test_keywords_without_tokens():
+    index = buildTestIndex()
+    assert len(index.search(keyWords = [""])) == 0
+    assert len(index.search(keyWords = ["   "], senders = [1])) == 0
+    assert len(index.search(phrase = "   ")) == 0
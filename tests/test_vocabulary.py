@@ -0,0 +1,42 @@
+import vocabulary
+from conftest import getReportText
+from ingest import ingestFile
+
+def getTopLists(chatData):
+    """
+    Return every user's most used words, phrases and emoji {(ID, kind) : [(item, count, error)]}
+    """
+    topLists = dict()
+    for peerID, user in chatData.getUserDict().items():
+        topLists[(peerID, "words")] = user.vocabulary.getTopWords()
+        topLists[(peerID, "phrases")] = user.vocabulary.getTopPhrases()
+        topLists[(peerID, "emoji")] = user.vocabulary.getTopEmoji()
+    return topLists
+
+def test_sharded_matches_serial_while_exact(dumpPath):
+    #The synthetic vocabulary makes fewer different phrases than the summaries hold at this size, so every count is exact
+    serial = ingestFile(dumpPath, [], (1,0), [], topWords = 15)
+    sharded = ingestFile(dumpPath, [], (1,0), [], numProcesses = 3, topWords = 15)
+    assert getReportText(sharded) == getReportText(serial)
+    assert all(error == 0 for topList in getTopLists(serial).values() for item, count, error in topList)
+
+def test_sharded_within_error_bounds(dumpPath, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(vocabulary, "capacityPerShown", 10 ** 6)
+        exact = {key: {item: count for item, count, error in topList}
+                    for key, topList in getTopLists(ingestFile(dumpPath, [], (1,0), [], topWords = 10 ** 4)).items()}
+
+    serial = getTopLists(ingestFile(dumpPath, [], (1,0), [], topWords = 5))
+    sharded = getTopLists(ingestFile(dumpPath, [], (1,0), [], numProcesses = 3, topWords = 5))
+    assert any(error > 0 for topList in serial.values() for item, count, error in topList)
+    for key in serial:
+        for topList in (serial[key], sharded[key]):
+            for item, count, error in topList:
+                assert count - error <= exact[key][item] <= count
+                assert error * 2 < count
+        #Both counts are within their error of the real count, so they can't be further apart than that
+        shardedItems = {item: (count, error) for item, count, error in sharded[key]}
+        for item, count, error in serial[key]:
+            if item in shardedItems:
+                shardedCount, shardedError = shardedItems[item]
+                assert count - shardedCount <= error and shardedCount - count <= shardedError
@@ -1,13 +1,18 @@
-import math, datetime, dateinfo
+import sys, math, datetime, dateinfo, report
 from dateinfo import ActivityInfo
+from wordtracker import WordTracker
+from responsetimes import PairedResponses, maxResponseTime
+from vocabulary import VocabularyInfo
 
 class UserData(object):
     """
     Class used to store all relevant data for each user 
     """
-    #Used in the printWeekdayInfo() method to translate numbers to their corresponding strings
+    #Used in the getReport() method to translate numbers to their corresponding strings
     weekdays = {0: "Sunday", 1: "Monday", 2: "Tuesday", 3: "Wednesday",
                 4: "Thursday", 5: "Friday", 6: "Saturday"}
+    __slots__ = ("id", "name", "numMessages", "totalLength", "totalCharacters", "numResponses", "totalResponseTime",
+                    "responseTimes", "mediaSent", "wordDict", "trackedWords", "activity", "searchedMessages", "vocabulary")
 
     def __init__(self, idNum, name):
         """
@@ -18,12 +23,16 @@ class UserData(object):
         totalCharacters - number of characters sent by user
         numResponses - number of times the user has sent a message right after another user
         totalResponseTime - sum of time between user sending a message after another user
+        responseTimes - PairedResponses holding the distribution of those times split up by who was replied to
         mediaSent - dictionary holding the number of times a type of media was sent
         wordDict - dictionary holding the number of times a certain word was used. Used to keep track of words 
                 that user wants to see exp: {"test" : [234, activityInfo()], "hello" : [234, activityInfo()]}
+                Only words this user actually used are kept, see getTrackedWords() for every tracked word
+        trackedWords - list of every word being tracked, shared by every user
         activity - activityInfo object holding user activity in terms of time 
         searchedMessages - dictionary holding messages and their corresponding time sent that match the parameters given by the user
                             {"hey":UNIXTIMESTAMP}
+        vocabulary - VocabularyInfo finding this user's most used words, phrases and emoji, None unless they're being looked for
         """
         self.id = idNum
         self.name = name
@@ -32,12 +41,15 @@ class UserData(object):
         self.totalCharacters = 0
         self.numResponses = 0
         self.totalResponseTime = 0
+        self.responseTimes = PairedResponses()
         self.mediaSent = {"pics":0, "docs":0, "links":0}
         self.wordDict = dict()
+        self.trackedWords = None
         self.activity = dateinfo.ActivityInfo()
         self.searchedMessages = dict()
+        self.vocabulary = None
     
-    def updateData(self, messageData, message, mediaFlag, words, mostRecentMessage):
+    def updateData(self, messageData, message, mediaFlag, words, mostRecentMessage, eventStore = None, topWords = 0):
         """
         Method called to update all relevant stats for a specific person
         messageData - Object containing all info about current sender/receiver/media/time
@@ -46,14 +58,18 @@ class UserData(object):
                     1 - Picture
                     2 - Document
                     3 - Webpage
-        words -  List containing special words to keep track of indicated by the user 
+        words -  WordTracker or list containing special words to keep track of indicated by the user 
         mostRecentMessage - Dict containing the peerID and time of the last processed message
+        eventStore - Optional EventStore, if given the message counts, lengths, media counts and activity of this user
+                    are recorded there and filled in later by EventStore.applyToUsers()
+        topWords - number of most used words, phrases and emoji to find for this user, 0 to not look for any
         """
+        messageWords = message.split()
 
-        self.numMessages += 1
-        
-        #Update Date Info
-        self.processDates(messageData)
+        if eventStore is not None:
+            eventStore.addMessage(messageData['date'], self.id, message, mediaFlag, len(messageWords))
+        else:
+            self.updateCounters(messageData, message, mediaFlag, messageWords)
 
         #Calculate Response Time 
         if self.id not in mostRecentMessage: #Ignore concurrent messages sent by the same user
@@ -61,7 +77,21 @@ class UserData(object):
 
         #Keep track of occurences of certain words 
         if len(words) != 0:
-            self.checkSpecificWords(message, messageData, words)
+            self.checkSpecificWords(message, messageData, words, eventStore)
+
+        if topWords:
+            if self.vocabulary is None:
+                self.vocabulary = VocabularyInfo(topWords)
+            self.vocabulary.addMessage(message, messageWords)
+
+    def updateCounters(self, messageData, message, mediaFlag, messageWords = None):
+        """
+        Update the message count, activity, media and length stats with a single message, see updateData()
+        """
+        self.numMessages += 1
+
+        #Update Date Info
+        self.processDates(messageData)
 
         #Increment appropriate Media Counter 
         if mediaFlag == 1:
@@ -72,7 +102,50 @@ class UserData(object):
             self.updateNumLinks()
         
         #Update Word and Character Lengths 
-        self.updateLength(message)
+        self.updateLength(message, messageWords)
+
+    def mergeData(self, other):
+        """
+        Combine the stats of the same user gathered from a later chunk of the file into this object
+        other - UserData object for the same peer_id, built from the messages processed right after ours
+        """
+        self.numMessages += other.numMessages
+        self.totalLength += other.totalLength
+        self.totalCharacters += other.totalCharacters
+        self.numResponses += other.numResponses
+        self.totalResponseTime += other.totalResponseTime
+        self.responseTimes.merge(other.responseTimes)
+        for mediaType in other.mediaSent:
+            self.mediaSent[mediaType] += other.mediaSent[mediaType]
+
+        if self.trackedWords is None:
+            self.trackedWords = other.trackedWords
+        for word in other.wordDict:
+            if word not in self.wordDict:
+                self.wordDict[word] = other.wordDict[word]
+            else:
+                self.wordDict[word][0] += other.wordDict[word][0]
+                self.wordDict[word][1].mergeActivity(other.wordDict[word][1])
+
+        self.activity.mergeActivity(other.activity)
+        self.searchedMessages.update(other.searchedMessages)
+
+        if self.vocabulary is None:
+            self.vocabulary = other.vocabulary
+        elif other.vocabulary is not None:
+            self.vocabulary.merge(other.vocabulary)
+
+    def addResponseTime(self, responseTime, repliedTo):
+        """
+        Count a single response time for this user, ignoring gaps over 10 hours
+        responseTime - seconds between the previous message and this user's reply
+        repliedTo - peer_id of the sender of the previous message
+        """
+        #Check if the time between messages is greater than 10 hours, if so both people are probably asleep so ignore this for responseTime
+        if responseTime < maxResponseTime:
+            self.totalResponseTime+=responseTime
+            self.numResponses+=1
+            self.responseTimes.add(responseTime, repliedTo)
 
     def updateNumPics(self):
         """
@@ -92,30 +165,41 @@ class UserData(object):
         """
         self.mediaSent["links"] += 1 
 
-    def updateLength(self, message):
+    def updateLength(self, message, messageWords = None):
         """
         Update the word/character length variables for this user
         message - string containg only the text of the message 
+        messageWords - message.split() if it was already split up
         """
-        messageLength =  len(message.split())
+        if messageWords is None:
+            messageWords = message.split()
+        messageLength =  len(messageWords)
         messageChars = len(message)
         self.totalLength += messageLength
         self.totalCharacters += messageChars
 
-    def checkSpecificWords(self, message, messageData,  words):
+    def checkSpecificWords(self, message, messageData,  words, eventStore = None):
         """
         Method used to check and track the presence of certain words. Each word is given a count and their own activityInfo object 
         message - string of only the message
         messageData - full JSON object containing all data of the message
-        words - array containing all special words to keep track of 
+        words - WordTracker built from all special words to keep track of, a plain list works as well but is slower
+        eventStore - Optional EventStore, every word found is also recorded there for the daily rollups
         """
+        if not isinstance(words, WordTracker):
+            words = WordTracker(words)
+
+        self.trackedWords = words.uniqueWords
+
         message = message.lower()
-        for word in words:
-            if word not in self.wordDict:
+        for word, numOccurences in words.countWords(message).items():
+            timesListed = words.getTimesListed(word) #Words listed more than once in start.py are counted each time
+            if word not in self.wordDict: #Words only get an entry once they're used, most users never use most words
                 self.wordDict[word] = [0, ActivityInfo()]
-            if word in message:
-                numOccurences = message.count(word)
-                self.wordDict[word][0] += numOccurences
+            self.wordDict[word][0] += numOccurences * timesListed
+            if eventStore is not None:
+                eventStore.addWordHits(words.wordIndices[word], numOccurences * timesListed)
+            for repeat in range(timesListed):
                 self.wordDict[word][1].updateActivity(messageData['date'])
 
     def processDates(self, messageData):
@@ -135,10 +219,7 @@ class UserData(object):
         for sender in mostRecentMessage:
             #Data is read in backwards, going from most recent to latest, thus the "recentMessage" will have a greater time stamp than our current message
             responseTime =  messageData['date'] - mostRecentMessage[sender]
-            #Check if the time between messages is greater than 5 hours, if so both people are probably asleep so ignore this for responseTime
-            if responseTime < 36000:
-                self.totalResponseTime+=responseTime
-                self.numResponses+=1
+            self.addResponseTime(responseTime, sender)
 
     def findMessage(self, messageData, messageText, hourRange, keyWords):
         """
@@ -147,10 +228,10 @@ class UserData(object):
         hourRange - size 2 tuple with a range of hours from (0,23)
         keyWords - optional array containing strings of desired keywords 
         """
-        hourSent = datetime.datetime.fromtimestamp(messageData['date']).hour #Get hour of the day
-        daySent = datetime.datetime.fromtimestamp(messageData['date']).isoformat() #Get full ISO format String
+        hourSent = dateinfo.getCalendarDate(messageData['date']).hour #Get hour of the day
         if len(keyWords) == 0: #Only use this method if our keyWords array is empty
             if (hourSent >= hourRange[0]) and (hourSent <= hourRange[1]): #Check if this message is within our hour range
+                daySent = datetime.datetime.fromtimestamp(messageData['date']).isoformat() #Get full ISO format String
                 self.searchedMessages[messageText] = daySent
         else:
             self.findMessageWithKeyword(messageData, messageText, hourRange,keyWords, hourSent) #Must check for keywords as well 
@@ -159,11 +240,10 @@ class UserData(object):
         """
         Extension of findMessage(), called if keywords are specified 
         """
-        daySent = datetime.datetime.fromtimestamp(messageData['date']).isoformat()
         if(hourSent >= hourRange[0]) and (hourSent <= hourRange[1]):
             for word in keyWords:
                 if word in messageText:
-                    self.searchedMessages[messageText] = daySent
+                    self.searchedMessages[messageText] = datetime.datetime.fromtimestamp(messageData['date']).isoformat()
 
     def getNumMessages(self):
         """
@@ -190,6 +270,12 @@ class UserData(object):
         """
         return self.activity.getAveragedMonthActivity()
     
+    def getMonthTimeline(self):
+        """
+        Refer to getMonthTimeline() in dateinfo.py
+        """
+        return self.activity.getMonthTimeline()
+
     def getAveragedHourActivity(self):
         """
         Refer to getAveragedHourActivity() in dateinfo.py
@@ -202,80 +288,87 @@ class UserData(object):
         """
         return (self.totalResponseTime/self.numResponses)/60
 
-    def getTrackedWords(self):
-        """
-        Return dictionary with words specified by user to be checked, each word has its own ActivityInfo object 
-        """
-        return self.wordDict
-    
-    def getPeerID(self):
+    def getResponseHistogram(self, repliedTo = None):
         """
-        Return current user's unique id
+        Return a ResponseHistogram of this user's response times, only counting replies to repliedTo if given
         """
-        return self.id
+        return self.responseTimes.getHistogram(repliedTo)
 
-    def printInfo(self):
+    def getResponseQuantiles(self):
         """
-        Print all info for the current user 
+        Return [median, 90th percentile, 99th percentile] of this user's response times in minutes, None if they never replied
         """
-        print("-------------------" + self.name + "-------------------")
-        print("    Peer ID: " + str(self.id))
-        print("    Messages Sent: " + str(self.numMessages))
-        print("    Pictures Sent: " + str(self.mediaSent["pics"]))
-        print("    Files Sent: " + str(self.mediaSent["docs"]))
-        print("    Links Sent: " + str(self.mediaSent["links"]))
-        print("    Average Message Length (Words): " + str((round(self.totalLength/self.numMessages))))
-        print("    Average Characters Per Message: " + str(round(self.totalCharacters/self.numMessages)))
-        print("    Average Response Time(Minutes): " + str(self.getAverageResponseTime()))
-        for word in sorted(self.wordDict.keys()):
-            print("    " + word + " : " + str(self.wordDict[word][0]))
-        self.printMonthInfo()
-        self.printWeekdayInfo()
-        self.printHourInfo()
-        self.printSearchedMessages()
+        return self.getResponseHistogram().getQuantiles()
 
-    def printMonthInfo(self):
+    def getActiveDayStats(self):
         """
-        Print number of messages sent each month, separated by year 
+        Refer to getActiveDayStats() in dateinfo.py
         """
-        print("Messages Sent per Month: ")
-        monthAct = self.activity.getMonthActivity()
-        for year in sorted(monthAct.keys(), reverse = False):
-            print(year)
-            for monthNum in sorted(monthAct[year]):
-                print ("    " + str(monthNum) + ": " + str(monthAct[year][monthNum]))
+        return self.activity.getActiveDayStats()
 
-    def printWeekdayInfo(self):
+    def getTrackedWords(self):
         """
-        Print the average number of messsages sent each weekday 
+        Return dictionary with words specified by user to be checked, each word has its own ActivityInfo object 
+        Words this user never used are filled in with a count of 0 and an empty ActivityInfo
         """
-        print("Average Messages Sent per Weekday:")
-        weekAct = self.activity.getWeekdayActivity()
-        for weekday in sorted(weekAct.keys()):
-            avgMessage = weekAct[weekday][0]/weekAct[weekday][1]
-            print("    " + self.weekdays[weekday] + ": " + str(avgMessage))
+        return {word: self.wordDict[word] if word in self.wordDict else [0, ActivityInfo()] for word in self.trackedWords or []}
     
-    def printHourInfo(self):
+    def getPeerID(self):
         """
-        Print the average number of messages sent each hour 
+        Return current user's unique id
         """
-        print("Average Messages sent for each hour: ")
-        weekAct = self.activity.getWeekdayActivity()
-        firstAvailableWeekDay = 0
+        return self.id
 
-        for weekDay in weekAct:
-            firstAvailableWeekDay = weekDay
-            break
+    def getReport(self, peerNames = None, maxResponsesByPerson = None):
+        """
+        Return every stat of this user as plain numbers, strings, lists and dictionaries, the data behind every report
+        format in report.py. Averages are left unrounded
+        peerNames - optional names of everyone in the chat {ID : name}, used to name the people this user replied to
+        maxResponsesByPerson - only work out the response times to this many of the people replied to most, None for everyone.
+                    peopleRepliedTo always counts everyone
+        """
+        dayStats = self.getActiveDayStats()
+        trackedWords = self.getTrackedWords()
+        monthAct = self.activity.getMonthActivity()
+        weekAct = self.activity.getWeekdayActivity()
+        numDays = self.activity.getActiveDayCount()
+        histograms = self.responseTimes.getHistogramsByPerson()
+        numResponses = {peerID: histograms[peerID].getCount() for peerID in histograms}
 
-        numDays = weekAct[firstAvailableWeekDay][1] * 7
-        hourAct = self.activity.getHourActivity()
-        for hour in sorted(hourAct.keys()): 
-            avgMessage = hourAct[hour][0]/numDays
-            print("    " + str(hour) + ": " + str(avgMessage))
+        responsesByPerson = []
+        for peerID in sorted(histograms, key = lambda peerID: (-numResponses[peerID], peerID))[:maxResponsesByPerson]: #People replied to most come first
+            medianResponse, response90, response99 = histograms[peerID].getQuantiles()
+            name = peerNames.get(peerID, str(peerID)) if peerNames is not None else str(peerID)
+            responsesByPerson.append({"peerID": peerID, "name": name, "responses": numResponses[peerID], "median": medianResponse,
+                                        "percentile90": response90, "percentile99": response99})
+        medianResponse, response90, response99 = self.getResponseQuantiles()
+        getTopItems = lambda topItems: [{"text": item, "count": count, "error": error} for item, count, error in topItems]
 
-    def printSearchedMessages(self):
-        print ("\n" + "Found " + str(len(self.searchedMessages.keys())) + " message(s) matching your parameters.")
-        print()
-        for message in self.searchedMessages:
-            print("    " + message + "  : " + self.searchedMessages[message])
+        return {"peerID": self.id, "name": self.name, "messages": self.numMessages, "pics": self.mediaSent["pics"],
+                "docs": self.mediaSent["docs"], "links": self.mediaSent["links"], "words": self.totalLength,
+                "characters": self.totalCharacters, "averageWords": self.totalLength/self.numMessages,
+                "averageCharacters": self.totalCharacters/self.numMessages,
+                "averageResponseTime": self.getAverageResponseTime() if self.numResponses != 0 else None,
+                "medianResponseTime": medianResponse, "responseTime90": response90, "responseTime99": response99,
+                "activeDays": dayStats["activeDays"], "spanDays": dayStats["spanDays"], "longestStreak": dayStats["longestStreak"],
+                "longestBreak": dayStats["longestGap"],
+                "trackedWords": {word: trackedWords[word][0] for word in sorted(trackedWords)},
+                "months": [{"year": year, "month": monthNum, "messages": monthAct[year][monthNum]}
+                            for year in sorted(monthAct) for monthNum in sorted(monthAct[year])],
+                "weekdays": [{"weekday": self.weekdays[weekday], "averageMessages": weekAct[weekday][0]/weekAct[weekday][1]}
+                                for weekday in sorted(weekAct)],
+                "hours": [{"hour": hour, "averageMessages": count/numDays} for hour, (count, days) in self.activity.getHourActivity().items()],
+                "peopleRepliedTo": len(histograms), "responsesByPerson": responsesByPerson,
+                "topWords": getTopItems(self.vocabulary.getTopWords()) if self.vocabulary is not None else None,
+                "topPhrases": getTopItems(self.vocabulary.getTopPhrases()) if self.vocabulary is not None else None,
+                "topEmoji": getTopItems(self.vocabulary.getTopEmoji()) if self.vocabulary is not None else None,
+                "searchedMessages": [{"text": message, "sent": timeSent} for message, timeSent in self.searchedMessages.items()]}
 
+    def printInfo(self, outputFile = None, peerNames = None):
+        """
+        Print all info for the current user, in the same format as fullStats.txt
+        outputFile - file to print to, defaults to sys.stdout
+        peerNames - optional names of everyone in the chat {ID : name}, used to show who this user replied to
+        """
+        writer = report.TextReportWriter(outputFile or sys.stdout)
+        writer.writeUser(self.getReport(peerNames, writer.maxResponsesByPerson))
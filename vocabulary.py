@@ -0,0 +1,188 @@
+import re, heapq, string
+from collections import Counter
+
+#Each summary keeps counters for this many times the number of items shown and only trims them once it holds twice that, so
+#counts stay exact until a user has used 200 times as many different items as are shown
+capacityPerShown = 100
+
+#Words of a user's messages are counted once this many of them are waiting, see VocabularyInfo
+pendingLimit = 4096
+
+#Words skipped when finding each user's most used words, otherwise every list would start with the same handful of them.
+#Phrases are only skipped when both of their words are in here
+stopWords = frozenset("""a about after all also am an and any are as at be because been but by can could did do does
+    don't for from get got had has have he her him his how i i'm if in into is it it's its just like me my no not now of
+    on one or our out so some than that that's the their them then there they this to too up us was we were what when
+    which who will with would you you're your""".split())
+
+#Characters counted as emoji, covering pictographs, symbols and dingbats, with the pair of letters that makes up a flag counted
+#as one. Skin tone modifiers are left out so they don't show up on their own
+emojiPattern = re.compile("[\U0001F1E6-\U0001F1FF]{2}|[\U0001F1E6-\U0001F1FF\U0001F300-\U0001F3FA\U0001F400-\U0001F64F\U0001F680-\U0001F6FF"
+                            "\U0001F900-\U0001F9FF\U0001FA70-\U0001FAFF\u2600-\u27BF]")
+
+#Characters stripped from both ends of a word before it's counted, "Hey!" and "hey" are the same word
+wordPunctuation = string.punctuation + "“”‘’…"
+
+class SpaceSaving(object):
+    """
+    Class used to find the most frequent items of a stream in fixed memory with the Space-Saving algorithm. At most twice
+    capacity items are counted at once, when that fills up only the capacity most frequent are kept. An item that isn't
+    being counted is assumed to have been seen floor times already, so every count is an overestimate by at most its error,
+    which is never more than floor. Two summaries are merged by adding their counts, giving the same guarantees over both
+    """
+    __slots__ = ("capacity", "counts", "errors", "floor")
+
+    def __init__(self, capacity):
+        """
+        capacity - most items kept after trimming
+        counts - estimated number of times each counted item was seen {item : count}
+        errors - most each count can be over by {item : error}
+        floor - most times any item that isn't counted could have been seen
+        """
+        self.capacity = capacity
+        self.counts = dict()
+        self.errors = dict()
+        self.floor = 0
+
+    def addCounts(self, itemCounts):
+        """
+        Count a batch of items, each seen a number of times
+        itemCounts - dictionary {item : times seen}
+        """
+        counts = self.counts
+        errors = self.errors
+        floor = self.floor
+        for item, count in itemCounts.items():
+            if item in counts:
+                counts[item] += count
+            else:
+                counts[item] = floor + count
+                errors[item] = floor
+        if len(counts) > 2 * self.capacity:
+            self.trim()
+
+    def trim(self):
+        """
+        Drop every item counted no more than the item just past the capacity most counted ones, which always leaves at most
+        capacity items. Ties are all dropped together so the result doesn't depend on the order items were first seen in
+        """
+        cutoff = heapq.nlargest(self.capacity + 1, self.counts.values())[-1]
+        self.counts = {item: count for item, count in self.counts.items() if count > cutoff}
+        self.errors = {item: self.errors[item] for item in self.counts}
+        self.floor = max(self.floor, cutoff)
+
+    def merge(self, other):
+        """
+        Add every count of another SpaceSaving to this one. Items only one of them counted could have been seen up to floor
+        times by the other
+        """
+        for item in self.counts:
+            if item not in other.counts:
+                self.counts[item] += other.floor
+                self.errors[item] += other.floor
+        for item, count in other.counts.items():
+            if item in self.counts:
+                self.counts[item] += count
+                self.errors[item] += other.errors[item]
+            else:
+                self.counts[item] = count + self.floor
+                self.errors[item] = other.errors[item] + self.floor
+        self.floor += other.floor
+        self.capacity = max(self.capacity, other.capacity)
+        if len(self.counts) > 2 * self.capacity:
+            self.trim()
+
+    def getTopItems(self, numItems):
+        """
+        Return the numItems most counted items as a list of (item, count, error), most counted first. The real number of
+        times each was seen is between count - error and count. Items whose error is half their count or more say next to
+        nothing about how often they were really seen and are left out
+        """
+        reliable = ((item, count) for item, count in self.counts.items() if self.errors[item] * 2 < count)
+        top = heapq.nsmallest(numItems, reliable, key = lambda entry: (-entry[1], entry[0]))
+        return [(item, count, self.errors[item]) for item, count in top]
+
+class VocabularyInfo(object):
+    """
+    Class used to find a single user's most used words, two word phrases and emoji without keeping a count of everything
+    they ever said. Memory stays the same no matter how much they send, see SpaceSaving. Words are held back in a short
+    list and counted a batch at a time, so each distinct word of a batch is only cleaned up and looked up once
+    """
+    __slots__ = ("numShown", "words", "phrases", "emoji", "pendingWords", "pendingPairs", "pendingEmoji")
+
+    def __init__(self, numShown):
+        """
+        numShown - number of words, phrases and emoji shown for each user
+        words, phrases, emoji - SpaceSaving summaries of each, keeping capacityPerShown times numShown counters
+        pendingWords - words of messages that haven't been counted yet, exactly as they were split up
+        pendingPairs - (word, next word) pairs of those messages
+        pendingEmoji - emoji of those messages
+        """
+        self.numShown = numShown
+        self.words = SpaceSaving(numShown * capacityPerShown)
+        self.phrases = SpaceSaving(numShown * capacityPerShown)
+        self.emoji = SpaceSaving(numShown * capacityPerShown)
+        self.pendingWords = []
+        self.pendingPairs = []
+        self.pendingEmoji = []
+
+    def addMessage(self, message, messageWords):
+        """
+        Count the words, phrases and emoji of a single message
+        message - string containing only the text of the message
+        messageWords - message.split(), shared with the word count in UserData.updateLength()
+        """
+        self.pendingWords.extend(messageWords)
+        if len(messageWords) > 1:
+            self.pendingPairs.extend(zip(messageWords, messageWords[1:]))
+        if not message.isascii(): #Emoji are never plain ascii, which is a much quicker check than searching for them
+            self.pendingEmoji.extend(emojiPattern.findall(message))
+        if len(self.pendingWords) + len(self.pendingEmoji) >= pendingLimit:
+            self.flush()
+
+    def flush(self):
+        """
+        Count every pending word, phrase and emoji
+        """
+        cleanWords = dict() #Each distinct word as written is only cleaned up once {word : cleaned up word}
+        wordCounts = dict()
+        for word, count in Counter(self.pendingWords).items():
+            cleanWord = cleanWords[word] = word.strip(wordPunctuation).lower()
+            if cleanWord and cleanWord not in stopWords:
+                wordCounts[cleanWord] = wordCounts.get(cleanWord, 0) + count
+        phraseCounts = dict()
+        for (first, second), count in Counter(self.pendingPairs).items():
+            first, second = cleanWords[first], cleanWords[second]
+            if first and second and (first not in stopWords or second not in stopWords):
+                phrase = first + " " + second
+                phraseCounts[phrase] = phraseCounts.get(phrase, 0) + count
+
+        self.words.addCounts(wordCounts)
+        self.phrases.addCounts(phraseCounts)
+        self.emoji.addCounts(Counter(self.pendingEmoji))
+        self.pendingWords = []
+        self.pendingPairs = []
+        self.pendingEmoji = []
+
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        self.numShown = max(self.numShown, other.numShown)
+        self.words.merge(other.words)
+        self.phrases.merge(other.phrases)
+        self.emoji.merge(other.emoji)
+
+    def getTopWords(self):
+        """
+        Return the most used words, see SpaceSaving.getTopItems()
+        """
+        self.flush()
+        return self.words.getTopItems(self.numShown)
+
+    def getTopPhrases(self):
+        self.flush()
+        return self.phrases.getTopItems(self.numShown)
+
+    def getTopEmoji(self):
+        self.flush()
+        return self.emoji.getTopItems(self.numShown)
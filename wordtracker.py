@@ -0,0 +1,127 @@
+from collections import deque
+
+try:
+    import ahocorasick #Optional, pyahocorasick does the matching in C when it's installed
+except ImportError:
+    ahocorasick = None
+
+class WordTracker(object):
+    """
+    Class used to find every tracked word or phrase inside a message in a single pass, no matter how many words are tracked.
+    Builds an Aho-Corasick automaton out of the tracked words, counts come out the same as message.count(word) for each word
+    """
+
+    def __init__(self, words):
+        """
+        words - list of words or phrases to track, matched against lowercased messages
+        uniqueWords - every tracked word in the order given, without repeats
+        wordIndices - position of each word in uniqueWords {word : index}
+        timesListed - number of times each word shows up in words, a word listed twice is counted twice {word : 2}
+        automaton - pyahocorasick Automaton if available, otherwise None and the pure python tables below are used
+        goto - list of dicts holding the trie transitions for each state {character : state}
+        fail - state to fall back to for each state when the next character has no transition
+        output - words that end at each state, including those reached through fail links
+        """
+        self.uniqueWords = list(dict.fromkeys(words))
+        self.wordIndices = {word: index for index, word in enumerate(self.uniqueWords)}
+        self.timesListed = dict()
+        for word in words:
+            self.timesListed[word] = self.timesListed.get(word, 0) + 1
+        self.automaton = None
+
+        matchedWords = [word for word in self.uniqueWords if word != ""] #Empty strings are handled separately in countWords()
+        if ahocorasick is not None and len(matchedWords) != 0:
+            self.automaton = ahocorasick.Automaton()
+            for word in matchedWords:
+                self.automaton.add_word(word, word)
+            self.automaton.make_automaton()
+        else:
+            self.buildAutomaton(matchedWords)
+
+    def __len__(self):
+        return len(self.uniqueWords)
+
+    def __getstate__(self):
+        #pyahocorasick automatons can't always be pickled, rebuild it when sent to another process
+        return {"words": [word for word in self.timesListed for repeat in range(self.timesListed[word])]}
+
+    def __setstate__(self, state):
+        self.__init__(state["words"])
+
+    def buildAutomaton(self, words):
+        """
+        Build the trie, fail links and outputs of the automaton in pure python
+        """
+        self.goto = [dict()]
+        self.fail = [0]
+        self.output = [[]]
+        for word in words:
+            state = 0
+            for character in word:
+                if character not in self.goto[state]:
+                    self.goto.append(dict())
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][character] = len(self.goto) - 1
+                state = self.goto[state][character]
+            self.output[state].append(word)
+
+        #Breadth first pass to set each state's fail link to the longest proper suffix that is also in the trie
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, nextState in self.goto[state].items():
+                queue.append(nextState)
+                fallback = self.fail[state]
+                while fallback != 0 and character not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nextState] = self.goto[fallback].get(character, 0)
+                self.output[nextState] = self.output[nextState] + self.output[self.fail[nextState]]
+
+    def findMatches(self, message):
+        """
+        Return an iterator of (end index, word) for every occurrence of every tracked word in message, overlaps included
+        """
+        if self.automaton is not None:
+            return self.automaton.iter(message)
+        return self.findMatchesPython(message)
+
+    def findMatchesPython(self, message):
+        """
+        Pure python version of findMatches() used when pyahocorasick isn't installed
+        """
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for index, character in enumerate(message):
+            while state != 0 and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            for word in output[state]:
+                yield index, word
+
+    def countWords(self, message):
+        """
+        Return a dictionary with the number of times each tracked word shows up in message, only words that were found are
+        included. Occurrences are counted without overlaps from left to right like str.count() {word : count}
+        message - lowercased message text
+        """
+        counts = dict()
+        nextAllowedStart = dict() #Index each word has to start at or after to not overlap its previous occurrence
+        for endIndex, word in self.findMatches(message):
+            startIndex = endIndex - len(word) + 1
+            if startIndex >= nextAllowedStart.get(word, 0):
+                counts[word] = counts.get(word, 0) + 1
+                nextAllowedStart[word] = endIndex + 1
+
+        if "" in self.timesListed:
+            counts[""] = len(message) + 1
+
+        return counts
+
+    def getTimesListed(self, word):
+        """
+        Return how many times word was listed in the words passed in
+        """
+        return self.timesListed[word]